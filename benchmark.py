@@ -0,0 +1,202 @@
+from generador_datos import generar_archivo
+import recomendify as r
+from multiprocessing import get_context
+from contextlib import redirect_stdout
+from random import Random
+from time import perf_counter
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Mide el rendimiento de recomendify.py sobre archivos sinteticos (ver generador_datos.py) de distintos tamaños.
+# Cada escenario se ejecuta en un proceso nuevo, de modo que el pico de memoria que informa es solo el suyo (incluye
+# la carga de lo que el escenario necesita, que se mide aparte). El resultado se escribe como JSON.
+# Uso: python3 benchmark.py [--filas=10000,100000] [--escenarios=ingesta,camino,...] [--consultas=N] [--semilla=N]
+#                           [--salida=archivo.json]
+
+PREFIJO_OPCION = "--"
+SEPARADOR_VALOR_OPCION = "="
+SEPARADOR_LISTA = ","
+
+FILAS_POR_DEFECTO = (10000, 100000)
+CONSULTAS_POR_DEFECTO = 20
+SEMILLA_POR_DEFECTO = 1
+
+# Largo de los ciclos y de los rangos que se consultan, y cantidad de resultados de las demas consultas
+LARGO_CICLO = 5
+LARGO_RANGO = 3
+CANTIDAD_RESULTADOS = 10
+CANCIONES_POR_RECOMENDACION = 3
+
+# Las canciones de una linea de comando se separan con el separador de la entrada entre espacios
+SEPARADOR_CANCIONES = " " + r.SEPARADOR_CANCIONES_ENTRADA_USUARIO + " "
+
+PERCENTILES = (50, 95, 99)
+OPCION_INVALIDA = "Opcion invalida: "
+
+#*******************************************************************
+#                           ESCENARIOS
+#*******************************************************************
+
+# Cada escenario es una funcion que recibe la ruta del archivo de canciones, la cantidad de consultas y la semilla
+# y devuelve un diccionario con el tiempo de preparacion (lo que el escenario necesita pero no mide), el tiempo
+# medido y, si ejecuta consultas, sus latencias
+
+def _medir(funcion, *parametros):
+    inicio = perf_counter()
+    resultado = funcion(*parametros)
+    return resultado, perf_counter() - inicio
+
+def escenario_ingesta(ruta, consultas, semilla):
+    _, tiempo = _medir(r.procesar_archivo, ruta)
+    return {"preparacion_s": 0.0, "tiempo_s": tiempo}
+
+def escenario_ingesta_compacta(ruta, consultas, semilla):
+    _, tiempo = _medir(r.procesar_archivo, ruta, True)
+    return {"preparacion_s": 0.0, "tiempo_s": tiempo}
+
+def escenario_grafo_canciones(ruta, consultas, semilla):
+    (grafo, usuarios), preparacion = _medir(r.procesar_archivo, ruta)
+    _, tiempo = _medir(r.construir_grafo_canciones, grafo, usuarios)
+    return {"preparacion_s": preparacion, "tiempo_s": tiempo}
+
+def escenario_page_rank(ruta, consultas, semilla):
+    (grafo, usuarios), preparacion = _medir(r.procesar_archivo, ruta)
+    _, tiempo = _medir(r.calcular_page_ranks, grafo, usuarios, r.MOTOR_PAGERANK_ITERATIVO)
+    return {"preparacion_s": preparacion, "tiempo_s": tiempo}
+
+def escenario_page_rank_vectorizado(ruta, consultas, semilla):
+    (grafo, usuarios), preparacion = _medir(r.procesar_archivo, ruta)
+    with redirect_stdout(sys.stderr):
+        _, tiempo = _medir(r.calcular_page_ranks, grafo, usuarios, r.MOTOR_PAGERANK_VECTORIZADO)
+    return {"preparacion_s": preparacion, "tiempo_s": tiempo}
+
+# Recibe el grafo de usuarios y canciones, los usuarios, el tipo de comando, la cantidad de consultas y la semilla y
+# devuelve las lineas de comando a ejecutar, con canciones elegidas al azar (siempre las mismas para la misma semilla)
+def generar_consultas(grafo, usuarios, comando, consultas, semilla):
+    aleatorio = Random(semilla)
+    canciones = [v for v in grafo.obtener_vertices() if v not in usuarios]
+    lineas = []
+    for _ in range(consultas):
+        if comando == r.CAMINO:
+            origen, destino = aleatorio.choice(canciones), aleatorio.choice(canciones)
+            lineas.append(r.CAMINO + " " + SEPARADOR_CANCIONES.join((origen, destino)))
+        if comando == r.RECOMENDACION:
+            elegidas = aleatorio.sample(canciones, min(CANCIONES_POR_RECOMENDACION, len(canciones)))
+            lineas.append(" ".join((r.RECOMENDACION, r.RECOMENDACION_TIPO_CANCION, str(CANTIDAD_RESULTADOS),
+                                    SEPARADOR_CANCIONES.join(elegidas))))
+        if comando == r.IMPORTANTES: lineas.append(r.IMPORTANTES + " " + str(CANTIDAD_RESULTADOS))
+        if comando == r.CICLO: lineas.append(" ".join((r.CICLO, str(LARGO_CICLO), aleatorio.choice(canciones))))
+        if comando == r.RANGO: lineas.append(" ".join((r.RANGO, str(LARGO_RANGO), aleatorio.choice(canciones))))
+    return lineas
+
+# Recibe una lista de latencias en segundos y devuelve un diccionario con su media y sus percentiles en milisegundos
+def resumir_latencias(latencias):
+    ordenadas = sorted(latencias)
+    resumen = {"consultas": len(ordenadas), "latencia_media_ms": 1000 * sum(ordenadas) / len(ordenadas)}
+    for percentil in PERCENTILES:
+        posicion = min(len(ordenadas) - 1, len(ordenadas) * percentil // 100)
+        resumen["latencia_p" + str(percentil) + "_ms"] = 1000 * ordenadas[posicion]
+    return resumen
+
+# Devuelve un escenario que carga el archivo y ejecuta consultas del comando recibido, midiendo cada una. El grafo de
+# canciones y el pagerank que el comando necesita se construyen durante la preparacion, para que no los absorba la
+# primera consulta
+def escenario_comando(comando):
+    def escenario(ruta, consultas, semilla):
+        inicio = perf_counter()
+        grafo, usuarios = r.procesar_archivo(ruta)
+        grafo_canciones, page_rank = r.preparar_grafos(grafo, None, None, usuarios, {}, (comando,))
+        lineas = generar_consultas(grafo, usuarios, comando, consultas, semilla)
+        preparacion = perf_counter() - inicio
+        latencias = []
+        perfiles_rango = r.OrderedDict()
+        with redirect_stdout(io.StringIO()):
+            for linea in lineas:
+                _, latencia = _medir(r.ejecutar_comando, linea.split(" "), grafo, grafo_canciones, page_rank,
+                                     usuarios, perfiles_rango, {})
+                latencias.append(latencia)
+        resultado = {"preparacion_s": preparacion, "tiempo_s": sum(latencias)}
+        resultado.update(resumir_latencias(latencias))
+        return resultado
+    return escenario
+
+ESCENARIOS = {
+    "ingesta": escenario_ingesta,
+    "ingesta_compacta": escenario_ingesta_compacta,
+    "grafo_canciones": escenario_grafo_canciones,
+    "page_rank": escenario_page_rank,
+    "page_rank_vectorizado": escenario_page_rank_vectorizado,
+    r.CAMINO: escenario_comando(r.CAMINO),
+    r.RECOMENDACION: escenario_comando(r.RECOMENDACION),
+    r.IMPORTANTES: escenario_comando(r.IMPORTANTES),
+    r.CICLO: escenario_comando(r.CICLO),
+    r.RANGO: escenario_comando(r.RANGO),
+}
+
+#*******************************************************************
+#                           EJECUCION
+#*******************************************************************
+
+# Se ejecuta en un proceso nuevo: corre el escenario y le agrega el pico de memoria residente del proceso en KB
+def ejecutar_escenario(nombre, ruta, consultas, semilla):
+    resultado = ESCENARIOS[nombre](ruta, consultas, semilla)
+    # en Linux ru_maxrss está en KB, en macOS en bytes
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    resultado["memoria_pico_kb"] = pico // 1024 if sys.platform == "darwin" else pico
+    return resultado
+
+# Recibe las cantidades de filas, los nombres de los escenarios, la cantidad de consultas y la semilla, genera un
+# archivo sintetico por cada tamaño y ejecuta cada escenario sobre él en un proceso nuevo. Devuelve el reporte
+def ejecutar_benchmark(cantidades_filas, escenarios, consultas, semilla):
+    contexto = get_context("spawn")
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for filas in cantidades_filas:
+            ruta = os.path.join(directorio, "canciones_" + str(filas) + ".tsv")
+            _, tiempo_generacion = _medir(generar_archivo, ruta, filas, semilla)
+            print("Generadas " + str(filas) + " filas en " + format(tiempo_generacion, ".2f") + " s", file = sys.stderr)
+            for nombre in escenarios:
+                with contexto.Pool(1) as pool:
+                    resultado = pool.apply(ejecutar_escenario, (nombre, ruta, consultas, semilla))
+                print(str(filas) + " " + nombre + ": " + format(resultado["tiempo_s"], ".3f") + " s", file = sys.stderr)
+                resultados.append(dict(filas = filas, escenario = nombre, **resultado))
+    return {
+        "python": platform.python_version(),
+        "numpy": r.np is not None,
+        "procesador": platform.processor() or platform.machine(),
+        "nucleos": os.cpu_count(),
+        "semilla": semilla,
+        "resultados": resultados,
+    }
+
+def main():
+    opciones = {}
+    for parametro in sys.argv[1:]:
+        nombre, _, valor = parametro[len(PREFIJO_OPCION):].partition(SEPARADOR_VALOR_OPCION)
+        opciones[nombre] = valor
+    cantidades_filas = [int(filas) for filas in opciones["filas"].split(SEPARADOR_LISTA)] \
+        if "filas" in opciones else FILAS_POR_DEFECTO
+    escenarios = opciones["escenarios"].split(SEPARADOR_LISTA) if "escenarios" in opciones else list(ESCENARIOS)
+    for nombre in escenarios:
+        if nombre not in ESCENARIOS:
+            print(OPCION_INVALIDA + nombre, file = sys.stderr)
+            return 1
+    consultas = int(opciones.get("consultas", CONSULTAS_POR_DEFECTO))
+    semilla = int(opciones.get("semilla", SEMILLA_POR_DEFECTO))
+    reporte = ejecutar_benchmark(cantidades_filas, escenarios, consultas, semilla)
+    if "salida" in opciones:
+        with open(opciones["salida"], "w") as salida: json.dump(reporte, salida, indent = 2)
+    else: print(json.dumps(reporte, indent = 2))
+    return 0
+
+if __name__ == "__main__":
+    main()
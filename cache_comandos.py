@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+MENSAJE_ESTADISTICAS = "Cache de comandos: {} aciertos, {} fallos, {} entradas"
+
+class CacheComandos:
+
+    # Crea una cache vacia de resultados de comandos, que guarda a lo sumo "max_entradas" resultados y a lo sumo
+    # "max_caracteres" caracteres de salida en total, descartando primero los usados hace mas tiempo
+    def __init__(self, max_entradas, max_caracteres):
+        self.entradas = OrderedDict()
+        self.max_entradas = max_entradas
+        self.max_caracteres = max_caracteres
+        self.caracteres = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    # Recibe la clave de un comando y la version actual del grafo y devuelve la salida guardada para ese comando, o
+    # None si no estaba o se calculó sobre otra version del grafo (en ese caso se descarta)
+    def obtener(self, clave, version):
+        entrada = self.entradas.get(clave)
+        if entrada is None or entrada[0] != version:
+            if entrada is not None: self._descartar(clave)
+            self.fallos += 1
+            return None
+        self.entradas.move_to_end(clave)
+        self.aciertos += 1
+        return entrada[1]
+
+    # Guarda la salida de un comando calculada sobre la version del grafo recibida
+    def guardar(self, clave, version, salida):
+        if clave in self.entradas: self._descartar(clave)
+        if len(salida) > self.max_caracteres: return
+        self.entradas[clave] = (version, salida)
+        self.caracteres += len(salida)
+        while len(self.entradas) > self.max_entradas or self.caracteres > self.max_caracteres:
+            self._descartar(next(iter(self.entradas)))
+
+    def _descartar(self, clave):
+        _, salida = self.entradas.pop(clave)
+        self.caracteres -= len(salida)
+
+    # Devuelve una cadena con la cantidad de aciertos, fallos y entradas de la cache
+    def __str__(self) -> str:
+        return MENSAJE_ESTADISTICAS.format(self.aciertos, self.fallos, len(self.entradas))
+
+    def __len__(self) -> int:
+        return len(self.entradas)
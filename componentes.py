@@ -0,0 +1,122 @@
+from array import array
+
+MENSAJE_ESTADISTICAS = "Componentes conexas: {} componentes, la mayor con {} vertices ({} canciones)"
+
+# Tipo de los arreglos de la estructura (enteros de 32 bits, como los ids del GrafoCSR)
+TIPO_IDS = "i"
+
+class ComponentesConexas:
+
+    # Crea una estructura de union-find vacia que mantiene las componentes conexas de un grafo no dirigido a medida
+    # que se le agregan vertices y aristas. Cada vertice tiene un id entero y las componentes se guardan en arreglos
+    # compactos: el padre de cada id (la raiz de una componente es su propio padre) y, para las raices, la cantidad
+    # de vertices y de canciones de la componente. "version" es la version del grafo que reflejan (None si no se
+    # armaron a partir de un grafo), para que quien las use sepa si quedaron viejas
+    def __init__(self):
+        self.indices = {}
+        self.padres = array(TIPO_IDS)
+        self.tamanios = array(TIPO_IDS)
+        self.canciones = array(TIPO_IDS)
+        self.cantidad = 0
+        self.version = None
+
+    # Agrega el vertice "v" (una cancion si "es_cancion" es True) como una componente nueva si no estaba y devuelve
+    # su id
+    def agregar_vertice(self, v, es_cancion = True):
+        i = self.indices.get(v)
+        if i is not None: return i
+        i = len(self.padres)
+        self.indices[v] = i
+        self.padres.append(i)
+        self.tamanios.append(1)
+        self.canciones.append(1 if es_cancion else 0)
+        self.cantidad += 1
+        return i
+
+    # Devuelve el id de la raiz de la componente del id "i", acortando el camino hacia ella (cada vertice del camino
+    # pasa a apuntar a su abuelo)
+    def _raiz(self, i):
+        padres = self.padres
+        while padres[i] != i:
+            padres[i] = padres[padres[i]]
+            i = padres[i]
+        return i
+
+    # Une las componentes de los ids "i" y "j" (devueltos por agregar_vertice) colgando la mas chica de la mas
+    # grande. Devuelve True si estaban separadas
+    # Complejidad: O(α(V)) amortizado
+    def unir_ids(self, i, j):
+        i, j = self._raiz(i), self._raiz(j)
+        if i == j: return False
+        if self.tamanios[i] < self.tamanios[j]: i, j = j, i
+        self.padres[j] = i
+        self.tamanios[i] += self.tamanios[j]
+        self.canciones[i] += self.canciones[j]
+        self.cantidad -= 1
+        return True
+
+    # Registra una arista entre los vertices "v" y "w", que ya fueron agregados. Devuelve True si unió dos
+    # componentes distintas
+    # Complejidad: O(α(V)) amortizado
+    def unir(self, v, w):
+        return self.unir_ids(self.indices[v], self.indices[w])
+
+    # Devuelve el id de la raiz de la componente del vertice "v", o None si no fue agregado
+    def componente(self, v):
+        i = self.indices.get(v)
+        return None if i is None else self._raiz(i)
+
+    # Devuelve True si los vertices "v" y "w" están en la misma componente
+    def conectados(self, v, w):
+        componente = self.componente(v)
+        return componente is not None and componente == self.componente(w)
+
+    # Devuelve la cantidad de vertices de la componente del vertice "v" (0 si no fue agregado)
+    def tamanio(self, v):
+        componente = self.componente(v)
+        return 0 if componente is None else self.tamanios[componente]
+
+    # Devuelve la cantidad de canciones de la componente del vertice "v" (0 si no fue agregado)
+    def cantidad_canciones(self, v):
+        componente = self.componente(v)
+        return 0 if componente is None else self.canciones[componente]
+
+    # Devuelve un diccionario con la cantidad de componentes, la cantidad de vertices y de canciones de la mayor y
+    # cuantas componentes hay de cada rango de tamaños (potencias de 2: la clave k cuenta las de entre 2^k y
+    # 2^(k+1) - 1 vertices)
+    def estadisticas(self):
+        raices = [i for i, padre in enumerate(self.padres) if padre == i]
+        mayor = max(raices, key = self.tamanios.__getitem__, default = None)
+        histograma = {}
+        for raiz in raices:
+            rango = self.tamanios[raiz].bit_length() - 1
+            histograma[rango] = histograma.get(rango, 0) + 1
+        return {
+            "componentes": self.cantidad,
+            "vertices_mayor": 0 if mayor is None else self.tamanios[mayor],
+            "canciones_mayor": 0 if mayor is None else self.canciones[mayor],
+            "tamanios": dict(sorted(histograma.items())),
+        }
+
+    # Devuelve una cadena con el resumen de las estadisticas de las componentes
+    def __str__(self) -> str:
+        estadisticas = self.estadisticas()
+        return MENSAJE_ESTADISTICAS.format(estadisticas["componentes"], estadisticas["vertices_mayor"],
+                                           estadisticas["canciones_mayor"])
+
+    def __len__(self) -> int:
+        return self.cantidad
+
+# Recibe un grafo no dirigido y el set de usuarios (los demas vertices son canciones) y devuelve sus
+# ComponentesConexas, con la version del grafo que reflejan. Los vertices se agregan en el orden del grafo, por lo que
+# sus ids coinciden con los del GrafoCSR
+# Complejidad: O(V + E α(V))
+def componentes_de_grafo(grafo, usuarios):
+    componentes = ComponentesConexas()
+    for v in grafo.obtener_vertices(): componentes.agregar_vertice(v, v not in usuarios)
+    indices = componentes.indices
+    for v in grafo.obtener_vertices():
+        i = indices[v]
+        for w in grafo.vista_adyacentes(v): componentes.unir_ids(i, indices[w])
+    componentes.version = grafo.version
+    return componentes
@@ -0,0 +1,162 @@
+from instantanea import cargar_secciones, guardar_secciones, TIPO_JSON, TIPO_RANKS
+from grafo_csr import csr_valido, ids_en_rango, TIPO_OFFSETS, TIPO_IDS
+from collections import defaultdict
+from operator import itemgetter
+from array import array
+import heapq
+
+#*******************************************************************
+#                     INDICE DE CO-OCURRENCIA
+#*******************************************************************
+
+# El indice de co-ocurrencia guarda, para cada cancion del grafo bipartito de usuarios y canciones, las K canciones
+# y los K usuarios con los que mas co-ocurre, con puntajes normalizados (los de cada lista suman 1). Se construye una
+# sola vez a partir del grafo, se guarda en disco con el formato de la instantanea (ver instantanea.py) y permite
+# responder las recomendaciones sin hacer Random Walks.
+# El puntaje de una cancion s' para la cancion s es la probabilidad de llegar de s a s' en un paseo al azar de dos
+# pasos (cancion -> usuario -> cancion), la misma que estiman los Random Walks en sus primeros pasos. El de un usuario
+# es la probabilidad de llegar a él con un paso mas, partiendo de s y de sus K canciones mas similares.
+
+EXTENSION_INDICE = ".indice"
+MAGIA = b"RFYCOOC3"
+VERSION = 1
+SIMILARES_POR_CANCION = 100
+
+# Secciones del archivo del indice. Los vertices se guardan con su posicion en la lista de etiquetas
+ETIQUETAS = "etiquetas"
+CANCIONES = "canciones"
+PREFIJO_CANCIONES = "canciones_"
+PREFIJO_USUARIOS = "usuarios_"
+OFFSETS = "offsets"
+IDS = "ids"
+PUNTAJES = "puntajes"
+
+class IndiceCoocurrencia:
+
+    # Recibe las etiquetas de los vertices, los ids de las canciones indexadas y, para las listas de canciones y de
+    # usuarios, una tupla (offsets, ids, puntajes) con formato CSR: las listas de la cancion en la posicion i van
+    # de offsets[i] a offsets[i + 1], ordenadas de mayor a menor puntaje
+    def __init__(self, etiquetas, canciones, listas_canciones, listas_usuarios):
+        self.etiquetas = etiquetas
+        self.canciones = canciones
+        self.posiciones = {etiquetas[cancion]: posicion for posicion, cancion in enumerate(canciones)}
+        self.listas_canciones = listas_canciones
+        self.listas_usuarios = listas_usuarios
+
+    # Devuelve la cantidad de canciones indexadas
+    def __len__(self):
+        return len(self.canciones)
+
+    # Recibe una cancion y un booleano que indica si se piden usuarios o canciones y devuelve la lista de pares
+    # (etiqueta, puntaje) de sus similares, o una lista vacia si la cancion no está indexada
+    def similares(self, cancion, usuarios = False):
+        posicion = self.posiciones.get(cancion)
+        if posicion is None: return []
+        offsets, ids, puntajes = self.listas_usuarios if usuarios else self.listas_canciones
+        inicio, fin = offsets[posicion], offsets[posicion + 1]
+        return [(self.etiquetas[ids[i]], puntajes[i]) for i in range(inicio, fin)]
+
+    # Recibe una lista de canciones, la cantidad de recomendaciones y si se recomiendan usuarios o canciones y
+    # devuelve las n con mayor puntaje sumando las listas de todas las canciones recibidas, sin incluirlas.
+    # Las listas ya están ordenadas, asi que se recorren con una mezcla de k vias (heapq.merge) acumulando por id; solo
+    # las n elegidas se pasan a etiquetas. Los empates se desempatan por la primera aparicion recorriendo las listas en
+    # el orden de las canciones recibidas
+    def recomendar(self, canciones, n, usuarios = False):
+        offsets, ids, puntajes = self.listas_usuarios if usuarios else self.listas_canciones
+        posiciones = [posicion for posicion in map(self.posiciones.get, canciones) if posicion is not None]
+        excluidos = set() if usuarios else {self.canciones[posicion] for posicion in posiciones}
+        # cada entrada lleva su orden de aparicion concatenando las listas, para desempatar
+        listas, orden = [], 0
+        for posicion in posiciones:
+            inicio, fin = offsets[posicion], offsets[posicion + 1]
+            listas.append([(puntajes[i], orden + i - inicio, ids[i]) for i in range(inicio, fin)])
+            orden += fin - inicio
+        acumulados = {}
+        for puntaje, orden, vertice in heapq.merge(*listas, key = itemgetter(0), reverse = True):
+            if vertice in excluidos: continue
+            acumulado = acumulados.get(vertice)
+            if acumulado is None: acumulados[vertice] = [puntaje, orden]
+            else:
+                acumulado[0] += puntaje
+                acumulado[1] = min(acumulado[1], orden)
+        mejores = heapq.nlargest(n, acumulados.items(), key = lambda par: (par[1][0], -par[1][1]))
+        return [self.etiquetas[vertice] for vertice, _ in mejores]
+
+#*******************************************************************
+#                           CONSTRUCCION
+#*******************************************************************
+
+# Recibe la lista de pares (id, puntaje) ya elegidos para una cancion y los agrega a las listas (offsets, ids,
+# puntajes), normalizando los puntajes para que sumen 1
+def _agregar_lista(listas, elegidos):
+    offsets, ids, puntajes = listas
+    total = sum(puntaje for _, puntaje in elegidos)
+    for vertice, puntaje in elegidos:
+        ids.append(vertice)
+        puntajes.append(puntaje / total)
+    offsets.append(len(ids))
+
+# Recibe un grafo que relaciona usuarios y canciones, el set de usuarios y la cantidad K de similares por cancion y
+# devuelve el IndiceCoocurrencia del grafo. Los vertices se numeran para recorrer la adyacencia como listas de enteros
+def construir_indice(grafo, usuarios, k = SIMILARES_POR_CANCION):
+    etiquetas = list(grafo.obtener_vertices())
+    indices = {vertice: i for i, vertice in enumerate(etiquetas)}
+    adyacencia = [[indices[w] for w in grafo.vista_adyacentes(v)] for v in etiquetas]
+    canciones = array(TIPO_IDS, (i for i, vertice in enumerate(etiquetas) if vertice not in usuarios))
+    listas_canciones = (array(TIPO_OFFSETS, [0]), array(TIPO_IDS), array(TIPO_RANKS))
+    listas_usuarios = (array(TIPO_OFFSETS, [0]), array(TIPO_IDS), array(TIPO_RANKS))
+    for cancion in canciones:
+        adyacentes = adyacencia[cancion]
+        # probabilidad de llegar a cada cancion en dos pasos
+        llegadas = defaultdict(float)
+        for usuario in adyacentes:
+            canciones_usuario = adyacencia[usuario]
+            peso = 1 / (len(adyacentes) * len(canciones_usuario))
+            for otra in canciones_usuario: llegadas[otra] += peso
+        propia = llegadas.pop(cancion, 0.0)
+        mejores = heapq.nlargest(k, llegadas.items(), key = itemgetter(1))
+        _agregar_lista(listas_canciones, mejores)
+        # un paso mas, hacia los usuarios, desde la cancion y sus mejores similares
+        llegadas_usuarios = defaultdict(float)
+        for otra, probabilidad in [(cancion, propia)] + mejores:
+            usuarios_otra = adyacencia[otra]
+            for usuario in usuarios_otra: llegadas_usuarios[usuario] += probabilidad / len(usuarios_otra)
+        _agregar_lista(listas_usuarios, heapq.nlargest(k, llegadas_usuarios.items(), key = itemgetter(1)))
+    return IndiceCoocurrencia(etiquetas, canciones, listas_canciones, listas_usuarios)
+
+#*******************************************************************
+#                           PERSISTENCIA
+#*******************************************************************
+
+# Recibe la ruta del archivo de canciones y devuelve la ruta por defecto de su indice
+def ruta_indice(ruta_archivo):
+    return ruta_archivo + EXTENSION_INDICE
+
+# Recibe la ruta del indice, la clave del archivo de canciones (ver instantanea.clave_archivo) y la cantidad K de
+# similares por cancion y devuelve el IndiceCoocurrencia guardado, o None si no existe, se construyó a partir de otra
+# version del archivo o con otro K, o está corrupto. Ademas de los CRC de las secciones (ver
+# instantanea.cargar_secciones) se comprueba que las listas sean consistentes y sus ids estén en rango
+def cargar_indice(ruta, clave, k = SIMILARES_POR_CANCION):
+    contenido = cargar_secciones(ruta, MAGIA)
+    if contenido is None: return None
+    cabecera, secciones = contenido
+    try:
+        if cabecera["version"] != VERSION or not clave.coincide(cabecera["clave"]) or cabecera["k"] != k: return None
+        listas = [tuple(secciones[prefijo + nombre] for nombre in (OFFSETS, IDS, PUNTAJES))
+                  for prefijo in (PREFIJO_CANCIONES, PREFIJO_USUARIOS)]
+        etiquetas, canciones = secciones[ETIQUETAS], secciones[CANCIONES]
+        if not ids_en_rango(canciones, len(etiquetas)): return None
+        for offsets, ids, puntajes in listas:
+            if not csr_valido(offsets, ids, len(canciones), len(etiquetas)) or len(puntajes) != len(ids): return None
+        return IndiceCoocurrencia(etiquetas, canciones, *listas)
+    except (KeyError, TypeError):
+        return None
+
+# Recibe la ruta del indice, la clave del archivo de canciones, el IndiceCoocurrencia y la cantidad K de similares con
+# la que se construyó y lo escribe en disco
+def guardar_indice(ruta, clave, indice, k = SIMILARES_POR_CANCION):
+    secciones = {ETIQUETAS: (TIPO_JSON, indice.etiquetas), CANCIONES: (TIPO_IDS, indice.canciones)}
+    for prefijo, listas in ((PREFIJO_CANCIONES, indice.listas_canciones), (PREFIJO_USUARIOS, indice.listas_usuarios)):
+        for nombre, tipo, contenido in zip((OFFSETS, IDS, PUNTAJES), (TIPO_OFFSETS, TIPO_IDS, TIPO_RANKS), listas):
+            secciones[prefijo + nombre] = (tipo, contenido)
+    guardar_secciones(ruta, MAGIA, {"version": VERSION, "clave": clave.datos(), "k": k}, secciones)
@@ -1,3 +1,3 @@
-recomendify: recomendify.py grafo.py funciones_grafos.py
+recomendify: recomendify.py grafo.py grafo_csr.py grafo_disco.py etiquetas.py componentes.py instrumentacion.py proyeccion.py instantanea.py coocurrencia.py cache_comandos.py servidor.py funciones_grafos.py
 	cp recomendify.py recomendify
 	chmod +x recomendify
\ No newline at end of file
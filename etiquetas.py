@@ -0,0 +1,45 @@
+#*******************************************************************
+#                     DICCIONARIO DE ETIQUETAS
+#*******************************************************************
+
+# Un DiccionarioEtiquetas asigna a cada etiqueta distinta (nombre de cancion, usuario o playlist) un codigo entero,
+# en el orden en que aparece por primera vez, y guarda una unica copia de cada una. El GrafoCSR guarda solo los
+# codigos y decodifica las etiquetas al devolverlas; el Grafo de diccionarios guarda referencias a la copia unica
+# (la etiqueta canonica), por lo que las etiquetas que se repiten en millones de filas del archivo de canciones
+# ocupan memoria una sola vez.
+
+class DiccionarioEtiquetas:
+
+    # Crea un diccionario con las etiquetas recibidas (si se pasan), codificadas en ese orden
+    def __init__(self, etiquetas = ()):
+        self.etiquetas = []
+        self.codigos = {}
+        for etiqueta in etiquetas: self.codificar(etiqueta)
+
+    # Devuelve el codigo de la etiqueta recibida, asignandole uno nuevo si es la primera vez que aparece
+    def codificar(self, etiqueta):
+        codigo = self.codigos.get(etiqueta)
+        if codigo is None:
+            codigo = len(self.etiquetas)
+            self.codigos[etiqueta] = codigo
+            self.etiquetas.append(etiqueta)
+        return codigo
+
+    # Devuelve el codigo de la etiqueta recibida, o None si no está en el diccionario
+    def codigo(self, etiqueta):
+        return self.codigos.get(etiqueta)
+
+    # Devuelve la etiqueta correspondiente al codigo recibido
+    def decodificar(self, codigo):
+        return self.etiquetas[codigo]
+
+    # Devuelve la copia unica de la etiqueta recibida (la primera que se codificó igual a ella), agregandola si no
+    # estaba. Usar siempre la canonica evita guardar copias iguales de la misma cadena
+    def canonica(self, etiqueta):
+        return self.etiquetas[self.codificar(etiqueta)]
+
+    def __contains__(self, etiqueta):
+        return etiqueta in self.codigos
+
+    def __len__(self):
+        return len(self.etiquetas)
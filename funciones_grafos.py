@@ -1,7 +1,36 @@
 from grafo import Grafo
+from grafo_csr import GrafoCSR, TIPO_OFFSETS, TIPO_IDS
+from instrumentacion import metricas
 from collections import deque
+from array import array
+from multiprocessing import Pool, current_process
 import heapq
-from random import randint
+from random import randint, Random
+from time import monotonic
+
+# NumPy es opcional: si está instalado se usa para los algoritmos vectorizados, si no se usa una version en Python
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Nombres con los que cada recorrido registra los vertices y aristas que visitó cuando la instrumentacion está activa.
+# Las aristas son las adyacencias revisadas de los vertices expandidos (en los Random Walks, los pasos dados)
+RECORRIDO_CAMINO = "camino_minimo"
+RECORRIDO_CAMINO_BIDIRECCIONAL = "camino_minimo_bidireccional"
+RECORRIDO_ARBOL_BFS = "arbol_bfs"
+RECORRIDO_CICLO = "ciclo_de_largo_n"
+RECORRIDO_CICLO_PODADO = "ciclo_de_largo_n_podado"
+RECORRIDO_DISTANCIAS = "distancias_acotadas"
+RECORRIDO_RANGO = "perfil_de_rango"
+RECORRIDO_PAGE_RANK = "page_ranks"
+RECORRIDO_PAGE_RANK_VECTORIZADO = "page_ranks_vectorizado"
+RECORRIDO_RANDOM_WALKS = "vertices_similares"
+RECORRIDO_RANDOM_WALKS_LOTE = "vertices_similares_lote"
+RECORRIDO_PAGE_RANK_PUSH = "page_rank_personalizado_push"
+
+# Cantidad maxima de aristas que el PageRank vectorizado procesa a la vez
+ARISTAS_POR_BLOQUE = 1 << 22
 
 #*******************************************************************
 #                     FUNCIONES AUXILIARES
@@ -14,15 +43,52 @@ from random import randint
 def reconstruir_camino(grafo, padre, origen, destino = None):
     if not padre: return None
     if not destino: destino = origen
+    # se arma el camino desde el destino hacia el origen y se invierte al final
     camino = []
     camino.append(destino)
     v = padre[destino]
     while v != origen:
-        camino.insert(0, v)
+        camino.append(v)
+        v = padre[v]
+    camino.append(v)
+    camino.reverse()
+    return camino
+
+# Recibe un diccionario de padres de un recorrido (donde el padre del origen es None) y un vertice alcanzado por el
+# recorrido y devuelve la lista de vertices desde ese vertice hasta el origen del recorrido
+# Complejidad: O(C)
+def camino_hasta_origen(padre, v):
+    camino = []
+    while v is not None:
+        camino.append(v)
         v = padre[v]
-    camino.insert(0, v)
     return camino
 
+# Recibe un grafo y devuelve una lista con sus vertices (la posicion de cada uno es su id) y los arreglos "offsets" y
+# "vecinos" de su adyacencia en formato CSR (los ids de los adyacentes del vertice i son vecinos[offsets[i]:offsets[i+1]]).
+# Si el grafo ya es un GrafoCSR devuelve directamente sus buffers, sin copiarlos. Si no, los arma y los guarda en el
+# grafo junto con su version, y mientras el grafo no cambie los siguientes pedidos los devuelven sin volver a armarlos
+# Complejidad: O(V + E) la primera vez para cada version del grafo, O(1) las siguientes
+def obtener_csr(grafo):
+    if isinstance(grafo, GrafoCSR): return grafo.etiquetas, grafo.offsets, grafo.vecinos
+    if grafo.cache_csr is not None and grafo.cache_csr[0] == grafo.version: return grafo.cache_csr[1]
+    version = grafo.version
+    vertices = grafo.obtener_vertices()
+    indices = {v: i for i, v in enumerate(vertices)}
+    offsets = array(TIPO_OFFSETS, [0])
+    vecinos = array(TIPO_IDS)
+    for v in vertices:
+        vecinos.extend(indices[w] for w in grafo.vista_adyacentes(v))
+        offsets.append(len(vecinos))
+    grafo.cache_csr = (version, (vertices, offsets, vecinos), indices)
+    return vertices, offsets, vecinos
+
+# Recibe un grafo y devuelve el diccionario de vertice a id de la adyacencia que devuelve obtener_csr
+def obtener_indices_csr(grafo):
+    if isinstance(grafo, GrafoCSR): return grafo.indices
+    obtener_csr(grafo)
+    return grafo.cache_csr[2]
+
 #*******************************************************************
 #                         CAMINO MÍNIMO
 #*******************************************************************
@@ -36,19 +102,91 @@ def camino_minimo_no_pesado(grafo, v, w):
     visitados.add(v)
     q = deque()
     q.append(v)
+    medir, aristas = metricas.activo, 0
     while len(q) != 0:
         x = q.popleft()
-        for y in grafo.adyacentes(x):
+        if medir: aristas += grafo.grado(x)
+        for y in grafo.vista_adyacentes(x):
             if y not in visitados:
                 q.append(y)
                 padre[y] = x
-                if y == w: return padre
+                if y == w:
+                    if medir: metricas.registrar_recorrido(RECORRIDO_CAMINO, len(visitados) + 1, aristas)
+                    return padre
                 visitados.add(y)
+    if medir: metricas.registrar_recorrido(RECORRIDO_CAMINO, len(visitados), aristas)
     return None
 
+# Recibe un grafo no pesado y no dirigido y dos vertices "v" y "w" y devuelve una lista con uno de los caminos mas
+# cortos para ir desde "v" hasta "w", o None si no existe. Hace dos BFS a la vez, una desde cada extremo, expandiendo
+# en cada vuelta un nivel completo de la frontera mas chica. Cuando un nivel alcanza vertices ya visitados desde el
+# otro extremo, el camino pasa por el que esté mas cerca de ese otro extremo
+# Complejidad: O(V + E) en el peor caso, pero en general visita muchos menos vertices que una BFS desde "v"
+def camino_minimo_bidireccional(grafo, v, w):
+    if v == w: return None
+    padres = ({v: None}, {w: None})
+    distancias = ({v: 0}, {w: 0})
+    fronteras = ([v], [w])
+    medir, aristas = metricas.activo, 0
+    while fronteras[0] and fronteras[1]:
+        lado = 0 if len(fronteras[0]) <= len(fronteras[1]) else 1
+        padre, distancia = padres[lado], distancias[lado]
+        distancia_otro = distancias[1 - lado]
+        proxima_frontera = []
+        encuentro = None
+        for x in fronteras[lado]:
+            if medir: aristas += grafo.grado(x)
+            for y in grafo.vista_adyacentes(x):
+                if y in padre: continue
+                padre[y] = x
+                distancia[y] = distancia[x] + 1
+                proxima_frontera.append(y)
+                if y in distancia_otro and (encuentro is None or distancia_otro[y] < distancia_otro[encuentro]):
+                    encuentro = y
+        if encuentro is not None:
+            if medir:
+                metricas.registrar_recorrido(RECORRIDO_CAMINO_BIDIRECCIONAL, len(padres[0]) + len(padres[1]), aristas)
+            camino = camino_hasta_origen(padres[0], encuentro)
+            camino.reverse()
+            camino.extend(camino_hasta_origen(padres[1], padres[1][encuentro]))
+            return camino
+        fronteras = (proxima_frontera, fronteras[1]) if lado == 0 else (fronteras[0], proxima_frontera)
+    if medir:
+        metricas.registrar_recorrido(RECORRIDO_CAMINO_BIDIRECCIONAL, len(padres[0]) + len(padres[1]), aristas)
+    return None
+
+# Recibe un grafo no pesado y un vertice "v" y devuelve un diccionario con el padre de cada vertice alcanzable desde
+# "v" (salvo el propio "v") en el arbol de una BFS completa. Los padres son los mismos que asigna
+# camino_minimo_no_pesado, por lo que con un unico recorrido se responden todos los caminos que salen de "v"
+# Complejidad: O(V + E)
+def arbol_bfs(grafo, v):
+    padre = {}
+    visitados = {v}
+    q = deque([v])
+    medir, aristas = metricas.activo, 0
+    while q:
+        x = q.popleft()
+        if medir: aristas += grafo.grado(x)
+        for y in grafo.vista_adyacentes(x):
+            if y not in visitados:
+                visitados.add(y)
+                padre[y] = x
+                q.append(y)
+    if medir: metricas.registrar_recorrido(RECORRIDO_ARBOL_BFS, len(visitados), aristas)
+    return padre
+
+# Recibe un grafo, el arbol de BFS desde "v" (ver arbol_bfs) y un vertice "w" y devuelve el mismo camino que
+# camino_minimo(grafo, v, w), o None si no existe
+# Complejidad: O(C)
+def camino_en_arbol(grafo, padre, v, w):
+    if w == v or w not in padre: return None
+    return reconstruir_camino(grafo, padre, v, w)
+
 # Recibe un grafo no pesado, dos vertices "v" y "w"" y devuelve una lista con uno de los caminos mas cortos para ir 
-# desde "v" hasta "w"
-def camino_minimo(grafo, v, w):
+# desde "v" hasta "w". Si "bidireccional" es True (y el grafo no es dirigido) busca el camino con una BFS desde cada
+# extremo, que suele ser mucho mas rapida en grafos grandes
+def camino_minimo(grafo, v, w, bidireccional = False):
+    if bidireccional: return camino_minimo_bidireccional(grafo, v, w)
     padre = camino_minimo_no_pesado(grafo, v, w)
     return reconstruir_camino(grafo, padre, v, w)
 
@@ -56,14 +194,32 @@ def camino_minimo(grafo, v, w):
 #                     CICLO DE N VERTICES
 #*******************************************************************
 
+class GrafoContado:
+
+    # Envuelve un grafo para los recorridos instrumentados en los que llevar la cuenta dentro del propio recorrido lo
+    # haria mas lento aun sin instrumentacion: cuenta cada vertice cuyos adyacentes se piden (expandidos) y las
+    # aristas revisadas. El resto de las primitivas son las del grafo envuelto
+    def __init__(self, grafo):
+        self.grafo = grafo
+        self.expandidos = 0
+        self.aristas = 0
+
+    def vista_adyacentes(self, v):
+        self.expandidos += 1
+        self.aristas += self.grafo.grado(v)
+        return self.grafo.vista_adyacentes(v)
+
+    def __getattr__(self, nombre):
+        return getattr(self.grafo, nombre)
+
 # Recibe un grafo, el origen del ciclo, el anterior del vertice actual, el largo del ciclo n, el largo del camino 
 # actual, los vertices visitados actuales y un diccionario de los padres de los vertices visitados. Si se llego al 
 # origen y el largo del camino es igual al pedido se devuelve una lista con el camino. Si no existe el ciclo de largo
-# n pedido se devuelve False.
+# n pedido se devuelve False
 # Complejidad: O(V^n)
 def _ciclo_largo_n(grafo, origen, anterior, n, saltos, visitados, padre):
     if saltos > n: return False
-    for w in grafo.adyacentes(anterior): 
+    for w in grafo.vista_adyacentes(anterior):
         if w == origen:
             if saltos == n:
                 padre[origen] = anterior
@@ -85,33 +241,170 @@ def ciclo_de_largo_n(grafo, origen, n):
     visitados.add(origen)
     padre = {}
     padre[origen] = None
-    camino = _ciclo_largo_n(grafo, origen, origen, n, 1, visitados, padre)
+    if not metricas.activo: return _ciclo_largo_n(grafo, origen, origen, n, 1, visitados, padre)
+    contado = GrafoContado(grafo)
+    camino = _ciclo_largo_n(contado, origen, origen, n, 1, visitados, padre)
+    metricas.registrar_recorrido(RECORRIDO_CICLO, contado.expandidos, contado.aristas)
     return camino
 
+# Recibe un grafo no dirigido, un vertice y una distancia maxima y devuelve un diccionario con la distancia en saltos
+# desde el vertice a cada vertice que esté a lo sumo a esa distancia
+# Complejidad: O(V + E) en el peor caso
+def distancias_acotadas(grafo, v, distancia_max):
+    distancias = {v: 0}
+    frontera = [v]
+    medir, aristas = metricas.activo, 0
+    for distancia in range(1, distancia_max + 1):
+        proxima_frontera = []
+        for x in frontera:
+            if medir: aristas += grafo.grado(x)
+            for y in grafo.vista_adyacentes(x):
+                if y not in distancias:
+                    distancias[y] = distancia
+                    proxima_frontera.append(y)
+        if not proxima_frontera: break
+        frontera = proxima_frontera
+    if medir: metricas.registrar_recorrido(RECORRIDO_DISTANCIAS, len(distancias), aristas)
+    return distancias
+
+# Devuelve True si se agotó alguno de los limites de la busqueda de ciclos (None si no tiene limite)
+def _presupuesto_agotado(expansiones, expansiones_max, tiempo_limite):
+    if expansiones_max is not None and expansiones > expansiones_max: return True
+    return tiempo_limite is not None and monotonic() > tiempo_limite
+
+# Cada cuantas expansiones se consulta el reloj en la busqueda de ciclos
+EXPANSIONES_POR_CONSULTA_TIEMPO = 1024
+
+# Devuelve una lista con el ciclo de largo n que vuelve al vertice origen, con el mismo formato que ciclo_de_largo_n,
+# o False si no existe. La busqueda es iterativa sobre un unico camino que se extiende y se deshace, y descarta todo
+# vertice cuya distancia al origen sea mayor a los saltos que quedan para cerrar el ciclo (por eso solo pueden formar
+# parte del ciclo los vertices a distancia n/2 o menos). Los adyacentes se prueban de mayor a menor grado. Si se pasa
+# una cantidad maxima de segundos o de expansiones (vertices agregados al camino) y se agota antes de terminar,
+# devuelve None, indicando que no se encontró resultado dentro de esos limites
+# Complejidad: O(V^n) en el peor caso
+def ciclo_de_largo_n_podado(grafo, origen, n, segundos_max = None, expansiones_max = None):
+    if n < 1: return False
+    tiempo_limite = monotonic() + segundos_max if segundos_max is not None else None
+    distancias = distancias_acotadas(grafo, origen, n // 2)
+    # el grado de cada vertice se calcula una unica vez por busqueda: en la proyeccion del grafo de canciones
+    # calcularlo arma los adyacentes a dos saltos, y sin este memo se desbordaria su cache
+    grados = {}
+    def grado(v):
+        if v not in grados: grados[v] = grafo.grado(v)
+        return grados[v]
+
+    camino = [origen]
+    en_camino = {origen}
+    pendientes = [None]
+    expansiones = 0
+    medir, aristas = metricas.activo, 0
+    while camino:
+        x = camino[-1]
+        saltos = len(camino)
+        if pendientes[-1] is None:
+            adyacentes = grafo.vista_adyacentes(x)
+            if medir: aristas += grado(x)
+            # si con un salto mas se completan los n, solo interesa si se puede volver al origen
+            if saltos == n:
+                if origen in adyacentes:
+                    if medir: metricas.registrar_recorrido(RECORRIDO_CICLO_PODADO, expansiones + 1, aristas)
+                    return camino + [origen]
+                candidatos = []
+            else:
+                restantes = n - saltos
+                candidatos = [w for w in adyacentes if w not in en_camino and distancias.get(w, restantes + 1) <= restantes]
+                candidatos.sort(key = grado)
+            pendientes[-1] = candidatos
+        if not pendientes[-1]:
+            # no quedan adyacentes por probar desde x: se deshace el ultimo paso
+            pendientes.pop()
+            en_camino.discard(camino.pop())
+            continue
+        w = pendientes[-1].pop()
+        camino.append(w)
+        en_camino.add(w)
+        pendientes.append(None)
+        expansiones += 1
+        if expansiones % EXPANSIONES_POR_CONSULTA_TIEMPO == 0 or expansiones_max is not None:
+            if _presupuesto_agotado(expansiones, expansiones_max, tiempo_limite):
+                if medir: metricas.registrar_recorrido(RECORRIDO_CICLO_PODADO, expansiones + 1, aristas)
+                return None
+    if medir: metricas.registrar_recorrido(RECORRIDO_CICLO_PODADO, expansiones + 1, aristas)
+    return False
+
 #*******************************************************************
 #                       TODOS EN RANGO N
 #*******************************************************************
 
-# Recibe un grafo un vertice y la distancia en saltos n que deben estar los vertices desados del vertice v y devuelve
-# la cantidad de vertices que se encuentran a esa distancia n
+# Recibe un GrafoCSR, el id de un vertice y una distancia maxima n y devuelve la cantidad de vertices a cada
+# distancia de 0 a n (ver perfil_de_rango). Las fronteras son listas de ids y los visitados un arreglo de bytes
+def _perfil_de_rango_csr(grafo, i, n):
+    offsets, vecinos = grafo.offsets, grafo.vecinos
+    visitados = bytearray(len(grafo))
+    visitados[i] = 1
+    frontera = [i]
+    perfil = [1]
+    medir, aristas = metricas.activo, 0
+    while len(perfil) <= n:
+        proxima_frontera = []
+        for x in frontera:
+            if medir: aristas += offsets[x + 1] - offsets[x]
+            for y in vecinos[offsets[x]:offsets[x + 1]]:
+                if not visitados[y]:
+                    visitados[y] = 1
+                    proxima_frontera.append(y)
+        if not proxima_frontera: break
+        perfil.append(len(proxima_frontera))
+        frontera = proxima_frontera
+    if medir: metricas.registrar_recorrido(RECORRIDO_RANGO, sum(perfil), aristas)
+    return perfil
+
+# Recibe un grafo no pesado, un vertice v y una distancia maxima n y devuelve una lista con la cantidad de vertices
+# que se encuentran a cada distancia en saltos de v, desde 0 hasta n. Recorre el grafo de a un nivel y se detiene
+# en el nivel n. Si la lista tiene menos de n + 1 elementos es porque no hay vertices a mayor distancia
+# Complejidad: O(V + E) (solo de los vertices a distancia menor a n y sus aristas)
+def perfil_de_rango(grafo, v, n):
+    if isinstance(grafo, GrafoCSR): return _perfil_de_rango_csr(grafo, grafo.indice(v), n)
+    visitados = {v}
+    frontera = [v]
+    perfil = [1]
+    medir, aristas = metricas.activo, 0
+    while len(perfil) <= n:
+        proxima_frontera = []
+        for x in frontera:
+            if medir: aristas += grafo.grado(x)
+            for y in grafo.vista_adyacentes(x):
+                if y not in visitados:
+                    visitados.add(y)
+                    proxima_frontera.append(y)
+        if not proxima_frontera: break
+        perfil.append(len(proxima_frontera))
+        frontera = proxima_frontera
+    if medir: metricas.registrar_recorrido(RECORRIDO_RANGO, len(visitados), aristas)
+    return perfil
+
+# Recibe un grafo no pesado, un vertice y la distancia en saltos n que deben estar los vertices desados del vertice v
+# y devuelve la cantidad de vertices que se encuentran a esa distancia n
 # Complejidad: O(V + E)
 def cantidad_de_rango_n(grafo, v, n):
-    distancias = {}
-    distancias[v] = 0
-    q = deque()
-    q.append(v)
-    while len(q) != 0:
-        x = q.popleft()
-        if distancias[x] > n: 
-            continue
-        for y in grafo.adyacentes(x):
-            if y not in distancias:
-                q.append(y)
-                distancias[y] = distancias[x] + grafo.peso_arista(x, y)
-    vertices_a_distancia_n = set()
-    for vertice, distancia in distancias.items():
-        if distancia == n: vertices_a_distancia_n.add(vertice)
-    return len(vertices_a_distancia_n)
+    perfil = perfil_de_rango(grafo, v, n)
+    return perfil[n] if n < len(perfil) else 0
+
+# Igual que cantidad_de_rango_n, pero guarda el perfil de distancias de cada vertice en "perfiles" (un OrderedDict
+# que se mantiene con a lo sumo "tamanio_max" vertices, descartando los usados hace mas tiempo), de modo que las
+# consultas siguientes desde el mismo vertice con un n menor o igual (o mayor, si ya no había mas vertices) se
+# responden sin recorrer el grafo
+def cantidad_de_rango_n_con_cache(grafo, v, n, perfiles, tamanio_max):
+    perfil = perfiles.get(v)
+    # el perfil sirve si llega hasta n o si es completo (termino antes de n porque no habia mas vertices)
+    if perfil is None or (len(perfil) <= n and perfil[-1] != 0):
+        perfil = perfil_de_rango(grafo, v, n)
+        # si el recorrido terminó antes de n se marca el perfil como completo con un 0 al final
+        if len(perfil) <= n: perfil.append(0)
+        perfiles[v] = perfil
+        if len(perfiles) > tamanio_max: perfiles.popitem(last = False)
+    perfiles.move_to_end(v)
+    return perfil[n] if n < len(perfil) else 0
 
 #*******************************************************************
 #                     N VERTICES MAS IMPORTANTES
@@ -121,8 +414,8 @@ def cantidad_de_rango_n(grafo, v, n):
 # y devuelve el numero que representa la importancia del vertice dentro del grafo de acuerdo a la formula de pagerank
 def page_rank_vertice(grafo, v, amortiguacion, page_ranks):
     sumatoria_ady = 0
-    for w in grafo.adyacentes(v):
-        sumatoria_ady += page_ranks.get(w, 0.1) / len(grafo.adyacentes(w))
+    for w in grafo.vista_adyacentes(v):
+        sumatoria_ady += page_ranks.get(w, 0.1) / grafo.grado(w)
     rank = (1 -  amortiguacion) / len(grafo) +  amortiguacion * sumatoria_ady
     return rank
 
@@ -136,8 +429,93 @@ def page_ranks(grafo, amortiguacion, iteraciones):
     for i in range(iteraciones):
         for v in grafo.obtener_vertices():
             page_ranks[v] = page_rank_vertice(grafo, v, amortiguacion, page_ranks)
+    if metricas.activo:
+        aristas = sum([grafo.grado(v) for v in grafo.obtener_vertices()])
+        metricas.registrar_recorrido(RECORRIDO_PAGE_RANK, len(grafo) * iteraciones, aristas * iteraciones)
     return page_ranks
 
+# Recibe la adyacencia de un grafo en formato CSR, un coeficiente de amortiguacion, una tolerancia y un maximo de
+# iteraciones y aplica el metodo de las potencias con NumPy: en cada iteracion calcula el pagerank de todos los
+# vertices a la vez (multiplicando por la matriz de transicion, guardada como pares fila/columna) hasta que la suma de
+# las diferencias con la iteracion anterior sea menor a la tolerancia. Arranca desde el vector "iniciales" si se
+# pasó, o desde el mismo valor para todos los vertices si no. Devuelve el vector de pageranks, la cantidad de
+# iteraciones realizadas y el residuo final. La adyacencia se recorre en orden, por bloques de vertices con a lo sumo
+# ARISTAS_POR_BLOQUE aristas, de modo que la memoria extra no depende de la cantidad de aristas (que pueden estar en
+# un archivo mapeado en memoria, ver grafo_disco.py); la suma de cada vertice no cambia al separar en bloques
+def _page_ranks_numpy(cantidad, offsets, vecinos, amortiguacion, tolerancia, iteraciones_max, iniciales = None):
+    offsets = np.frombuffer(offsets, dtype = np.int64)
+    columnas = np.frombuffer(vecinos, dtype = np.int32)
+    grados = np.diff(offsets)
+    bloques = _bloques_csr(offsets, ARISTAS_POR_BLOQUE)
+    # con un solo bloque las filas de la matriz se calculan una unica vez; con varios, en cada iteracion
+    filas = np.repeat(np.arange(cantidad), grados) if len(bloques) == 1 else None
+    # los vertices sin adyacentes nunca aparecen como columna, se evita dividir por cero
+    inversa_grados = 1.0 / np.maximum(grados, 1)
+    ranks = np.full(cantidad, 1.0 / cantidad) if iniciales is None else np.array(iniciales, dtype = np.float64)
+    base = (1 - amortiguacion) / cantidad
+    iteraciones, residuo = 0, float("inf")
+    while iteraciones < iteraciones_max and residuo > tolerancia:
+        salientes = ranks * inversa_grados
+        sumas = np.empty(cantidad)
+        for inicio, fin in bloques:
+            filas_bloque = filas if filas is not None else np.repeat(np.arange(fin - inicio), grados[inicio:fin])
+            transferencias = salientes[columnas[offsets[inicio]:offsets[fin]]]
+            sumas[inicio:fin] = np.bincount(filas_bloque, weights = transferencias, minlength = fin - inicio)
+        nuevos = base + amortiguacion * sumas
+        residuo = float(np.abs(nuevos - ranks).sum())
+        ranks = nuevos
+        iteraciones += 1
+    return ranks.tolist(), iteraciones, residuo
+
+# Recibe los offsets de una adyacencia en formato CSR (como arreglo de NumPy) y una cantidad de aristas y devuelve la
+# lista de rangos (inicio, fin) de vertices consecutivos que la dividen en bloques de a lo sumo esa cantidad de
+# aristas (o de un unico vertice, si él solo tiene mas)
+def _bloques_csr(offsets, aristas_por_bloque):
+    cantidad = len(offsets) - 1
+    bloques = []
+    inicio = 0
+    while inicio < cantidad:
+        fin = int(np.searchsorted(offsets, offsets[inicio] + aristas_por_bloque, side = "right")) - 1
+        fin = min(max(fin, inicio + 1), cantidad)
+        bloques.append((inicio, fin))
+        inicio = fin
+    return bloques
+
+# Version en Python puro de _page_ranks_numpy, usada cuando NumPy no está instalado
+def _page_ranks_python(cantidad, offsets, vecinos, amortiguacion, tolerancia, iteraciones_max, iniciales = None):
+    inversa_grados = [1 / max(offsets[i + 1] - offsets[i], 1) for i in range(cantidad)]
+    ranks = [1 / cantidad] * cantidad if iniciales is None else list(iniciales)
+    base = (1 - amortiguacion) / cantidad
+    iteraciones, residuo = 0, float("inf")
+    while iteraciones < iteraciones_max and residuo > tolerancia:
+        transferencias = [rank * inversa for rank, inversa in zip(ranks, inversa_grados)]
+        nuevos = [base + amortiguacion * sum([transferencias[w] for w in vecinos[offsets[v]:offsets[v + 1]]])
+                  for v in range(cantidad)]
+        residuo = sum([abs(nuevo - rank) for nuevo, rank in zip(nuevos, ranks)])
+        ranks = nuevos
+        iteraciones += 1
+    return ranks, iteraciones, residuo
+
+# Recibe un grafo, un coeficiente de amortiguacion, una tolerancia y un maximo de iteraciones y devuelve un 
+# diccionario con los vertices de clave y su pagerank como valor, la cantidad de iteraciones que se realizaron y el
+# residuo (suma de las diferencias entre las dos ultimas iteraciones). Usa la misma formula que page_ranks, pero
+# calculando todos los vertices a la vez sobre la adyacencia en formato CSR y cortando cuando converge. Si se pasa
+# un diccionario "iniciales" (por ejemplo el pagerank de una version anterior del grafo) se arranca desde esos
+# valores, y los vertices que no estén en él desde el valor inicial de siempre: tras un cambio chico en el grafo
+# converge en muchas menos iteraciones
+# Complejidad: O(I * (V + E)) (I es la cantidad de iteraciones hasta converger)
+def page_ranks_vectorizado(grafo, amortiguacion, tolerancia, iteraciones_max, iniciales = None):
+    vertices, offsets, vecinos = obtener_csr(grafo)
+    if len(vertices) == 0: return {}, 0, 0.0
+    if iniciales is not None: iniciales = [iniciales.get(v, 1 / len(vertices)) for v in vertices]
+    motor = _page_ranks_numpy if np else _page_ranks_python
+    ranks, iteraciones, residuo = motor(len(vertices), offsets, vecinos, amortiguacion, tolerancia, iteraciones_max,
+                                        iniciales)
+    if metricas.activo:
+        metricas.registrar_recorrido(RECORRIDO_PAGE_RANK_VECTORIZADO, len(vertices) * iteraciones,
+                                     len(vecinos) * iteraciones)
+    return dict(zip(vertices, ranks)), iteraciones, residuo
+
 # Recibe un grafo, un coeficiente de amortiguacion, un numero deseado de iteraciones y la cantidad de elementos que 
 # se quiere devolver y devuelve los n vertices mas importances del grafo segun el algoritmo pageranks
 def n_vertices_mas_importantes(grafo, amortiguacion, iteraciones, n):
@@ -155,11 +533,11 @@ def n_vertices_mas_importantes(grafo, amortiguacion, iteraciones, n):
 # de valores según el algoritmo para cada vertice cruzado en el recorrido
 def page_rank_random_walk(grafo, v, valores, largo, recorridos):
     if recorridos == largo: return valores
-    ady = grafo.adyacentes(v)
-    if len(ady) == 0: return valores
-    pos_aleatoria = randint(0, len(ady) - 1)
-    proximo = ady[pos_aleatoria]
-    transferencia = valores[v] / len(ady)
+    grado = grafo.grado(v)
+    if grado == 0: return valores
+    pos_aleatoria = randint(0, grado - 1)
+    proximo = grafo.adyacente(v, pos_aleatoria)
+    transferencia = valores[v] / grado
     valores[v] -= transferencia
     if proximo not in valores: valores[proximo] = 0
     valores[proximo] += transferencia
@@ -177,4 +555,180 @@ def vertices_similares(grafo, vertices, largo, iteraciones):
         for v in vertices:
             recorridos = 0
             page_rank_random_walk(grafo, v, valores, largo, recorridos)
-    return valores
\ No newline at end of file
+    # los recorridos solo se cortan antes en vertices sin adyacentes, que el grafo bipartito no tiene
+    if metricas.activo:
+        metricas.registrar_recorrido(RECORRIDO_RANDOM_WALKS, len(valores), len(vertices) * iteraciones * largo)
+    return valores
+
+# Recibe un grafo, una lista de vertices semilla, la probabilidad "alfa" de volver a las semillas en cada paso y una
+# tolerancia "epsilon" y devuelve un diccionario con el pagerank personalizado aproximado de los vertices alcanzados,
+# con el metodo de empuje local (push): cada vertice tiene un residuo (la masa que todavia no se repartió), que
+# empieza repartido en partes iguales entre las semillas. Empujar un vertice le suma "alfa" veces su residuo a su
+# puntaje y reparte el resto en partes iguales entre sus adyacentes. Solo se empujan los vertices cuyo residuo supera
+# epsilon por su grado, en orden de llegada, por lo que se recorre solo el vecindario relevante de las semillas y el
+# resultado es siempre el mismo. Al terminar, el error de cada puntaje es a lo sumo epsilon por el grado del vertice
+# Complejidad: O(1 / (alfa * epsilon)) aristas revisadas, sin importar el tamaño del grafo
+def page_rank_personalizado_push(grafo, vertices, alfa, epsilon):
+    residuos = {}
+    for v in vertices: residuos[v] = residuos.get(v, 0) + 1 / len(vertices)
+    puntajes = {}
+    cola = deque(residuos)
+    en_cola = set(cola)
+    aristas = 0
+    while cola:
+        u = cola.popleft()
+        en_cola.discard(u)
+        residuo = residuos.pop(u)
+        puntajes[u] = puntajes.get(u, 0) + alfa * residuo
+        grado = grafo.grado(u)
+        # la masa que llega a un vertice sin adyacentes no se reparte
+        if grado == 0: continue
+        aristas += grado
+        transferencia = (1 - alfa) * residuo / grado
+        for w in grafo.vista_adyacentes(u):
+            residuo_w = residuos.get(w, 0) + transferencia
+            residuos[w] = residuo_w
+            if w not in en_cola and residuo_w > epsilon * grafo.grado(w):
+                cola.append(w)
+                en_cola.add(w)
+    if metricas.activo: metricas.registrar_recorrido(RECORRIDO_PAGE_RANK_PUSH, len(puntajes), aristas)
+    return puntajes
+
+# Recibe la adyacencia de un grafo en formato CSR, la lista de ids de los vertices desde los que parte cada Random
+# Walk, el largo de los recorridos y una semilla, y hace los recorridos uno detras de otro, de forma iterativa, con la
+# regla de transferencia de page_rank_random_walk: es el mismo estimador que vertices_similares, y con la misma
+# semilla elige los mismos adyacentes que este despues de random.seed(semilla). Devuelve el diccionario de valores por
+# id de los vertices alcanzados, en el orden en que fueron alcanzados por primera vez
+def _recorridos_secuenciales(cantidad, offsets, vecinos, origenes, largo, semilla):
+    aleatorio = Random(semilla)
+    valores = dict.fromkeys(origenes, 1.0)
+    for v in origenes:
+        for _ in range(largo):
+            inicio = offsets[v]
+            grado = offsets[v + 1] - inicio
+            # el recorrido termina si llega a un vertice sin adyacentes
+            if grado == 0: break
+            proximo = vecinos[inicio + aleatorio.randint(0, grado - 1)]
+            transferencia = valores[v] / grado
+            valores[v] -= transferencia
+            valores[proximo] = valores.get(proximo, 0) + transferencia
+            v = proximo
+    return valores
+
+# Recibe lo mismo que _recorridos_secuenciales y avanza todos los recorridos a la vez, un paso por vuelta, con la
+# regla de transferencia de page_rank_random_walk (el vertice le pasa al siguiente su valor dividido su grado).
+# No es el mismo estimador que vertices_similares sino una aproximacion: alla cada recorrido se hace completo antes
+# de empezar el siguiente, por lo que ve los valores que dejaron todos los anteriores, y aca el paso i de cada
+# recorrido solo ve los valores que dejaron los pasos anteriores a i. Dentro de un paso, si k recorridos salen del
+# mismo vertice de valor x y grado g, el j-esimo (desde 0) se lleva x * (1 - 1/g)^j / g, como si salieran uno detras
+# de otro. Los valores (y por lo tanto las recomendaciones) pueden diferir de los del motor recursivo. Devuelve el
+# diccionario de valores por id de los vertices con valor distinto de 0, en orden de id
+def _recorridos_python(cantidad, offsets, vecinos, origenes, largo, semilla):
+    aleatorio = Random(semilla)
+    valores = [0.0] * cantidad
+    for origen in origenes: valores[origen] = 1.0
+    posiciones = list(origenes)
+    for _ in range(largo):
+        if not posiciones: break
+        movimientos = []
+        salidas = {}
+        for v in posiciones:
+            grado = offsets[v + 1] - offsets[v]
+            # el recorrido termina si llega a un vertice sin adyacentes
+            if grado == 0: continue
+            j = salidas.get(v, 0)
+            salidas[v] = j + 1
+            proximo = vecinos[offsets[v] + int(aleatorio.random() * grado)]
+            movimientos.append((v, proximo, valores[v] * (1 - 1 / grado) ** j / grado))
+        for v, proximo, transferencia in movimientos:
+            valores[v] -= transferencia
+            valores[proximo] += transferencia
+        posiciones = [proximo for _, proximo, _ in movimientos]
+    return {i: valor for i, valor in enumerate(valores) if valor != 0}
+
+# Version vectorizada con NumPy de _recorridos_python: mismo estimador, con otro generador de numeros aleatorios
+def _recorridos_numpy(cantidad, offsets, vecinos, origenes, largo, semilla):
+    aleatorio = np.random.default_rng(semilla)
+    offsets = np.frombuffer(offsets, dtype = np.int64)
+    vecinos = np.frombuffer(vecinos, dtype = np.int32)
+    grados = np.diff(offsets)
+    valores = np.zeros(cantidad)
+    posiciones = np.array(origenes, dtype = np.int64)
+    valores[posiciones] = 1.0
+    for _ in range(largo):
+        posiciones = posiciones[grados[posiciones] > 0]
+        if len(posiciones) == 0: break
+        grados_posiciones = grados[posiciones]
+        # orden de salida (j) de cada recorrido entre los que están en el mismo vertice
+        orden = np.argsort(posiciones, kind = "stable")
+        ordenadas = posiciones[orden]
+        indices = np.arange(len(ordenadas))
+        inicio_grupo = np.maximum.accumulate(np.where(np.r_[True, ordenadas[1:] != ordenadas[:-1]], indices, 0))
+        salidas = np.empty_like(indices)
+        salidas[orden] = indices - inicio_grupo
+        transferencias = valores[posiciones] * (1 - 1 / grados_posiciones) ** salidas / grados_posiciones
+        saltos = (aleatorio.random(len(posiciones)) * grados_posiciones).astype(np.int64)
+        proximos = vecinos[offsets[posiciones] + saltos]
+        valores -= np.bincount(posiciones, weights = transferencias, minlength = cantidad)
+        valores += np.bincount(proximos, weights = transferencias, minlength = cantidad)
+        posiciones = proximos
+    alcanzados = np.flatnonzero(valores)
+    return dict(zip(alcanzados.tolist(), valores[alcanzados].tolist()))
+
+# Adyacencia en formato CSR que usan los procesos del pool de vertices_similares_lote (se hereda al crearlos)
+_csr_recorridos = None
+
+# Recibe la adyacencia en formato CSR y la guarda para que la use _recorrer_grupo. Se ejecuta al crearse cada proceso
+# del pool
+def _inicializar_proceso_recorridos(cantidad, offsets, vecinos):
+    global _csr_recorridos
+    _csr_recorridos = (cantidad, offsets, vecinos)
+
+# Recibe el motor, los origenes, el largo y la semilla de un grupo de recorridos y los realiza en un proceso del pool
+def _recorrer_grupo(grupo):
+    cantidad, offsets, vecinos = _csr_recorridos
+    motor, origenes, largo, semilla = grupo
+    return motor(cantidad, offsets, vecinos, origenes, largo, semilla)
+
+# Recibe un grafo, una lista de vertices a los que se le quiere encontrar vertices similares, el largo de los Random
+# Walks, la cantidad de iteraciones, una semilla (o None), una cantidad de procesos y si se usa el motor vectorizado,
+# y devuelve un diccionario de valores como el de vertices_similares. Los recorridos se hacen de forma iterativa
+# sobre la adyacencia en formato CSR, por lo que no hay limite de recursion, y con la misma semilla el resultado es
+# siempre el mismo. Con un solo proceso y sin el motor vectorizado es el mismo estimador que vertices_similares (ver
+# _recorridos_secuenciales). El motor vectorizado avanza todos los recorridos a la vez (ver _recorridos_python), lo
+# que es una aproximacion con otros valores. Si se pide mas de un proceso, las iteraciones se reparten entre ellos
+# (el proceso i usa la semilla + i) y se suman las transferencias de cada grupo: tambien es una aproximacion, ya que
+# los recorridos de un grupo no ven los valores que dejan los de los otros
+# Complejidad: O(iteraciones * len(vertices) * largo) mas la conversion a CSR si el grafo no es un GrafoCSR
+def vertices_similares_lote(grafo, vertices, largo, iteraciones, semilla = None, procesos = 1, vectorizado = False):
+    etiquetas, offsets, vecinos = obtener_csr(grafo)
+    indices = obtener_indices_csr(grafo)
+    semillas = [indices[v] for v in vertices]
+    cantidad = len(etiquetas)
+    procesos = max(1, min(procesos, iteraciones))
+    motor = _recorridos_secuenciales
+    if vectorizado: motor = _recorridos_numpy if np else _recorridos_python
+    if procesos == 1:
+        valores = motor(cantidad, offsets, vecinos, semillas * iteraciones, largo, semilla)
+    else:
+        grupos = []
+        for i in range(procesos):
+            iteraciones_grupo = iteraciones // procesos + (1 if i < iteraciones % procesos else 0)
+            grupos.append((motor, semillas * iteraciones_grupo, largo, None if semilla is None else semilla + i))
+        if current_process().daemon:
+            # un proceso de un pool no puede crear otro pool: los grupos se recorren aca, con el mismo resultado
+            _inicializar_proceso_recorridos(cantidad, offsets, vecinos)
+            resultados = [_recorrer_grupo(grupo) for grupo in grupos]
+        else:
+            with Pool(procesos, _inicializar_proceso_recorridos, (cantidad, offsets, vecinos)) as pool:
+                resultados = pool.map(_recorrer_grupo, grupos)
+        # cada grupo arrancó con valor 1 en cada vertice pasado: se suman sus diferencias respecto de ese inicio
+        valores = {}
+        for valores_grupo in resultados:
+            for i, valor in valores_grupo.items(): valores[i] = valores.get(i, 0) + valor
+        for i in set(semillas): valores[i] = valores.get(i, 0) - (procesos - 1)
+    similares = {etiquetas[i]: valor for i, valor in valores.items()}
+    if metricas.activo:
+        metricas.registrar_recorrido(RECORRIDO_RANDOM_WALKS_LOTE, len(similares), len(vertices) * iteraciones * largo)
+    for v in vertices: similares.setdefault(v, 0)
+    return similares
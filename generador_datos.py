@@ -0,0 +1,107 @@
+from random import Random
+from itertools import accumulate
+import sys
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Genera archivos de canciones sinteticos con el mismo formato que lee recomendify.py, para medir su rendimiento con
+# distintos tamaños. La popularidad de usuarios, canciones y nombres de playlist sigue una ley de potencias (Zipf):
+# pocos usuarios tienen muchas canciones y pocas canciones aparecen en muchas playlists, como en los datos reales.
+# Uso: python3 generador_datos.py FILAS [archivo] [--semilla=N]
+
+COLUMNAS = ("ID", "USER_ID", "TRACK_NAME", "ARTIST", "PLAYLIST_ID", "PLAYLIST_NAME", "GENRES")
+SEPARADOR_ARCHIVO = "\t"
+SEPARADOR_GENEROS = ","
+PREFIJO_OPCION_SEMILLA = "--semilla="
+
+# Proporciones respecto de la cantidad de filas (con un minimo para archivos chicos)
+FILAS_POR_USUARIO = 50
+FILAS_POR_CANCION = 8
+CANCIONES_POR_ARTISTA = 10
+MINIMO_USUARIOS = 10
+MINIMO_CANCIONES = 50
+PLAYLISTS_POR_USUARIO = 5
+
+# Exponentes de la ley de potencias: cuanto mayores, mas concentrada la popularidad. La de los usuarios es menor
+# porque un usuario con muchas canciones hace crecer al cuadrado las aristas del grafo de canciones
+EXPONENTE_USUARIOS = 0.5
+EXPONENTE_CANCIONES = 0.8
+EXPONENTE_PLAYLISTS = 1.0
+
+# Cantidad de filas que se generan y escriben juntas
+FILAS_POR_LOTE = 100000
+
+NOMBRES_PLAYLISTS = ("Favoritas", "Para correr", "Rock nacional", "Chill", "Viaje", "Estudiar", "Fiesta", "Clasicos",
+                     "Descubrimiento semanal", "Mix diario", "Entrenamiento", "Domingo", "Noche", "Verano", "Oficina")
+GENEROS = ("Rock", "Pop", "Hip-Hop", "Indie", "Electronic", "Jazz", "Folk", "Metal", "Reggaeton", "Tango",
+           "Blues", "Classical", "R&B", "Punk", "Cumbia")
+
+#*******************************************************************
+#                           GENERADOR
+#*******************************************************************
+
+# Recibe una cantidad de elementos y un exponente y devuelve los pesos acumulados de una distribucion de Zipf sobre
+# ellos (el elemento k tiene peso 1 / (k + 1) ^ exponente), para usar con Random.choices
+def pesos_zipf(cantidad, exponente):
+    return list(accumulate(1 / (k + 1) ** exponente for k in range(cantidad)))
+
+# Recibe el numero de una cancion y devuelve su nombre, su artista y sus generos, que siempre son los mismos
+def datos_cancion(cancion):
+    artista = cancion // CANCIONES_POR_ARTISTA
+    generos = (GENEROS[artista % len(GENEROS)], GENEROS[(artista * 7 + 3) % len(GENEROS)])
+    return "Cancion " + str(cancion), "Artista " + str(artista), SEPARADOR_GENEROS.join(sorted(set(generos)))
+
+# Recibe la cantidad de filas y la semilla y devuelve un generador de las filas del archivo (sin la cabecera), como
+# listas de campos. Las canciones y los usuarios se eligen con popularidad de Zipf, pero ordenados al azar para que
+# los populares no sean siempre los de numero mas bajo
+def generar_filas(filas, semilla = None):
+    aleatorio = Random(semilla)
+    cantidad_usuarios = max(MINIMO_USUARIOS, filas // FILAS_POR_USUARIO)
+    cantidad_canciones = max(MINIMO_CANCIONES, filas // FILAS_POR_CANCION)
+    usuarios = list(range(cantidad_usuarios))
+    canciones = list(range(cantidad_canciones))
+    aleatorio.shuffle(usuarios)
+    aleatorio.shuffle(canciones)
+    pesos_usuarios = pesos_zipf(cantidad_usuarios, EXPONENTE_USUARIOS)
+    pesos_canciones = pesos_zipf(cantidad_canciones, EXPONENTE_CANCIONES)
+    pesos_playlists = pesos_zipf(PLAYLISTS_POR_USUARIO, EXPONENTE_PLAYLISTS)
+    generadas = 0
+    while generadas < filas:
+        lote = min(FILAS_POR_LOTE, filas - generadas)
+        elegidos = aleatorio.choices(usuarios, cum_weights = pesos_usuarios, k = lote)
+        elegidas = aleatorio.choices(canciones, cum_weights = pesos_canciones, k = lote)
+        playlists = aleatorio.choices(range(PLAYLISTS_POR_USUARIO), cum_weights = pesos_playlists, k = lote)
+        for usuario, cancion, playlist in zip(elegidos, elegidas, playlists):
+            nombre, artista, generos = datos_cancion(cancion)
+            # cada usuario tiene sus propias playlists, pero los nombres se repiten entre usuarios
+            id_playlist = usuario * PLAYLISTS_POR_USUARIO + playlist
+            nombre_playlist = NOMBRES_PLAYLISTS[(usuario + playlist) % len(NOMBRES_PLAYLISTS)]
+            yield [str(generadas), "usuario" + str(usuario), nombre, artista, str(id_playlist), nombre_playlist, generos]
+            generadas += 1
+
+# Recibe un archivo abierto para escribir, la cantidad de filas y la semilla y escribe un archivo de canciones
+# sintetico, con su cabecera
+def escribir_datos(archivo, filas, semilla = None):
+    archivo.write(SEPARADOR_ARCHIVO.join(COLUMNAS) + "\n")
+    for fila in generar_filas(filas, semilla): archivo.write(SEPARADOR_ARCHIVO.join(fila) + "\n")
+
+# Recibe la ruta de un archivo, la cantidad de filas y la semilla y genera en esa ruta un archivo de canciones
+def generar_archivo(ruta, filas, semilla = None):
+    with open(ruta, "w") as archivo: escribir_datos(archivo, filas, semilla)
+
+def main():
+    semilla = None
+    parametros = []
+    for parametro in sys.argv[1:]:
+        if parametro.startswith(PREFIJO_OPCION_SEMILLA): semilla = int(parametro[len(PREFIJO_OPCION_SEMILLA):])
+        else: parametros.append(parametro)
+    if not parametros or not parametros[0].isdigit(): return 1
+    filas = int(parametros[0])
+    if len(parametros) > 1: generar_archivo(parametros[1], filas, semilla)
+    else: escribir_datos(sys.stdout, filas, semilla)
+    return 0
+
+if __name__ == "__main__":
+    main()
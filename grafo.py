@@ -7,10 +7,19 @@ class Grafo:
 #*******************************************************************
 
     # Crea un nuevo Grafo
-    # Post: se devolvió un Grafo vacío que es dirigido si se pasó True como parámetro, y no dirigido de lo contrario
+    # Post: se devolvió un Grafo vacío que es dirigido si se pasó True como parámetro, y no dirigido de lo contrario.
+    # Su version es 0 y aumenta con cada modificacion, para que quien guarde resultados sepa si quedaron viejos.
+    # El arreglo de vertices (para elegir uno al azar en O(1)) se arma la primera vez que se pide y se descarta al
+    # borrar un vertice. Del mismo modo, el arreglo de adyacentes de cada vertice (para elegir uno por posicion en
+    # O(1)) se arma la primera vez que se pide y se descarta al modificar sus aristas. "cache_csr" guarda la adyacencia
+    # en formato CSR que arma obtener_csr (funciones_grafos.py) junto con la version sobre la que se armó
     def __init__(self, dirigido = False):
         self.vertices = {}
         self.dirigido = dirigido
+        self.version = 0
+        self.arreglo_vertices = None
+        self.arreglos_adyacentes = {}
+        self.cache_csr = None
 
     # Le agrega un vértice al Grafo
     # Pre: el Grafo fue creado y el parámetro "v" es un elemento hasheable
@@ -18,6 +27,8 @@ class Grafo:
     def agregar_vertice(self, v):
         if v in self.vertices: return
         self.vertices[v] = {}
+        if self.arreglo_vertices is not None: self.arreglo_vertices.append(v)
+        self.version += 1
 
     # Le agrega una arista al Grafo
     # Pre: el Grafo fue creado y tanto "v" como "w" son vertices del Grafo.
@@ -28,6 +39,10 @@ class Grafo:
         self.vertices[v][w] = peso
         if not self.dirigido:
             self.vertices[w][v] = peso
+        if self.arreglos_adyacentes:
+            self.arreglos_adyacentes.pop(v, None)
+            self.arreglos_adyacentes.pop(w, None)
+        self.version += 1
         return True
 
     # Indica si dos vertices son adyacentes o no
@@ -40,12 +55,24 @@ class Grafo:
     # Borra un vertice del Grafo
     # Pre: el Grafo fue creado
     # Post: el vertice "v" ya no está en el Grafo y se devolvió True. Si "v" no estaba, se devolvió False
+    # Complejidad: O(grado de "v") si el Grafo no es dirigido, O(V) si lo es
     def borrar_vertice(self, v):
         if v not in self.vertices: return False
-        self.vertices.pop(v)
-        for adyacentes in self.vertices.values():
-            if v in adyacentes: adyacentes.pop(v)
-        return True        
+        adyacentes_v = self.vertices.pop(v)
+        if self.dirigido:
+            for adyacentes in self.vertices.values():
+                if v in adyacentes: adyacentes.pop(v)
+        else:
+            # en un Grafo no dirigido solo los adyacentes de "v" tienen aristas hacia él
+            for w in adyacentes_v:
+                if w != v: self.vertices[w].pop(v)
+        self.arreglo_vertices = None
+        if self.dirigido: self.arreglos_adyacentes.clear()
+        else:
+            self.arreglos_adyacentes.pop(v, None)
+            for w in adyacentes_v: self.arreglos_adyacentes.pop(w, None)
+        self.version += 1
+        return True
 
     # Borra un arista del Grafo
     # Pre: el Grafo fue creado; ambos vertices se encuentran en el Grafo y son adyacentes
@@ -55,6 +82,9 @@ class Grafo:
         self.vertices[v].pop(w)
         if not self.dirigido:
             self.vertices[w].pop(v)
+        self.arreglos_adyacentes.pop(v, None)
+        self.arreglos_adyacentes.pop(w, None)
+        self.version += 1
         return True
 
     # Dados dos vertices "v" y "w" devuelve el peso de la arista que los une
@@ -72,11 +102,13 @@ class Grafo:
 
     # Devuelve un vertice aleatorio
     # Pre: el Grafo fue creado
-    # Post: se devolvió un vertice aleatorio del Grafo. Si este no tenía vertices devolvió None  
+    # Post: se devolvió un vertice aleatorio del Grafo en O(1) (salvo la primera vez despues de crearlo o de borrar un
+    # vertice, en que se arma el arreglo de vertices). Si este no tenía vertices devolvió None
     def vertice_aleatorio(self):
         if len(self.vertices) == 0: return None
+        if self.arreglo_vertices is None: self.arreglo_vertices = list(self.vertices)
         n = randint(0, len(self.vertices) - 1)
-        return list(self.vertices)[n]
+        return self.arreglo_vertices[n]
 
     # Recibe un vertice e indica si este se encuentra en el grafo o no.
     # Pre: el Grafo fue creado
@@ -90,6 +122,30 @@ class Grafo:
     def adyacentes(self, v):
         return list(self.vertices[v].keys())
 
+    # Recibe un vertice y devuelve una vista de solo lectura de sus adyacentes, sin copiarlos
+    # Pre: el Grafo fue creado, el vertice "v" se encuentra en él y no se modifican sus aristas mientras se usa la vista
+    # Post: se devolvió una vista (iterable, con len e "in" en O(1)) de los adyacentes de "v", en el mismo orden que
+    # adyacentes
+    def vista_adyacentes(self, v):
+        return self.vertices[v].keys()
+
+    # Recibe un vertice y devuelve su cantidad de adyacentes en O(1)
+    # Pre: el Grafo fue creado y el vertice "v" se encuentra en él
+    def grado(self, v):
+        return len(self.vertices[v])
+
+    # Recibe un vertice y una posicion "i" y devuelve el adyacente de "v" en esa posicion (el mismo que
+    # adyacentes(v)[i]). Usa el arreglo de adyacentes de "v", que se arma la primera vez y se reutiliza mientras no
+    # cambien sus aristas
+    # Pre: el Grafo fue creado, el vertice "v" se encuentra en él y 0 <= i < grado(v)
+    # Complejidad: O(1), salvo la primera vez (O(grado de "v"))
+    def adyacente(self, v, i):
+        arreglo = self.arreglos_adyacentes.get(v)
+        if arreglo is None:
+            arreglo = list(self.vertices[v])
+            self.arreglos_adyacentes[v] = arreglo
+        return arreglo[i]
+
     # Imprime el Grafo
     # Pre: el Grafo fue creado
     # Post: se imprimió una representacion de forma diccionario del Grafo
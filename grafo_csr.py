@@ -0,0 +1,345 @@
+from grafo import Grafo
+from etiquetas import DiccionarioEtiquetas
+from array import array
+from itertools import islice
+from operator import indexOf, le
+from random import randint
+
+# NumPy es opcional: si está instalado se usa para validar los buffers leidos de disco, si no se usa Python
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Tipo de los buffers de offsets (enteros de 64 bits) y de vecinos/pesos (enteros de 32 bits) del GrafoCSR
+TIPO_OFFSETS = "q"
+TIPO_IDS = "i"
+
+GRAFO_INMUTABLE = "El GrafoCSR es inmutable, no se le pueden agregar ni borrar vertices o aristas"
+
+#*******************************************************************
+#                   INTERFAZ COMUN DE LOS GRAFOS
+#*******************************************************************
+
+# Las funciones de funciones_grafos.py solo usan las siguientes primitivas, por lo que cualquier implementacion
+# (backend) que las ofrezca puede usarse en su lugar: agregar_vertice, agregar_arista, adyacentes, vista_adyacentes,
+# grado, adyacente, peso_arista, son_adyacentes, obtener_vertices, vertice_aleatorio, vertice_pertenece y len().
+# Los recorridos usan vista_adyacentes y grado, que no copian la adyacencia. "Grafo" (grafo.py) es el backend
+# de diccionarios, mutable; "GrafoCSR" es un backend compacto e inmutable que guarda la adyacencia en formato CSR
+# (Compressed Sparse Row): los vertices se identifican con enteros y los adyacentes de cada uno ocupan un tramo
+# contiguo de un unico arreglo.
+
+class GrafoCSR:
+
+#*******************************************************************
+#                      PRIMITIVAS DEL GRAFO
+#*******************************************************************
+
+    # Crea un nuevo GrafoCSR. No se usa directamente sino a traves de ConstructorGrafoCSR.construir()
+    # Pre: "etiquetas" es una lista con el nombre de cada vertice (su posicion es su id), "offsets" un arreglo de
+    # largo V + 1 tal que los adyacentes del vertice i son vecinos[offsets[i]:offsets[i+1]], "pesos" un arreglo
+    # paralelo a "vecinos" con el codigo del peso de cada arista y "valores_pesos" la lista de pesos distintos.
+    # Opcionalmente recibe el diccionario de etiqueta a id ya armado
+    # Post: se devolvió un GrafoCSR inmutable con esos vertices y aristas
+    def __init__(self, etiquetas, offsets, vecinos, pesos, valores_pesos, dirigido = False, indices = None):
+        self.etiquetas = etiquetas
+        if indices is None: indices = {etiqueta: i for i, etiqueta in enumerate(etiquetas)}
+        self.indices = indices
+        self.offsets = offsets
+        self.vecinos = vecinos
+        self.pesos = pesos
+        self.valores_pesos = valores_pesos
+        self.dirigido = dirigido
+        # al ser inmutable su version nunca cambia
+        self.version = 0
+
+    # El GrafoCSR no admite modificaciones: se construye una unica vez con ConstructorGrafoCSR
+    def agregar_vertice(self, v):
+        raise TypeError(GRAFO_INMUTABLE)
+
+    def agregar_arista(self, v, w, peso = 1):
+        raise TypeError(GRAFO_INMUTABLE)
+
+    def borrar_vertice(self, v):
+        raise TypeError(GRAFO_INMUTABLE)
+
+    def borrar_arista(self, v, w):
+        raise TypeError(GRAFO_INMUTABLE)
+
+    # Devuelve la posicion dentro de "vecinos" de la arista de "i" a "j" (ids), o -1 si no son adyacentes.
+    # Los buffers pueden ser arreglos o memoryviews (por ejemplo de un archivo mapeado en memoria)
+    def _posicion_arista(self, i, j):
+        inicio = self.offsets[i]
+        try:
+            return inicio + indexOf(self.vecinos[inicio:self.offsets[i + 1]], j)
+        except ValueError:
+            return -1
+
+    # Indica si dos vertices son adyacentes o no
+    # Pre: el Grafo fue creado y ambos vertices están en el Grafo
+    # Post: se devolvió True si "w" era adyacente de "v" y False en el caso contrario
+    def son_adyacentes(self, v, w):
+        if w not in self.indices: return False
+        return self._posicion_arista(self.indices[v], self.indices[w]) != -1
+
+    # Dados dos vertices "v" y "w" devuelve el peso de la arista que los une
+    # Pre: el Grafo fue creado, "v" y "w" están en el Grafo y  "w" es adyacente de "v"
+    # Post: devolvió el peso de la arista de "v" a "w", o None en caso de que "w" no fuese adycacente de "v"
+    def peso_arista(self, v, w):
+        if w not in self.indices: return None
+        posicion = self._posicion_arista(self.indices[v], self.indices[w])
+        if posicion == -1: return None
+        return self.valores_pesos[self.pesos[posicion]]
+
+    # Devuelve una lista con todos los vertices del grafo
+    # Pre: el grafo fue creado
+    # Post: se devolvió una lista con todos los vertices contenidos en el Grafo, en el orden en que fueron agregados
+    def obtener_vertices(self):
+        return list(self.etiquetas)
+
+    # Devuelve un vertice aleatorio en O(1)
+    # Pre: el Grafo fue creado
+    # Post: se devolvió un vertice aleatorio del Grafo. Si este no tenía vertices devolvió None
+    def vertice_aleatorio(self):
+        if len(self.etiquetas) == 0: return None
+        return self.etiquetas[randint(0, len(self.etiquetas) - 1)]
+
+    # Recibe un vertice e indica si este se encuentra en el grafo o no.
+    # Pre: el Grafo fue creado
+    # Post: se devolvió True si el vertice se encontraba en el grafo y False en caso contrario
+    def vertice_pertenece(self, v):
+        return v in self.indices
+
+    # Recibe un vertice y devuelve todos los vertices adyacentes de este
+    # Pre: el Grafo fue creado y el vertice "v" se encuentra en él
+    # Post: se devolvió una lista con todos los vertices adyacentes de "v", en el orden en que fueron agregados
+    def adyacentes(self, v):
+        i = self.indices[v]
+        etiquetas = self.etiquetas
+        return [etiquetas[j] for j in self.vecinos[self.offsets[i]:self.offsets[i + 1]]]
+
+    # Recibe un vertice y devuelve una vista de sus adyacentes para recorrerlos sin copiarlos: la vista apunta al tramo
+    # de "vecinos" del vertice y arma cada etiqueta recien al recorrerla
+    # Pre: el Grafo fue creado y el vertice "v" se encuentra en él
+    def vista_adyacentes(self, v):
+        i = self.indices[v]
+        return VistaAdyacentes(self, memoryview(self.vecinos)[self.offsets[i]:self.offsets[i + 1]])
+
+    # Recibe un vertice y una posicion "i" y devuelve el adyacente de "v" en esa posicion en O(1)
+    # Pre: el Grafo fue creado, el vertice "v" se encuentra en él y 0 <= i < grado(v)
+    def adyacente(self, v, i):
+        return self.etiquetas[self.vecinos[self.offsets[self.indices[v]] + i]]
+
+    # Imprime el Grafo
+    # Pre: el Grafo fue creado
+    # Post: se imprimió una representacion de forma diccionario del Grafo
+    def __str__(self) -> str:
+        cadena = ""
+        for vertice in self.etiquetas:
+            adyacentes = {w: self.peso_arista(vertice, w) for w in self.adyacentes(vertice)}
+            cadena += vertice + ": " + str(adyacentes) + "\n"
+        return cadena
+
+    # Devuelve la cantidad de vertices en el Grafo
+    # Pre: el Grafo fue creado
+    # Post: se devolvió el numero de vertices contenidos en el Grafo
+    def __len__(self) -> int:
+        return len(self.etiquetas)
+
+#*******************************************************************
+#                   PRIMITIVAS POR ID (ENTEROS)
+#*******************************************************************
+
+    # Devuelve el id entero del vertice "v", o None si no pertenece al Grafo
+    def indice(self, v):
+        return self.indices.get(v)
+
+    # Devuelve el vertice (etiqueta) correspondiente al id "i"
+    def etiqueta(self, i):
+        return self.etiquetas[i]
+
+    # Devuelve un arreglo con los ids de los adyacentes del vertice de id "i"
+    def adyacentes_ids(self, i):
+        return self.vecinos[self.offsets[i]:self.offsets[i + 1]]
+
+    # Devuelve la cantidad de adyacentes del vertice de id "i" en O(1)
+    def grado_id(self, i):
+        return self.offsets[i + 1] - self.offsets[i]
+
+    # Devuelve la cantidad de adyacentes del vertice "v" en O(1)
+    def grado(self, v):
+        return self.grado_id(self.indices[v])
+
+    # Devuelve la cantidad de aristas guardadas (en un grafo no dirigido cada arista se cuenta en ambos sentidos)
+    def cantidad_aristas(self):
+        return len(self.vecinos)
+
+
+class VistaAdyacentes:
+
+    __slots__ = ("grafo", "ids")
+
+    # Crea una vista de solo lectura de los adyacentes de un vertice del GrafoCSR recibido, dados por los ids de
+    # "ids" (un memoryview del tramo de "vecinos" del vertice, que no copia los ids)
+    def __init__(self, grafo, ids):
+        self.grafo = grafo
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, k):
+        return self.grafo.etiquetas[self.ids[k]]
+
+    def __iter__(self):
+        return map(self.grafo.etiquetas.__getitem__, self.ids)
+
+    # Busca el id de "w" entre los ids de la vista, sin armar las etiquetas
+    def __contains__(self, w):
+        j = self.grafo.indices.get(w)
+        return j is not None and j in self.ids
+
+
+class ConstructorGrafoCSR:
+
+    # Crea un constructor vacio que acumula vertices y aristas con la misma interfaz que Grafo, para despues
+    # armar el GrafoCSR de una sola vez. Los vertices y los pesos se codifican con un DiccionarioEtiquetas cada uno
+    def __init__(self, dirigido = False):
+        self.vertices = DiccionarioEtiquetas()
+        self.valores_pesos = DiccionarioEtiquetas()
+        self.origenes = array(TIPO_IDS)
+        self.destinos = array(TIPO_IDS)
+        self.pesos = array(TIPO_IDS)
+        self.dirigido = dirigido
+
+    # Agrega el vertice "v" si no estaba y devuelve su id
+    def agregar_vertice(self, v):
+        return self.vertices.codificar(v)
+
+    # Devuelve el codigo entero del peso recibido, asignandole uno nuevo si es la primera vez que aparece
+    def codigo_peso(self, peso):
+        return self.valores_pesos.codificar(peso)
+
+    # Agrega una arista de "v" a "w" con el peso indicado. Devuelve False si alguno no fue agregado antes
+    def agregar_arista(self, v, w, peso = 1):
+        if v not in self.vertices or w not in self.vertices: return False
+        self.origenes.append(self.vertices.codigo(v))
+        self.destinos.append(self.vertices.codigo(w))
+        self.pesos.append(self.codigo_peso(peso))
+        return True
+
+    # Agrega de una sola vez muchas aristas dadas por los ids de sus extremos (devueltos por agregar_vertice) y los
+    # codigos de sus pesos (devueltos por codigo_peso), en el orden recibido
+    def agregar_aristas_ids(self, origenes, destinos, codigos_pesos):
+        self.origenes.extend(origenes)
+        self.destinos.extend(destinos)
+        self.pesos.extend(codigos_pesos)
+
+    def vertice_pertenece(self, v):
+        return v in self.vertices
+
+    def __len__(self):
+        return len(self.vertices)
+
+    # Arma el GrafoCSR con todo lo acumulado. Si una arista se agregó varias veces conserva la posicion de la
+    # primera vez y el peso de la ultima, igual que el Grafo de diccionarios, por lo que los recorridos de ambos
+    # backends visitan los vertices en el mismo orden
+    # Complejidad: O(V + E)
+    def construir(self):
+        cantidad = len(self.vertices)
+        aristas = [(self.origenes, self.destinos)]
+        if not self.dirigido: aristas.append((self.destinos, self.origenes))
+        grados = [0] * (cantidad + 1)
+        for origenes, _ in aristas:
+            for v in origenes: grados[v + 1] += 1
+        offsets = array(TIPO_OFFSETS, [0]) * (cantidad + 1)
+        for i in range(cantidad): offsets[i + 1] = offsets[i] + grados[i + 1]
+        posiciones = offsets[:-1]
+        total = offsets[-1]
+        vecinos = array(TIPO_IDS, [0]) * total
+        pesos = array(TIPO_IDS, [0]) * total
+        # Se recorren las aristas en el orden en que fueron agregadas (intercalando ambos sentidos si el grafo
+        # no es dirigido), asi los adyacentes de cada vertice quedan en el mismo orden que en el Grafo
+        for k in range(len(self.origenes)):
+            for origenes, destinos in aristas:
+                v = origenes[k]
+                vecinos[posiciones[v]] = destinos[k]
+                pesos[posiciones[v]] = self.pesos[k]
+                posiciones[v] += 1
+        vecinos, pesos, offsets = _eliminar_repetidas(offsets, vecinos, pesos)
+        return GrafoCSR(self.vertices.etiquetas, offsets, vecinos, pesos, self.valores_pesos.etiquetas, self.dirigido,
+                        self.vertices.codigos)
+
+# Recibe un grafo con la interfaz de Grafo y devuelve un GrafoCSR equivalente, con los vertices y los adyacentes de
+# cada uno en el mismo orden. Si ya era un GrafoCSR lo devuelve sin copiarlo
+# Complejidad: O(V + E)
+def convertir_a_csr(grafo):
+    if isinstance(grafo, GrafoCSR): return grafo
+    # se copia cada sentido de las aristas por separado para respetar el orden de adyacentes del grafo original
+    constructor = ConstructorGrafoCSR(dirigido = True)
+    vertices = grafo.obtener_vertices()
+    for v in vertices: constructor.agregar_vertice(v)
+    for v in vertices:
+        for w in grafo.adyacentes(v): constructor.agregar_arista(v, w, grafo.peso_arista(v, w))
+    grafo_csr = constructor.construir()
+    grafo_csr.dirigido = grafo.dirigido
+    return grafo_csr
+
+# Recibe un GrafoCSR y devuelve un Grafo (de diccionarios, mutable) equivalente, con los vertices y los adyacentes de
+# cada uno en el mismo orden. Si no era un GrafoCSR lo devuelve sin copiarlo
+# Complejidad: O(V + E)
+def convertir_a_grafo(grafo):
+    if not isinstance(grafo, GrafoCSR): return grafo
+    nuevo = Grafo(grafo.dirigido)
+    etiquetas, valores_pesos = grafo.etiquetas, grafo.valores_pesos
+    # se llenan directamente los diccionarios de adyacencia: agregando las aristas de a una, los adyacentes de cada
+    # vertice quedarian en el orden en que se agregaron y no en el del GrafoCSR
+    for i, v in enumerate(etiquetas):
+        inicio, fin = grafo.offsets[i], grafo.offsets[i + 1]
+        nuevo.vertices[v] = {etiquetas[j]: valores_pesos[codigo]
+                             for j, codigo in zip(grafo.vecinos[inicio:fin], grafo.pesos[inicio:fin])}
+    return nuevo
+
+# Recibe los buffers CSR y devuelve otros equivalentes sin aristas repetidas (para cada vertice conserva el primer
+# lugar en el que apareció cada adyacente, con el ultimo peso asignado)
+def _eliminar_repetidas(offsets, vecinos, pesos):
+    nuevos_offsets = array(TIPO_OFFSETS, [0])
+    nuevos_vecinos = array(TIPO_IDS)
+    nuevos_pesos = array(TIPO_IDS)
+    for i in range(len(offsets) - 1):
+        inicio, fin = offsets[i], offsets[i + 1]
+        tramo = vecinos[inicio:fin]
+        if len(set(tramo)) == len(tramo):
+            nuevos_vecinos.extend(tramo)
+            nuevos_pesos.extend(pesos[inicio:fin])
+        else:
+            adyacentes = {}
+            for j, codigo in zip(tramo, pesos[inicio:fin]): adyacentes[j] = codigo
+            nuevos_vecinos.extend(adyacentes.keys())
+            nuevos_pesos.extend(adyacentes.values())
+        nuevos_offsets.append(len(nuevos_vecinos))
+    return nuevos_vecinos, nuevos_pesos, nuevos_offsets
+
+#*******************************************************************
+#                     VALIDACION DE LOS BUFFERS
+#*******************************************************************
+
+# Recibe una secuencia de ids (arreglo o memoryview) y una cantidad y devuelve True si todos los ids están entre 0 y
+# cantidad - 1
+def ids_en_rango(ids, cantidad):
+    if len(ids) == 0: return True
+    if np:
+        ids = np.asarray(ids)
+        return bool(0 <= ids.min() and ids.max() < cantidad)
+    return 0 <= min(ids) and max(ids) < cantidad
+
+# Recibe los offsets y los vecinos de una adyacencia en formato CSR (leidos de disco) y la cantidad de vertices y
+# devuelve True si son consistentes: hay un offset por vertice mas uno, empiezan en 0, no decrecen, terminan en la
+# cantidad de vecinos y cada vecino es un id de vertice. Un GrafoCSR armado con buffers que no lo cumplen falla recien
+# al recorrerlo. Si los vecinos son ids de otra numeracion (como en las listas del indice de co-ocurrencia), se
+# recibe en "cantidad_ids" cuantos ids hay en ella
+def csr_valido(offsets, vecinos, cantidad, cantidad_ids = None):
+    if len(offsets) != cantidad + 1 or offsets[0] != 0 or offsets[-1] != len(vecinos): return False
+    if np: crecientes = bool((np.diff(np.asarray(offsets)) >= 0).all())
+    else: crecientes = all(map(le, offsets, islice(offsets, 1, None)))
+    return crecientes and ids_en_rango(vecinos, cantidad if cantidad_ids is None else cantidad_ids)
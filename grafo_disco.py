@@ -0,0 +1,432 @@
+from grafo_csr import GrafoCSR, csr_valido, ids_en_rango, TIPO_OFFSETS, TIPO_IDS
+from collections import OrderedDict
+from array import array
+import json
+import mmap
+import os
+import shutil
+import sqlite3
+import sys
+import zlib
+
+#*******************************************************************
+#                     GRAFO ALMACENADO EN DISCO
+#*******************************************************************
+
+# Un GrafoDisco es un GrafoCSR cuyos datos no se cargan en memoria: la adyacencia (offsets, vecinos y pesos) está en
+# archivos binarios que se mapean en memoria, y las etiquetas de los vertices y los nombres de las playlists en una
+# base SQLite, de la que se leen a medida que se piden. Las etiquetas mas usadas (los vertices calientes) se guardan
+# en caches acotadas, por lo que la memoria del proceso no depende del tamaño del grafo sino del limite recibido.
+# Los algoritmos que recorren la adyacencia por ids (PageRank vectorizado, Random Walks por lotes) la leen de forma
+# secuencial desde los archivos mapeados, sin copiarla; los que usan etiquetas (BFS, Random Walks) pasan por las caches.
+# Todo se guarda en un directorio, junto con la clave del archivo de canciones del que se generó (ver
+# instantanea.clave_archivo) y el CRC de cada archivo binario, y se reutiliza mientras el archivo no cambie y los
+# binarios no estén modificados ni sean inconsistentes.
+
+EXTENSION_GRAFO_DISCO = ".disco"
+EXTENSION_TEMPORAL = ".tmp"
+VERSION = 3
+
+# Archivos del directorio del grafo
+ARCHIVO_BASE = "etiquetas.sqlite"
+ARCHIVO_FILAS = "filas.sqlite"
+ARCHIVO_OFFSETS = "offsets.bin"
+ARCHIVO_VECINOS = "vecinos.bin"
+ARCHIVO_PESOS = "pesos.bin"
+ARCHIVO_USUARIOS = "usuarios.bin"
+
+# Tablas de la base: vertices y pesos (id, etiqueta) y datos generales (clave, valor)
+TABLA_VERTICES = "vertices"
+TABLA_PESOS = "pesos"
+TABLA_DATOS = "datos"
+
+# Tipo del archivo de usuarios (un byte por vertice: 1 si es usuario, 0 si es cancion)
+TIPO_MARCAS = "B"
+
+# Memoria por defecto (en bytes) y reparto del limite: cache de paginas de SQLite, etiquetas de vertices y de pesos
+MEMORIA_POR_DEFECTO = 256 << 20
+FRACCION_SQLITE = 4
+FRACCION_PESOS = 4
+
+# Costo estimado en bytes de cada entrada de las caches, ademas de la clave y el valor (nodo del OrderedDict)
+COSTO_ENTRADA_CACHE = 100
+
+# Cantidad de filas del archivo que se acumulan antes de escribirlas, elementos por bloque al escribir los archivos
+# binarios y cantidad maxima de ids por consulta a la base
+FILAS_POR_LOTE = 10000
+ELEMENTOS_POR_BLOQUE = 1 << 16
+IDS_POR_CONSULTA = 500
+
+class CacheAcotada:
+
+    # Crea una cache vacia que guarda pares clave-valor mientras su tamaño estimado no supere "max_bytes",
+    # descartando primero los usados hace mas tiempo
+    def __init__(self, max_bytes):
+        self.entradas = OrderedDict()
+        self.max_bytes = max_bytes
+        self.bytes = 0
+
+    # Devuelve el valor guardado para la clave, o None si no está
+    def obtener(self, clave):
+        valor = self.entradas.get(clave)
+        if valor is not None: self.entradas.move_to_end(clave)
+        return valor
+
+    def guardar(self, clave, valor):
+        if clave in self.entradas: return
+        self.entradas[clave] = valor
+        self.bytes += sys.getsizeof(clave) + sys.getsizeof(valor) + COSTO_ENTRADA_CACHE
+        while self.bytes > self.max_bytes and self.entradas:
+            clave, valor = self.entradas.popitem(last = False)
+            self.bytes -= sys.getsizeof(clave) + sys.getsizeof(valor) + COSTO_ENTRADA_CACHE
+
+    def __len__(self):
+        return len(self.entradas)
+
+class BaseDisco:
+
+    # Crea el acceso a la base SQLite de la ruta recibida, con una cache de paginas de a lo sumo "memoria" bytes.
+    # La conexion se abre al usarse por primera vez en cada proceso: una conexion de SQLite no puede compartirse con
+    # los procesos hijos creados con fork (los del pool de --paralelo, --precalentar o el servidor)
+    def __init__(self, ruta, memoria, solo_lectura = True):
+        self.ruta = ruta
+        self.memoria = memoria
+        self.solo_lectura = solo_lectura
+        self._conexion = None
+        self._pid = None
+
+    # Devuelve la conexion a la base del proceso actual
+    def conexion(self):
+        if self._pid != os.getpid():
+            if self.solo_lectura: self._conexion = sqlite3.connect("file:" + self.ruta + "?mode=ro", uri = True)
+            else: self._conexion = sqlite3.connect(self.ruta)
+            self._conexion.execute("PRAGMA cache_size = {}".format(-max(self.memoria >> 10, 1)))
+            self._pid = os.getpid()
+        return self._conexion
+
+    def consultar(self, sql, parametros = ()):
+        return self.conexion().execute(sql, parametros)
+
+    def cerrar(self):
+        if self._conexion is not None and self._pid == os.getpid(): self._conexion.close()
+        self._conexion = None
+
+class EtiquetasDisco:
+
+    # Crea una secuencia de etiquetas guardadas en la tabla (id, etiqueta) de la base, con la misma interfaz que
+    # DiccionarioEtiquetas (codificar, codigo, decodificar) y la de una lista indexada por id. Las etiquetas y los
+    # codigos leidos se guardan en dos caches acotadas que ocupan en total a lo sumo "memoria" bytes
+    def __init__(self, base, tabla, cantidad, memoria):
+        self.base = base
+        self.tabla = tabla
+        self.cantidad = cantidad
+        self.etiquetas = CacheAcotada(memoria // 2)
+        self.codigos = CacheAcotada(memoria // 2)
+
+    # Devuelve el codigo de la etiqueta recibida, o None si no está en la tabla
+    def codigo(self, etiqueta):
+        codigo = self.codigos.obtener(etiqueta)
+        if codigo is not None: return codigo
+        fila = self.base.consultar("SELECT id FROM {} WHERE etiqueta = ?".format(self.tabla), (etiqueta,)).fetchone()
+        if fila is None: return None
+        self.codigos.guardar(etiqueta, fila[0])
+        return fila[0]
+
+    # Devuelve el codigo de la etiqueta recibida, agregandola a la tabla con un codigo nuevo si no estaba
+    def codificar(self, etiqueta):
+        codigo = self.codigo(etiqueta)
+        if codigo is not None: return codigo
+        codigo = self.cantidad
+        self.base.consultar("INSERT INTO {} (id, etiqueta) VALUES (?, ?)".format(self.tabla), (codigo, etiqueta))
+        self.cantidad += 1
+        self.codigos.guardar(etiqueta, codigo)
+        return codigo
+
+    # Devuelve la etiqueta correspondiente al codigo recibido
+    def decodificar(self, codigo):
+        etiqueta = self.etiquetas.obtener(codigo)
+        if etiqueta is not None: return etiqueta
+        if not 0 <= codigo < self.cantidad: raise IndexError(codigo)
+        etiqueta, = self.base.consultar("SELECT etiqueta FROM {} WHERE id = ?".format(self.tabla), (codigo,)).fetchone()
+        self.etiquetas.guardar(codigo, etiqueta)
+        return etiqueta
+
+    # Recibe una secuencia de codigos y devuelve la lista de sus etiquetas, leyendo de a muchas las que no están en
+    # la cache (por ejemplo, todos los adyacentes de un vertice con una sola consulta). Las leidas se guardan en ambas
+    # caches, ya que lo siguiente suele ser buscar esas etiquetas (por ejemplo, si son usuarios)
+    def decodificar_varios(self, codigos):
+        etiquetas = [self.etiquetas.obtener(codigo) for codigo in codigos]
+        faltantes = [codigo for codigo, etiqueta in zip(codigos, etiquetas) if etiqueta is None]
+        if not faltantes: return etiquetas
+        leidas = {}
+        for inicio in range(0, len(faltantes), IDS_POR_CONSULTA):
+            tramo = faltantes[inicio:inicio + IDS_POR_CONSULTA]
+            sql = "SELECT id, etiqueta FROM {} WHERE id IN ({})".format(self.tabla, ", ".join("?" * len(tramo)))
+            leidas.update(self.base.consultar(sql, tramo))
+        for codigo, etiqueta in leidas.items():
+            self.etiquetas.guardar(codigo, etiqueta)
+            self.codigos.guardar(etiqueta, codigo)
+        return [etiqueta if etiqueta is not None else leidas[codigo] for codigo, etiqueta in zip(codigos, etiquetas)]
+
+    def __getitem__(self, codigo):
+        return self.decodificar(codigo)
+
+    # Recorre las etiquetas en orden de codigo, de a IDS_POR_CONSULTA: cada lote se lee con decodificar_varios, por
+    # lo que en memoria solo está el lote actual ademas de las caches
+    def __iter__(self):
+        for inicio in range(0, self.cantidad, IDS_POR_CONSULTA):
+            yield from self.decodificar_varios(range(inicio, min(inicio + IDS_POR_CONSULTA, self.cantidad)))
+
+    def __contains__(self, etiqueta):
+        return self.codigo(etiqueta) is not None
+
+    def __len__(self):
+        return self.cantidad
+
+class IndicesDisco:
+
+    # Crea una vista de solo lectura de las EtiquetasDisco recibidas como diccionario de etiqueta a id, con la
+    # interfaz del diccionario "indices" del GrafoCSR
+    def __init__(self, etiquetas):
+        self.etiquetas = etiquetas
+
+    def __getitem__(self, etiqueta):
+        codigo = self.etiquetas.codigo(etiqueta)
+        if codigo is None: raise KeyError(etiqueta)
+        return codigo
+
+    def get(self, etiqueta, defecto = None):
+        codigo = self.etiquetas.codigo(etiqueta)
+        return defecto if codigo is None else codigo
+
+    def __contains__(self, etiqueta):
+        return self.etiquetas.codigo(etiqueta) is not None
+
+    def __len__(self):
+        return len(self.etiquetas)
+
+# Recibe la ruta de un archivo binario y el tipo de sus elementos y devuelve su contenido como memoryview del archivo
+# mapeado en memoria (sin copiarlo), o un arreglo vacio si el archivo está vacio
+def _mapear(ruta, tipo):
+    if os.path.getsize(ruta) == 0: return array(tipo)
+    with open(ruta, "rb") as archivo:
+        mapeo = mmap.mmap(archivo.fileno(), 0, access = mmap.ACCESS_READ)
+    return memoryview(mapeo).cast(tipo)
+
+# Recibe la base de un grafo en disco y devuelve el diccionario de datos generales guardados en ella
+def _leer_datos(base):
+    return {clave: json.loads(valor) for clave, valor in base.consultar("SELECT clave, valor FROM " + TABLA_DATOS)}
+
+class GrafoDisco(GrafoCSR):
+
+    # Abre el grafo guardado en el directorio recibido, que ocupa en memoria a lo sumo "memoria" bytes ademas de las
+    # paginas de los archivos mapeados (que administra el sistema operativo y puede descartar cuando quiera)
+    # Pre: el directorio fue escrito por ConstructorGrafoDisco
+    # Post: se devolvió un GrafoCSR inmutable de solo lectura
+    def __init__(self, ruta, memoria = MEMORIA_POR_DEFECTO):
+        self.ruta = ruta
+        self.base = BaseDisco(os.path.join(ruta, ARCHIVO_BASE), memoria // FRACCION_SQLITE)
+        self.datos = _leer_datos(self.base)
+        memoria_pesos = memoria // FRACCION_PESOS
+        memoria_vertices = memoria - memoria // FRACCION_SQLITE - memoria_pesos
+        etiquetas = EtiquetasDisco(self.base, TABLA_VERTICES, self.datos["vertices"], memoria_vertices)
+        valores_pesos = EtiquetasDisco(self.base, TABLA_PESOS, self.datos["pesos"], memoria_pesos)
+        offsets, vecinos, pesos = [_mapear(os.path.join(ruta, nombre), tipo) for nombre, tipo in
+                                   ((ARCHIVO_OFFSETS, TIPO_OFFSETS), (ARCHIVO_VECINOS, TIPO_IDS), (ARCHIVO_PESOS, TIPO_IDS))]
+        super().__init__(etiquetas, offsets, vecinos, pesos, valores_pesos, False, IndicesDisco(etiquetas))
+
+    # Recibe un vertice y devuelve todos los vertices adyacentes de este
+    # Pre: el Grafo fue creado y el vertice "v" se encuentra en él
+    # Post: se devolvió una lista con todos los vertices adyacentes de "v", en el orden en que fueron agregados. Las
+    # etiquetas que no están en la cache se leen con una sola consulta
+    def adyacentes(self, v):
+        return self.etiquetas.decodificar_varios(self.adyacentes_ids(self.indices[v]))
+
+    # Devuelve los vertices del grafo en orden de id. En lugar de una lista devuelve las EtiquetasDisco, una secuencia
+    # de solo lectura que al recorrerse lee las etiquetas de a lotes, sin cargarlas todas en memoria
+    def obtener_vertices(self):
+        return self.etiquetas
+
+    # Recibe un vertice y devuelve sus adyacentes para recorrerlos. A diferencia del GrafoCSR no es una vista
+    # perezosa: leer las etiquetas de a una haria una consulta por cada una que no esté en la cache, y con
+    # adyacentes se leen todas juntas
+    def vista_adyacentes(self, v):
+        return self.adyacentes(v)
+
+class UsuariosDisco:
+
+    # Crea el conjunto de usuarios de un GrafoDisco, de solo lectura: se guarda como un byte por vertice en un
+    # archivo mapeado en memoria y se consulta con el id de cada etiqueta
+    def __init__(self, grafo):
+        self.grafo = grafo
+        self.marcas = _mapear(os.path.join(grafo.ruta, ARCHIVO_USUARIOS), TIPO_MARCAS)
+        self.cantidad = grafo.datos["usuarios"]
+
+    def __contains__(self, v):
+        i = self.grafo.indices.get(v)
+        return i is not None and self.marcas[i] == 1
+
+    # Recorre los usuarios en orden de id
+    def __iter__(self):
+        for etiqueta, marca in zip(self.grafo.etiquetas, self.marcas):
+            if marca: yield etiqueta
+
+    def __len__(self):
+        return self.cantidad
+
+#*******************************************************************
+#                           CONSTRUCCION
+#*******************************************************************
+
+class ConstructorGrafoDisco:
+
+    # Crea un constructor que va escribiendo en disco las filas (cancion, usuario, playlist) del archivo de canciones
+    # a medida que se le agregan, usando a lo sumo "memoria" bytes, para despues armar el GrafoDisco de una sola
+    # vez. Se escribe en un directorio temporal que al terminar reemplaza al de la ruta recibida
+    def __init__(self, ruta, memoria = MEMORIA_POR_DEFECTO):
+        self.ruta = ruta
+        self.memoria = memoria
+        self.ruta_temporal = ruta + EXTENSION_TEMPORAL
+        shutil.rmtree(self.ruta_temporal, ignore_errors = True)
+        os.makedirs(self.ruta_temporal)
+        self.base = BaseDisco(os.path.join(self.ruta_temporal, ARCHIVO_BASE), memoria // FRACCION_SQLITE, False)
+        # la base no necesita diario: si la construccion se interrumpe, el directorio temporal se descarta
+        self.base.consultar("PRAGMA journal_mode = OFF")
+        self.base.consultar("PRAGMA synchronous = OFF")
+        for tabla in (TABLA_VERTICES, TABLA_PESOS):
+            self.base.consultar("CREATE TABLE {} (id INTEGER PRIMARY KEY, etiqueta TEXT NOT NULL UNIQUE)".format(tabla))
+        self.base.consultar("CREATE TABLE {} (clave TEXT PRIMARY KEY, valor TEXT NOT NULL)".format(TABLA_DATOS))
+        # las filas van en una base aparte, que se borra al terminar. Si una cancion aparece varias veces con el mismo
+        # usuario se conserva el orden de la primera fila y la playlist de la ultima, igual que en el Grafo
+        self.base.consultar("ATTACH DATABASE ? AS construccion", (os.path.join(self.ruta_temporal, ARCHIVO_FILAS),))
+        self.base.consultar("PRAGMA construccion.journal_mode = OFF")
+        self.base.consultar("CREATE TABLE construccion.filas (cancion INTEGER, usuario INTEGER, orden INTEGER, "
+                            "peso INTEGER, PRIMARY KEY (cancion, usuario)) WITHOUT ROWID")
+        memoria_pesos = memoria // FRACCION_PESOS
+        memoria_vertices = memoria - memoria // FRACCION_SQLITE - memoria_pesos
+        self.vertices = EtiquetasDisco(self.base, TABLA_VERTICES, 0, memoria_vertices)
+        self.valores_pesos = EtiquetasDisco(self.base, TABLA_PESOS, 0, memoria_pesos)
+        self.usuarios = bytearray()
+        self.filas = []
+        self.orden = 0
+
+    # Agrega una fila del archivo de canciones: los vertices de la cancion y del usuario (en ese orden) si no
+    # estaban y la arista entre ellos, cuyo peso es la playlist. Si la cancion y el usuario tienen la misma etiqueta
+    # son un mismo vertice y la arista es un lazo, igual que en el Grafo
+    def agregar_fila(self, cancion, usuario, playlist):
+        c = self.vertices.codificar(cancion)
+        u = self.vertices.codificar(usuario)
+        if u >= len(self.usuarios): self.usuarios.extend(bytes(u + 1 - len(self.usuarios)))
+        self.usuarios[u] = 1
+        self.filas.append((c, u, self.orden, self.valores_pesos.codificar(playlist)))
+        self.orden += 1
+        if len(self.filas) >= FILAS_POR_LOTE: self._escribir_filas()
+
+    def _escribir_filas(self):
+        self.base.conexion().executemany("INSERT INTO construccion.filas VALUES (?, ?, ?, ?) "
+                                         "ON CONFLICT (cancion, usuario) DO UPDATE SET peso = excluded.peso", self.filas)
+        self.filas = []
+
+    # Escribe los archivos de la adyacencia en formato CSR. SQLite ordena las aristas (en ambos sentidos, salvo los
+    # lazos, que se guardan una sola vez) por origen y orden de la fila, con archivos temporales si no entran en
+    # memoria, y se escriben por bloques a medida que se leen. Devuelve un diccionario con el CRC de cada archivo
+    def _escribir_adyacencia(self):
+        cantidad = len(self.vertices)
+        aristas = self.base.consultar("SELECT origen, destino, peso FROM ("
+                                      "SELECT cancion AS origen, usuario AS destino, orden, peso FROM construccion.filas "
+                                      "UNION ALL SELECT usuario, cancion, orden, peso FROM construccion.filas "
+                                      "WHERE usuario != cancion) "
+                                      "ORDER BY origen, orden")
+        nombres = (ARCHIVO_OFFSETS, ARCHIVO_VECINOS, ARCHIVO_PESOS)
+        archivos = [open(os.path.join(self.ruta_temporal, nombre), "wb") for nombre in nombres]
+        bloques = [array(TIPO_OFFSETS), array(TIPO_IDS), array(TIPO_IDS)]
+        offsets, vecinos, pesos = bloques
+        crcs = [0] * len(bloques)
+        total = 0
+        siguiente = 0
+        try:
+            for origen, destino, peso in aristas:
+                # los vertices hasta el origen empiezan donde está la arista actual
+                while siguiente <= origen:
+                    offsets.append(total)
+                    siguiente += 1
+                vecinos.append(destino)
+                pesos.append(peso)
+                total += 1
+                if len(vecinos) >= ELEMENTOS_POR_BLOQUE or len(offsets) >= ELEMENTOS_POR_BLOQUE:
+                    crcs = _escribir_bloques(archivos, bloques, crcs)
+            while siguiente <= cantidad:
+                offsets.append(total)
+                siguiente += 1
+            crcs = _escribir_bloques(archivos, bloques, crcs)
+        finally:
+            for archivo in archivos: archivo.close()
+        return dict(zip(nombres, crcs))
+
+    # Arma el GrafoDisco con todo lo agregado, guardando la clave del archivo de canciones del que se generó, y
+    # devuelve el grafo y sus UsuariosDisco
+    # Complejidad: O(E log E) en disco
+    def construir(self, clave, version = VERSION):
+        self._escribir_filas()
+        crcs = self._escribir_adyacencia()
+        cantidad = len(self.vertices)
+        self.usuarios.extend(bytes(cantidad - len(self.usuarios)))
+        with open(os.path.join(self.ruta_temporal, ARCHIVO_USUARIOS), "wb") as archivo: archivo.write(self.usuarios)
+        crcs[ARCHIVO_USUARIOS] = zlib.crc32(self.usuarios)
+        datos = {"version": version, "clave": clave.datos(), "vertices": cantidad, "pesos": len(self.valores_pesos),
+                 "usuarios": self.usuarios.count(1), "crc": crcs}
+        self.base.conexion().executemany("INSERT INTO {} VALUES (?, ?)".format(TABLA_DATOS),
+                                         [(nombre, json.dumps(valor)) for nombre, valor in datos.items()])
+        self.base.conexion().commit()
+        self.base.consultar("DETACH DATABASE construccion")
+        self.base.cerrar()
+        os.remove(os.path.join(self.ruta_temporal, ARCHIVO_FILAS))
+        shutil.rmtree(self.ruta, ignore_errors = True)
+        os.replace(self.ruta_temporal, self.ruta)
+        grafo = GrafoDisco(self.ruta, self.memoria)
+        return grafo, UsuariosDisco(grafo)
+
+# Recibe los archivos abiertos, los bloques a escribir en cada uno y el CRC acumulado de cada archivo, escribe los
+# bloques, los vacia y devuelve los CRC actualizados
+def _escribir_bloques(archivos, bloques, crcs):
+    nuevos = []
+    for archivo, bloque, crc in zip(archivos, bloques, crcs):
+        bloque.tofile(archivo)
+        nuevos.append(zlib.crc32(bloque, crc))
+        del bloque[:]
+    return nuevos
+
+#*******************************************************************
+#                             APERTURA
+#*******************************************************************
+
+# Recibe la ruta del archivo de canciones y devuelve la ruta por defecto de su grafo en disco
+def ruta_grafo_disco(ruta_archivo):
+    return ruta_archivo + EXTENSION_GRAFO_DISCO
+
+# Recibe un GrafoDisco y sus UsuariosDisco y devuelve True si sus archivos binarios tienen el CRC con el que se
+# escribieron y son consistentes (ver grafo_csr.csr_valido), y la base tiene una etiqueta por vertice. Recorre los
+# archivos mapeados una vez, de forma secuencial
+def _contenido_valido(grafo, usuarios):
+    crcs = grafo.datos["crc"]
+    archivos = {ARCHIVO_OFFSETS: grafo.offsets, ARCHIVO_VECINOS: grafo.vecinos, ARCHIVO_PESOS: grafo.pesos,
+                ARCHIVO_USUARIOS: usuarios.marcas}
+    if any(zlib.crc32(contenido) != crcs[nombre] for nombre, contenido in archivos.items()): return False
+    cantidad = len(grafo.etiquetas)
+    if not csr_valido(grafo.offsets, grafo.vecinos, cantidad) or len(grafo.pesos) != len(grafo.vecinos): return False
+    if not ids_en_rango(grafo.pesos, len(grafo.valores_pesos)) or len(usuarios.marcas) != cantidad: return False
+    vertices, = grafo.base.consultar("SELECT COUNT(*) FROM " + TABLA_VERTICES).fetchone()
+    return vertices == cantidad
+
+# Recibe la ruta del grafo en disco, la clave del archivo de canciones y el limite de memoria y devuelve el GrafoDisco
+# y sus UsuariosDisco, o None si no existe, se generó a partir de otra version del archivo o está corrupto
+def abrir_grafo_disco(ruta, clave, memoria = MEMORIA_POR_DEFECTO):
+    if not os.path.isdir(ruta): return None
+    try:
+        grafo = GrafoDisco(ruta, memoria)
+        if grafo.datos["version"] != VERSION or not clave.coincide(grafo.datos["clave"]): return None
+        usuarios = UsuariosDisco(grafo)
+        if not _contenido_valido(grafo, usuarios): return None
+        return grafo, usuarios
+    except (sqlite3.Error, OSError, ValueError, KeyError, TypeError):
+        return None
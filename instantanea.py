@@ -0,0 +1,234 @@
+from grafo_csr import GrafoCSR, convertir_a_csr, csr_valido, ids_en_rango, TIPO_OFFSETS, TIPO_IDS
+from array import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+
+#*******************************************************************
+#                     FORMATO DE LA INSTANTANEA
+#*******************************************************************
+
+# Una instantanea guarda en un unico archivo binario el grafo bipartito de usuarios y canciones ya construido (como
+# GrafoCSR), los usuarios y, opcionalmente, el grafo de canciones y el pagerank de las canciones. Su estructura es:
+#   MAGIA | largo de la cabecera | CRC de la cabecera | cabecera JSON | relleno | secciones
+# La cabecera tiene la clave del archivo de canciones del que se generó (tamaño, fecha de modificacion y hash del
+# contenido) y la posicion (desde el inicio de las secciones), largo, tipo y CRC de cada seccion. Al abrirla se
+# comprueban el CRC de la cabecera y el de cada seccion, y despues que la adyacencia sea consistente (ver
+# grafo_csr.csr_valido), por lo que una instantanea modificada se reconstruye en lugar de fallar al recorrerla. El
+# relleno alinea las secciones a 8 bytes. Las secciones numericas se leen sin copiarse desde el archivo mapeado en
+# memoria.
+
+EXTENSION_INSTANTANEA = ".instantanea"
+EXTENSION_TEMPORAL = ".tmp"
+MAGIA = b"RFYINST3"
+FORMATO_CABECERA = "<QI"
+VERSION = 1
+ALINEACION = 8
+TAMANIO_BLOQUE_HASH = 1 << 20
+
+TIPO_JSON = "json"
+TIPO_RANKS = "d"
+
+# Secciones del grafo bipartito
+ETIQUETAS = "etiquetas"
+VALORES_PESOS = "valores_pesos"
+OFFSETS = "offsets"
+VECINOS = "vecinos"
+PESOS = "pesos"
+USUARIOS = "usuarios"
+
+# Secciones opcionales con resultados derivados. Los vertices del grafo de canciones y del pagerank se guardan con
+# el id que tienen en el grafo bipartito
+PREFIJO_CANCIONES = "canciones_"
+IDS_CANCIONES = "canciones_ids"
+IDS_PAGE_RANK = "page_rank_ids"
+VALORES_PAGE_RANK = "page_rank_valores"
+
+#*******************************************************************
+#                           LECTURA
+#*******************************************************************
+
+# Recibe la ruta del archivo de canciones y devuelve la ruta por defecto de su instantanea
+def ruta_instantanea(ruta_archivo):
+    return ruta_archivo + EXTENSION_INSTANTANEA
+
+class ClaveArchivo:
+
+    # Crea la clave de un archivo, que identifica la version a partir de la cual se construyó una instantanea (o un
+    # indice o un grafo en disco): su tamaño, su fecha de modificacion y un hash de su contenido. El hash se calcula
+    # recien cuando hace falta (al guardar, o si la fecha cambió pero el tamaño no), por lo que abrir una instantanea
+    # de un archivo que no cambió no requiere leerlo
+    def __init__(self, ruta_archivo):
+        estado = os.stat(ruta_archivo)
+        self.ruta = ruta_archivo
+        self.tamanio = estado.st_size
+        self.mtime = estado.st_mtime_ns
+        self._hash = None
+
+    # Devuelve el hash del contenido del archivo, calculandolo la primera vez
+    def hash(self):
+        if self._hash is None:
+            hash_contenido = hashlib.blake2b()
+            with open(self.ruta, "rb") as archivo:
+                for bloque in iter(lambda: archivo.read(TAMANIO_BLOQUE_HASH), b""): hash_contenido.update(bloque)
+            self._hash = hash_contenido.hexdigest()
+        return self._hash
+
+    # Devuelve el diccionario que se guarda como clave
+    def datos(self):
+        return {"tamanio": self.tamanio, "mtime": self.mtime, "hash": self.hash()}
+
+    # Recibe una clave guardada (ver datos) y devuelve True si corresponde a esta version del archivo: se confía en
+    # el tamaño y la fecha de modificacion, y solo si el tamaño coincide pero la fecha no se compara el hash
+    def coincide(self, guardada):
+        if not isinstance(guardada, dict) or guardada.get("tamanio") != self.tamanio: return False
+        if guardada.get("mtime") == self.mtime: return True
+        return guardada.get("hash") == self.hash()
+
+# Recibe la ruta de un archivo y devuelve su ClaveArchivo
+def clave_archivo(ruta_archivo):
+    return ClaveArchivo(ruta_archivo)
+
+# Recibe las secciones del archivo mapeado y la descripcion (inicio, largo, tipo, CRC) de una de ellas y devuelve su
+# contenido: los JSON ya decodificados y los arreglos numericos como memoryview del mapeo (sin copiarlos). Lanza
+# ValueError si la seccion no entra en el archivo o su CRC no coincide
+def _leer_seccion(datos, seccion):
+    inicio, largo, tipo, crc = seccion
+    if inicio < 0 or largo < 0 or inicio + largo > len(datos): raise ValueError(seccion)
+    datos = datos[inicio:inicio + largo]
+    if zlib.crc32(datos) != crc: raise ValueError(seccion)
+    if tipo == TIPO_JSON: return json.loads(bytes(datos))
+    return datos.cast(tipo)
+
+# Recibe la ruta de un archivo de secciones (con el formato de la instantanea) y su MAGIA y devuelve su cabecera y
+# un diccionario con sus secciones, o None si no existe, tiene otra MAGIA o su cabecera o alguna seccion está
+# corrupta
+def cargar_secciones(ruta, magia):
+    if not os.path.exists(ruta): return None
+    try:
+        with open(ruta, "rb") as archivo:
+            mapeo = mmap.mmap(archivo.fileno(), 0, access = mmap.ACCESS_READ)
+        if mapeo[:len(magia)] != magia: return None
+        inicio_cabecera = len(magia) + struct.calcsize(FORMATO_CABECERA)
+        largo_cabecera, crc = struct.unpack_from(FORMATO_CABECERA, mapeo, len(magia))
+        fin_cabecera = inicio_cabecera + largo_cabecera
+        cabecera_bytes = mapeo[inicio_cabecera:fin_cabecera]
+        if zlib.crc32(cabecera_bytes) != crc: return None
+        cabecera = json.loads(cabecera_bytes)
+        datos = memoryview(mapeo)[fin_cabecera + (-fin_cabecera % ALINEACION):]
+        return cabecera, {nombre: _leer_seccion(datos, seccion) for nombre, seccion in cabecera["secciones"].items()}
+    except (OSError, ValueError, KeyError, TypeError, IndexError, struct.error):
+        return None
+
+# Recibe la ruta de la instantanea y la clave del archivo de canciones y devuelve un diccionario con el grafo de
+# usuarios y canciones, los usuarios, el grafo de canciones (o None) y el pagerank de las canciones (o None) junto
+# al motor con el que se calculó. Devuelve None si la instantanea no existe, corresponde a otra version del archivo
+# de canciones o está corrupta, para que se reconstruya
+def cargar_instantanea(ruta, clave):
+    contenido = cargar_secciones(ruta, MAGIA)
+    if contenido is None: return None
+    cabecera, secciones = contenido
+    try:
+        if cabecera["version"] != VERSION or not clave.coincide(cabecera["clave"]): return None
+        return _armar_instantanea(cabecera, secciones)
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
+
+# Recibe las secciones de un grafo guardado con _secciones_grafo, su prefijo y las etiquetas de sus vertices y
+# devuelve el GrafoCSR, o None si la adyacencia o los codigos de los pesos no son consistentes
+def _armar_grafo(secciones, etiquetas, prefijo = ""):
+    offsets, vecinos = secciones[prefijo + OFFSETS], secciones[prefijo + VECINOS]
+    pesos, valores_pesos = secciones[prefijo + PESOS], secciones[prefijo + VALORES_PESOS]
+    if not csr_valido(offsets, vecinos, len(etiquetas)) or len(pesos) != len(vecinos): return None
+    if not ids_en_rango(pesos, len(valores_pesos)): return None
+    return GrafoCSR(etiquetas, offsets, vecinos, pesos, valores_pesos)
+
+# Recibe la cabecera y las secciones de una instantanea y devuelve su contenido (ver cargar_instantanea), o None si
+# las secciones no son consistentes
+def _armar_instantanea(cabecera, secciones):
+    etiquetas = secciones[ETIQUETAS]
+    grafo = _armar_grafo(secciones, etiquetas)
+    if grafo is None or not ids_en_rango(secciones[USUARIOS], len(etiquetas)): return None
+    resultado = {
+        "grafo": grafo,
+        "usuarios": {etiquetas[i] for i in secciones[USUARIOS]},
+        "grafo_canciones": None,
+        "page_rank": None,
+        "motor_page_rank": cabecera.get("motor_page_rank"),
+    }
+    if IDS_CANCIONES in secciones:
+        if not ids_en_rango(secciones[IDS_CANCIONES], len(etiquetas)): return None
+        resultado["grafo_canciones"] = _armar_grafo(secciones, [etiquetas[i] for i in secciones[IDS_CANCIONES]],
+                                                    PREFIJO_CANCIONES)
+        if resultado["grafo_canciones"] is None: return None
+    if IDS_PAGE_RANK in secciones:
+        ids, valores = secciones[IDS_PAGE_RANK], secciones[VALORES_PAGE_RANK]
+        if len(ids) != len(valores) or not ids_en_rango(ids, len(etiquetas)): return None
+        resultado["page_rank"] = {etiquetas[i]: rank for i, rank in zip(ids, valores)}
+    return resultado
+
+#*******************************************************************
+#                           ESCRITURA
+#*******************************************************************
+
+# Recibe un GrafoCSR y un prefijo y devuelve las secciones que lo representan
+def _secciones_grafo(grafo, prefijo = ""):
+    return {
+        prefijo + VALORES_PESOS: (TIPO_JSON, grafo.valores_pesos),
+        prefijo + OFFSETS: (TIPO_OFFSETS, grafo.offsets),
+        prefijo + VECINOS: (TIPO_IDS, grafo.vecinos),
+        prefijo + PESOS: (TIPO_IDS, grafo.pesos),
+    }
+
+# Recibe el tipo y el contenido de una seccion y devuelve sus bytes
+def _serializar(tipo, contenido):
+    if tipo == TIPO_JSON: return json.dumps(contenido, ensure_ascii = False).encode()
+    if isinstance(contenido, memoryview): return contenido.tobytes()
+    return array(tipo, contenido).tobytes()
+
+# Recibe la ruta de un archivo, su MAGIA, un diccionario con los datos de su cabecera y un diccionario con sus
+# secciones (nombre: (tipo, contenido)) y escribe el archivo con el formato de la instantanea. Se escribe primero un
+# archivo temporal que luego reemplaza al anterior, de modo que nunca quede un archivo a medio escribir
+def guardar_secciones(ruta, magia, cabecera, secciones):
+    datos = bytearray()
+    descripcion = {}
+    for nombre, (tipo, contenido) in secciones.items():
+        datos.extend(bytes(-len(datos) % ALINEACION))
+        contenido = _serializar(tipo, contenido)
+        descripcion[nombre] = [len(datos), len(contenido), tipo, zlib.crc32(contenido)]
+        datos.extend(contenido)
+
+    cabecera = dict(cabecera, secciones = descripcion)
+    cabecera_bytes = json.dumps(cabecera).encode()
+    fin_cabecera = len(magia) + struct.calcsize(FORMATO_CABECERA) + len(cabecera_bytes)
+    relleno = -fin_cabecera % ALINEACION
+
+    ruta_temporal = ruta + EXTENSION_TEMPORAL
+    with open(ruta_temporal, "wb") as archivo:
+        archivo.write(magia)
+        archivo.write(struct.pack(FORMATO_CABECERA, len(cabecera_bytes), zlib.crc32(cabecera_bytes)))
+        archivo.write(cabecera_bytes)
+        archivo.write(bytes(relleno))
+        archivo.write(datos)
+    os.replace(ruta_temporal, ruta)
+
+# Recibe la ruta de la instantanea, la clave del archivo de canciones, el GrafoCSR de usuarios y canciones, el set de
+# usuarios y opcionalmente el grafo de canciones, el pagerank de las canciones y el motor con el que se calculó, y
+# escribe la instantanea
+def guardar_instantanea(ruta, clave, grafo, usuarios, grafo_canciones = None, page_rank = None, motor_page_rank = None):
+    secciones = {ETIQUETAS: (TIPO_JSON, grafo.etiquetas)}
+    secciones.update(_secciones_grafo(grafo))
+    indices = grafo.indices
+    secciones[USUARIOS] = (TIPO_IDS, [indices[usuario] for usuario in usuarios])
+    if grafo_canciones is not None:
+        grafo_canciones = convertir_a_csr(grafo_canciones)
+        secciones[IDS_CANCIONES] = (TIPO_IDS, [indices[cancion] for cancion in grafo_canciones.etiquetas])
+        secciones.update(_secciones_grafo(grafo_canciones, PREFIJO_CANCIONES))
+    if page_rank is not None:
+        secciones[IDS_PAGE_RANK] = (TIPO_IDS, [indices[cancion] for cancion in page_rank])
+        secciones[VALORES_PAGE_RANK] = (TIPO_RANKS, list(page_rank.values()))
+    cabecera = {"version": VERSION, "clave": clave.datos(), "motor_page_rank": motor_page_rank}
+    guardar_secciones(ruta, MAGIA, cabecera, secciones)
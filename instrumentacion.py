@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+from time import perf_counter
+import json
+import sys
+import tracemalloc
+
+# Limites superiores (en milisegundos) de los intervalos del histograma de latencias de cada comando. El ultimo
+# intervalo junta todo lo que supere el ultimo limite
+LIMITES_HISTOGRAMA_MS = (0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000, 3000, 10000)
+ETIQUETA_SIN_LIMITE = "mas"
+
+class Metricas:
+
+    # Crea un registro de metricas inactivo. Mientras esté inactivo las funciones instrumentadas solo consultan el
+    # atributo "activo", por lo que el costo de tener la instrumentacion es practicamente nulo
+    def __init__(self):
+        self.activo = False
+        self.inicio = None
+        self.fases = {}
+        self.comandos = {}
+        self.recorridos = {}
+
+    # Empieza a registrar metricas y a seguir la memoria reservada con tracemalloc
+    def activar(self):
+        self.activo = True
+        self.inicio = perf_counter()
+        if not tracemalloc.is_tracing(): tracemalloc.start()
+
+    # Bloque with que suma el tiempo que tarda su cuerpo a la fase con el nombre recibido. Una fase puede ejecutarse
+    # varias veces (se acumula); si la fase se ejecuta dentro de otra, su tiempo cuenta en ambas
+    @contextmanager
+    def fase(self, nombre):
+        if not self.activo:
+            yield
+            return
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            fase = self.fases.setdefault(nombre, {"veces": 0, "segundos": 0.0})
+            fase["veces"] += 1
+            fase["segundos"] += perf_counter() - inicio
+
+    # Recibe el nombre de un comando y lo que tardó en ejecutarse y lo agrega a su histograma de latencias
+    def registrar_comando(self, comando, segundos):
+        registro = self.comandos.get(comando)
+        if registro is None:
+            registro = {"cantidad": 0, "segundos": 0.0, "maximo_ms": 0.0,
+                        "histograma": [0] * (len(LIMITES_HISTOGRAMA_MS) + 1)}
+            self.comandos[comando] = registro
+        milisegundos = segundos * 1000
+        registro["cantidad"] += 1
+        registro["segundos"] += segundos
+        registro["maximo_ms"] = max(registro["maximo_ms"], milisegundos)
+        intervalo = 0
+        while intervalo < len(LIMITES_HISTOGRAMA_MS) and milisegundos > LIMITES_HISTOGRAMA_MS[intervalo]: intervalo += 1
+        registro["histograma"][intervalo] += 1
+
+    # Recibe el nombre de un recorrido y la cantidad de vertices y de aristas que visitó en una ejecucion y los suma
+    # a los del recorrido
+    def registrar_recorrido(self, nombre, vertices, aristas):
+        registro = self.recorridos.setdefault(nombre, {"llamadas": 0, "vertices": 0, "aristas": 0})
+        registro["llamadas"] += 1
+        registro["vertices"] += vertices
+        registro["aristas"] += aristas
+
+    # Devuelve un diccionario con todas las metricas registradas
+    def reporte(self):
+        etiquetas = [str(limite) for limite in LIMITES_HISTOGRAMA_MS] + [ETIQUETA_SIN_LIMITE]
+        comandos = {}
+        for comando, registro in self.comandos.items():
+            comandos[comando] = {
+                "cantidad": registro["cantidad"],
+                "segundos": registro["segundos"],
+                "media_ms": registro["segundos"] * 1000 / registro["cantidad"],
+                "maximo_ms": registro["maximo_ms"],
+                "histograma_ms": dict(zip(etiquetas, registro["histograma"])),
+            }
+        _, pico = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "segundos_totales": perf_counter() - self.inicio if self.inicio is not None else 0.0,
+            "fases": self.fases,
+            "comandos": comandos,
+            "recorridos": self.recorridos,
+            "memoria_pico_bytes": pico,
+        }
+
+    # Escribe el reporte como JSON en la ruta recibida, o en stderr si la ruta es None
+    def escribir_reporte(self, ruta = None):
+        if ruta is None:
+            json.dump(self.reporte(), sys.stderr, indent = 2)
+            print(file = sys.stderr)
+            return
+        with open(ruta, "w") as archivo: json.dump(self.reporte(), archivo, indent = 2)
+
+# Registro de metricas del programa, compartido por todos los modulos
+metricas = Metricas()
@@ -0,0 +1,132 @@
+from grafo_csr import GrafoCSR
+from collections import OrderedDict
+
+# Cantidad de vecindarios de canciones que se guardan ya calculados
+TAMANIO_CACHE_PROYECCION = 4096
+
+PROYECCION_SOLO_LECTURA = "La proyeccion de canciones es de solo lectura"
+
+class ProyeccionCanciones:
+
+    # Crea una vista del grafo que relaciona canciones que aparecen en playlists de un mismo usuario, sin construirlo:
+    # los adyacentes de cada cancion se calculan cuando se piden, a dos saltos (a traves de los usuarios) en el grafo
+    # bipartito de usuarios y canciones. Los ultimos vecindarios calculados se guardan en una cache acotada
+    # Pre: "grafo_usuarios_canciones" es el grafo bipartito y "usuarios" el set de sus vertices que son usuarios
+    # Post: se devolvió una vista con las mismas primitivas de lectura que Grafo
+    def __init__(self, grafo_usuarios_canciones, usuarios, tamanio_cache = TAMANIO_CACHE_PROYECCION):
+        self.grafo = grafo_usuarios_canciones
+        self.usuarios = usuarios
+        self.tamanio_cache = tamanio_cache
+        self.cache = OrderedDict()
+        self.version_cache = grafo_usuarios_canciones.version
+        # posicion de cada usuario entre los vertices del grafo bipartito (si no es un GrafoCSR, que ya la tiene como
+        # id), que se arma la primera vez que se necesita
+        self.posiciones_usuarios = None
+        # adyacencia en formato CSR que arma obtener_csr (funciones_grafos.py), con la version sobre la que se armó
+        self.cache_csr = None
+
+    # La version de la proyeccion es la del grafo bipartito, ya que refleja sus cambios
+    @property
+    def version(self):
+        return self.grafo.version
+
+    # La proyeccion no admite modificaciones: refleja siempre el grafo bipartito
+    def agregar_vertice(self, v):
+        raise TypeError(PROYECCION_SOLO_LECTURA)
+
+    def agregar_arista(self, v, w, peso = 1):
+        raise TypeError(PROYECCION_SOLO_LECTURA)
+
+    # Recibe un usuario y devuelve su posicion entre los vertices del grafo bipartito
+    def _posicion_usuario(self, usuario):
+        if isinstance(self.grafo, GrafoCSR): return self.grafo.indices[usuario]
+        if self.posiciones_usuarios is None:
+            self.posiciones_usuarios = {}
+            for v in self.grafo.obtener_vertices():
+                if v in self.usuarios: self.posiciones_usuarios[v] = len(self.posiciones_usuarios)
+        return self.posiciones_usuarios[usuario]
+
+    # Recibe una cancion y devuelve una tupla con las canciones que comparten algun usuario con ella (sin repetir y
+    # sin incluirla), en el mismo orden que sus adyacentes en el grafo que arma construir_grafo_canciones: este
+    # recorre los usuarios en el orden de los vertices y, al llegar a la cancion, la une primero con las anteriores
+    # del usuario (en el orden del set en el que las fue juntando, que se arma igual) y despues con las siguientes
+    # Complejidad: O(suma de los grados de los usuarios de la cancion) mas ordenar sus usuarios
+    def _calcular_adyacentes(self, v):
+        adyacentes = {}
+        for usuario in sorted(self.grafo.vista_adyacentes(v), key = self._posicion_usuario):
+            canciones = iter(self.grafo.vista_adyacentes(usuario))
+            anteriores = set()
+            for cancion in canciones:
+                if cancion == v: break
+                anteriores.add(cancion)
+            for cancion in anteriores: adyacentes[cancion] = None
+            for cancion in canciones: adyacentes[cancion] = None
+        adyacentes.pop(v, None)
+        return tuple(adyacentes)
+
+    # Recibe un vertice y devuelve todos los vertices adyacentes de este
+    # Pre: el vertice "v" es una cancion del grafo bipartito
+    # Post: se devolvió una tupla (que no debe modificarse) con las canciones adyacentes de "v"
+    def adyacentes(self, v):
+        # si el grafo bipartito cambió, los vecindarios guardados pueden estar desactualizados
+        if self.version_cache != self.grafo.version:
+            self.cache.clear()
+            self.posiciones_usuarios = None
+            self.version_cache = self.grafo.version
+        adyacentes = self.cache.get(v)
+        if adyacentes is not None:
+            self.cache.move_to_end(v)
+            return adyacentes
+        adyacentes = self._calcular_adyacentes(v)
+        self.cache[v] = adyacentes
+        if len(self.cache) > self.tamanio_cache: self.cache.popitem(last = False)
+        return adyacentes
+
+    # La tupla de adyacentes ya es de solo lectura, por lo que sirve como vista
+    def vista_adyacentes(self, v):
+        return self.adyacentes(v)
+
+    # Devuelve la cantidad de canciones adyacentes de "v"
+    def grado(self, v):
+        return len(self.adyacentes(v))
+
+    # Devuelve la cancion adyacente de "v" en la posicion "i"
+    def adyacente(self, v, i):
+        return self.adyacentes(v)[i]
+
+    # Indica si dos canciones son adyacentes o no
+    # Pre: ambos vertices son canciones del grafo bipartito
+    # Post: se devolvió True si "w" era adyacente de "v" y False en el caso contrario
+    def son_adyacentes(self, v, w):
+        if v == w: return False
+        if v in self.cache and self.version_cache == self.grafo.version: return w in self.cache[v]
+        for usuario in self.grafo.vista_adyacentes(v):
+            if self.grafo.son_adyacentes(usuario, w): return True
+        return False
+
+    # Dadas dos canciones devuelve el peso de la arista que las une, que siempre es 1
+    # Post: devolvió 1, o None en caso de que "w" no fuese adycacente de "v"
+    def peso_arista(self, v, w):
+        if not self.son_adyacentes(v, w): return None
+        return 1
+
+    # Devuelve una lista con todas las canciones
+    def obtener_vertices(self):
+        return [v for v in self.grafo.obtener_vertices() if v not in self.usuarios]
+
+    # Devuelve una cancion aleatoria, o None si no hay canciones
+    def vertice_aleatorio(self):
+        if len(self) == 0: return None
+        while True:
+            v = self.grafo.vertice_aleatorio()
+            if v not in self.usuarios: return v
+
+    # Recibe un vertice y devuelve True si es una cancion del grafo bipartito
+    def vertice_pertenece(self, v):
+        return v not in self.usuarios and self.grafo.vertice_pertenece(v)
+
+    # Devuelve la cantidad de canciones. Como obtener_vertices y vertice_pertenece, supone que ninguna etiqueta es a la
+    # vez usuario y cancion: si la hubiera, es un unico vertice del grafo bipartito que cuenta como usuario y no se
+    # proyecta (construir_grafo_canciones, en cambio, la agregaria como cancion)
+    def __len__(self) -> int:
+        return len(self.grafo) - len(self.usuarios)
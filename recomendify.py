@@ -1,8 +1,27 @@
 from grafo import Grafo
+from grafo_csr import GrafoCSR, ConstructorGrafoCSR, convertir_a_grafo, TIPO_IDS
+from etiquetas import DiccionarioEtiquetas
+from proyeccion import ProyeccionCanciones
+from cache_comandos import CacheComandos
+from servidor import servir
+from instrumentacion import metricas
+from grafo_disco import GrafoDisco, ConstructorGrafoDisco, ruta_grafo_disco, abrir_grafo_disco
+from instantanea import ruta_instantanea, clave_archivo, cargar_instantanea, guardar_instantanea
+from coocurrencia import ruta_indice, construir_indice, cargar_indice, guardar_indice
+from componentes import componentes_de_grafo
 from funciones_grafos import *
 import sys
 from sys import stdin
-from os.path import exists
+from os.path import exists, getsize
+from os import cpu_count
+from contextlib import nullcontext, redirect_stdout
+from multiprocessing import Pool
+from array import array
+from itertools import islice
+from time import perf_counter
+from collections import OrderedDict
+import gzip
+import io
 import heapq
 
 #*******************************************************************
@@ -16,6 +35,102 @@ ENTRADA = 2
 CANT_PARAMETROS_CON_ARCHIVO_ENTRADAS = 3
 CANT_PARAMETROS_MAX = 4
 
+# Opciones del programa (se pasan como "--opcion" o "--opcion=valor" en cualquier posicion)
+PREFIJO_OPCION = "--"
+SEPARADOR_VALOR_OPCION = "="
+OPCION_COMPACTO = "compacto"
+OPCION_PAGERANK = "pagerank"
+OPCION_INSTANTANEA = "instantanea"
+OPCION_PROCESOS = "procesos"
+OPCION_PROYECCION = "proyeccion"
+OPCION_RECORRIDOS = "recorridos"
+OPCION_SEMILLA = "semilla"
+OPCION_CAMINO = "camino"
+OPCION_CICLO = "ciclo"
+OPCION_CICLO_MAX_MS = "ciclo-max-ms"
+OPCION_CICLO_MAX_EXPANSIONES = "ciclo-max-expansiones"
+OPCION_CACHE = "cache"
+OPCION_SERVIDOR = "servidor"
+OPCION_PARALELO = "paralelo"
+OPCION_AGREGAR = "agregar"
+OPCION_PERFIL = "perfil"
+OPCION_RECOMENDACION = "recomendacion"
+OPCION_INDICE = "indice"
+OPCION_PLANIFICADOR = "planificador"
+OPCION_COMPONENTES = "componentes"
+OPCION_PRECALENTAR = "precalentar"
+OPCION_DISCO = "disco"
+OPCION_MEMORIA = "memoria"
+
+# Cada pool de procesos tiene su propia opcion de tamaño: --procesos es el de la carga del archivo, y los demas los de
+# los Random Walks por lotes, los comandos con --paralelo y el servidor. Los procesos de un pool no crean otros pools
+# (ver vertices_similares_lote), por lo que los tamaños no se multiplican
+OPCION_PROCESOS_RECORRIDOS = "procesos-recorridos"
+OPCION_PROCESOS_PARALELO = "procesos-paralelo"
+OPCION_PROCESOS_SERVIDOR = "procesos-servidor"
+
+# Motores de PageRank disponibles para el comando mas_importantes
+MOTOR_PAGERANK_ITERATIVO = "iterativo"
+MOTOR_PAGERANK_VECTORIZADO = "vectorizado"
+
+# Motores de Random Walks disponibles para el comando recomendacion
+MOTOR_RECORRIDOS_RECURSIVO = "recursivo"
+MOTOR_RECORRIDOS_LOTE = "lote"
+MOTOR_RECORRIDOS_VECTORIZADO = "vectorizado"
+
+# Motores de Random Walks que recorren la adyacencia en formato CSR (ver vertices_similares_lote)
+MOTORES_RECORRIDOS_CSR = (MOTOR_RECORRIDOS_LOTE, MOTOR_RECORRIDOS_VECTORIZADO)
+
+# Motores de recomendacion: Random Walks en cada consulta, el indice de co-ocurrencia precalculado o el pagerank
+# personalizado por empuje local (determinista)
+MOTOR_RECOMENDACION_RECORRIDOS = "recorridos"
+MOTOR_RECOMENDACION_INDICE = "indice"
+MOTOR_RECOMENDACION_PUSH = "push"
+
+# Algoritmos de BFS disponibles para el comando camino
+BFS_UNIDIRECCIONAL = "unidireccional"
+BFS_BIDIRECCIONAL = "bidireccional"
+
+# Algoritmos de busqueda disponibles para el comando ciclo
+CICLO_RECURSIVO = "recursivo"
+CICLO_PODADO = "podado"
+
+# Opciones validas y, para las que lo requieren, los valores que pueden tomar (None si no tienen valores fijos)
+OPCIONES_VALIDAS = {
+    OPCION_COMPACTO: None,
+    OPCION_PAGERANK: {MOTOR_PAGERANK_ITERATIVO, MOTOR_PAGERANK_VECTORIZADO},
+    OPCION_INSTANTANEA: None,
+    OPCION_PROCESOS: None,
+    OPCION_PROYECCION: None,
+    OPCION_RECORRIDOS: {MOTOR_RECORRIDOS_RECURSIVO, MOTOR_RECORRIDOS_LOTE, MOTOR_RECORRIDOS_VECTORIZADO},
+    OPCION_SEMILLA: None,
+    OPCION_CAMINO: {BFS_UNIDIRECCIONAL, BFS_BIDIRECCIONAL},
+    OPCION_CICLO: {CICLO_RECURSIVO, CICLO_PODADO},
+    OPCION_CICLO_MAX_MS: None,
+    OPCION_CICLO_MAX_EXPANSIONES: None,
+    OPCION_CACHE: None,
+    OPCION_SERVIDOR: None,
+    OPCION_PARALELO: None,
+    OPCION_AGREGAR: None,
+    OPCION_PERFIL: None,
+    OPCION_RECOMENDACION: {MOTOR_RECOMENDACION_RECORRIDOS, MOTOR_RECOMENDACION_INDICE, MOTOR_RECOMENDACION_PUSH},
+    OPCION_INDICE: None,
+    OPCION_PLANIFICADOR: None,
+    OPCION_COMPONENTES: None,
+    OPCION_PRECALENTAR: None,
+    OPCION_DISCO: None,
+    OPCION_MEMORIA: None,
+    OPCION_PROCESOS_RECORRIDOS: None,
+    OPCION_PROCESOS_PARALELO: None,
+    OPCION_PROCESOS_SERVIDOR: None,
+}
+
+# Opciones cuyo valor debe ser un numero entero y el minimo valor que pueden tomar
+OPCIONES_NUMERICAS = {OPCION_PROCESOS: 1, OPCION_SEMILLA: 0, OPCION_CICLO_MAX_MS: 1, OPCION_CICLO_MAX_EXPANSIONES: 1,
+                      OPCION_MEMORIA: 1, OPCION_PROCESOS_RECORRIDOS: 1, OPCION_PROCESOS_PARALELO: 1,
+                      OPCION_PROCESOS_SERVIDOR: 1}
+
+
 # Posiciones dentro del archivo de canciones
 ID = 0
 USER_ID = 1
@@ -35,6 +150,15 @@ RANGO = "rango"
 # Separador de los valores en el archivo de canciones
 SEPARADOR_ARCHIVO = "\t"
 
+# Ruta que indica que el archivo de canciones se lee de la entrada estandar, y bytes iniciales de un archivo gzip
+RUTA_ENTRADA_ESTANDAR = "-"
+MAGIA_GZIP = b"\x1f\x8b"
+
+# Valores de la carga paralela del archivo de canciones: cantidad de tramos por proceso (para repartir mejor la carga)
+# y cantidad de lineas por lote cuando el archivo no se puede dividir (comprimido o entrada estandar)
+TRAMOS_POR_PROCESO = 4
+LINEAS_POR_LOTE = 50000
+
 # Separadores de las canciones y su autor en los Grafos
 SEPARADOR_CANCIONES_GRAFO = " - "
 
@@ -64,9 +188,16 @@ SEPARADOR_CAMINO_USUARIOS_A_PLAYLIST = " --> tiene una playlist --> "
 # Mensajes de error
 ARCHIVO_CANCIONES_INEXISTENTE = "El archivo de canciones es inaccesible"
 ARCHIVO_ENTRADAS_INEXISTENTE = "El archivo de entradas es inaccesible"
+ARCHIVO_AGREGADO_INEXISTENTE = "El archivo de filas nuevas es inaccesible"
 CANT_PARAMETROS_INCORRECTA = "La cantidad de parámetros es incorrecta"
+OPCION_INVALIDA = "Opcion invalida: "
+CANCIONES_Y_COMANDOS_EN_ENTRADA_ESTANDAR = "Si las canciones se leen de la entrada estandar, los comandos deben pasarse en un archivo"
+INSTANTANEA_CON_ENTRADA_ESTANDAR = "No se puede usar una instantanea leyendo las canciones de la entrada estandar"
+DISCO_CON_ENTRADA_ESTANDAR = "No se puede usar el grafo en disco leyendo las canciones de la entrada estandar"
+DISCO_INCOMPATIBLE = "El grafo en disco es de solo lectura: no se puede usar con --agregar ni con --instantanea"
 
 RECORRIDO_INEXISTENTE = "No se encontro recorrido"
+RECORRIDO_FUERA_DE_LIMITE = "No se encontro recorrido dentro del limite"
 CANCION_INEXISTENTE = "No se encontro la cancion"
 NUMERO_N_INVALIDO = "Numero invalido"
 CANCION_NO_VALIDA = "Tanto el origen como el destino deben ser canciones"
@@ -75,14 +206,84 @@ CANCION_NO_VALIDA = "Tanto el origen como el destino deben ser canciones"
 PAGERANK_AMORTIGUACION = 0.5
 PAGERANK_ITERACIONES = 15
 
+# Valores del motor de PageRank vectorizado, que itera hasta converger:
+PAGERANK_TOLERANCIA = 1e-9
+PAGERANK_ITERACIONES_MAX = 100
+MENSAJE_CONVERGENCIA_PAGERANK = "PageRank: {} iteraciones, residuo {:.3e}"
+
+# Memoria (en MB) que usa por defecto el grafo en disco:
+MEMORIA_DISCO_MB = 256
+
+# Cantidad maxima de canciones cuyo perfil de distancias se guarda para responder el comando rango:
+TAMANIO_CACHE_RANGO = 1024
+
+# Limites de la cache de resultados de comandos (cantidad de comandos y caracteres de salida guardados):
+TAMANIO_CACHE_COMANDOS = 10000
+CARACTERES_CACHE_COMANDOS = 1 << 26
+
 # Valores del algoritmo de PageRank personalizado que le aplica a los Random Walks:
 RANDOM_WALK_LARGO = 500
 RANDOM_WALK_ITERACIONES = 150
 
+# Valores del pagerank personalizado por empuje local: probabilidad de volver a las semillas y tolerancia del residuo
+PUSH_ALFA = 0.15
+PUSH_EPSILON = 1e-5
+
+# Nombres de las fases cuyo tiempo se informa en el reporte de --perfil
+FASE_CARGA = "carga"
+FASE_CARGA_INSTANTANEA = "carga_instantanea"
+FASE_CARGA_DISCO = "carga_disco"
+FASE_GUARDADO_INSTANTANEA = "guardado_instantanea"
+FASE_INGESTA_INCREMENTAL = "ingesta_incremental"
+FASE_GRAFO_CANCIONES = "grafo_canciones"
+FASE_PAGE_RANK = "page_rank"
+FASE_COMANDOS = "comandos"
+FASE_INDICE = "indice_coocurrencia"
+FASE_COMPONENTES = "componentes"
+FASE_ESPERA_PRECALCULO = "espera_precalculo"
+
+# Recibe la lista de parametros pasados al programa y devuelve la lista de parametros posicionales (sin las
+# opciones) y un diccionario con las opciones como clave y su valor (o True si no tenían valor) como valor
+def separar_opciones(lista_parametros):
+    parametros = []
+    opciones = {}
+    for parametro in lista_parametros:
+        if not parametro.startswith(PREFIJO_OPCION):
+            parametros.append(parametro)
+            continue
+        nombre, separador, valor = parametro[len(PREFIJO_OPCION):].partition(SEPARADOR_VALOR_OPCION)
+        opciones[nombre] = valor if separador else True
+    return parametros, opciones
+
+# Recibe un diccionario de opciones y devuelve True si todas son validas. Imprime un mensaje de error y devuelve
+# False en caso contrario
+def validar_opciones(opciones):
+    for opcion, valor in opciones.items():
+        if opcion not in OPCIONES_VALIDAS or (OPCIONES_VALIDAS[opcion] and valor not in OPCIONES_VALIDAS[opcion]):
+            print(OPCION_INVALIDA + PREFIJO_OPCION + opcion)
+            return False
+        if opcion in OPCIONES_NUMERICAS and (valor is True or not valor.isdigit() or int(valor) < OPCIONES_NUMERICAS[opcion]):
+            print(OPCION_INVALIDA + PREFIJO_OPCION + opcion)
+            return False
+    return True
+
 # Recibe una lista con los parametros pasados al programa y devuelve True en caso de que sean validos.
 # Imprime un mensaje de error y devuelve False en caso de que no sean validos y no se pueda seguir con el programa
-def validar_parametros(lista_parametros):
-    if not exists(lista_parametros[ARCHIVO_CANCIONES]):
+def validar_parametros(lista_parametros, opciones = None):
+    if opciones is None: opciones = {}
+    ruta_archivo = lista_parametros[ARCHIVO_CANCIONES]
+    if ruta_archivo == RUTA_ENTRADA_ESTANDAR:
+        # en modo servidor los comandos llegan por el socket, no por la entrada estandar
+        if len(lista_parametros) != CANT_PARAMETROS_CON_ARCHIVO_ENTRADAS and OPCION_SERVIDOR not in opciones:
+            print(CANCIONES_Y_COMANDOS_EN_ENTRADA_ESTANDAR)
+            return False
+        if OPCION_INSTANTANEA in opciones:
+            print(INSTANTANEA_CON_ENTRADA_ESTANDAR)
+            return False
+        if OPCION_DISCO in opciones:
+            print(DISCO_CON_ENTRADA_ESTANDAR)
+            return False
+    elif not exists(ruta_archivo):
         print(ARCHIVO_CANCIONES_INEXISTENTE)
         return False
     if len(lista_parametros) > CANT_PARAMETROS_MAX:
@@ -91,6 +292,12 @@ def validar_parametros(lista_parametros):
     if len(lista_parametros) == CANT_PARAMETROS_CON_ARCHIVO_ENTRADAS and not exists(lista_parametros[ENTRADA]):
         print(ARCHIVO_ENTRADAS_INEXISTENTE)
         return False
+    if OPCION_AGREGAR in opciones and (opciones[OPCION_AGREGAR] is True or not exists(opciones[OPCION_AGREGAR])):
+        print(ARCHIVO_AGREGADO_INEXISTENTE)
+        return False
+    if OPCION_DISCO in opciones and (OPCION_AGREGAR in opciones or OPCION_INSTANTANEA in opciones):
+        print(DISCO_INCOMPATIBLE)
+        return False
     return True
 
 # Recibe una linea del archivo de datos y devuelve una lista donde cada elemento es un campo particular del archivo
@@ -107,22 +314,150 @@ def agregar_entrada_grafo_mixto(grafo, usuario, cancion, playlist):
     grafo.agregar_vertice(usuario)
     grafo.agregar_arista(cancion, usuario, playlist)
 
+# Recibe la ruta del archivo de canciones y devuelve True si es un archivo comprimido con gzip
+def es_archivo_gzip(ruta_archivo):
+    with open(ruta_archivo, 'rb') as archivo:
+        return archivo.read(len(MAGIA_GZIP)) == MAGIA_GZIP
+
+# Recibe la ruta del archivo de canciones y lo abre en modo texto. Si la ruta es RUTA_ENTRADA_ESTANDAR devuelve la
+# entrada estandar (que no se cierra al salir del bloque with), y si está comprimido con gzip lo descomprime al leer
+def abrir_archivo_canciones(ruta_archivo):
+    if ruta_archivo == RUTA_ENTRADA_ESTANDAR: return nullcontext(stdin)
+    if es_archivo_gzip(ruta_archivo): return gzip.open(ruta_archivo, 'rt')
+    return open(ruta_archivo, 'r')
+
 # Recibe un archivo de datos y devuelve un grafo bipartito que relaciona usuarios 
-# y canciones que les gustan y un set con todos los usuarios del archivo
-def procesar_archivo(ruta_archivo):
-    with open(ruta_archivo, 'r') as archivo:
+# y canciones que les gustan y un set con todos los usuarios del archivo. Si "compacto" es True el grafo
+# devuelto es un GrafoCSR (inmutable, con mucho menor consumo de memoria) en lugar de un Grafo de diccionarios.
+# El ConstructorGrafoCSR ya guarda una sola copia de cada etiqueta; al Grafo se le pasan las canonicas de los
+# diccionarios de etiquetas, para que las filas repetidas no agreguen copias de las mismas cadenas
+def procesar_archivo(ruta_archivo, compacto = False):
+    with abrir_archivo_canciones(ruta_archivo) as archivo:
         next(archivo)
         usuarios = set()
-        grafo_usuarios_canciones = Grafo()
+        grafo_usuarios_canciones = ConstructorGrafoCSR() if compacto else Grafo()
+        vertices, playlists = DiccionarioEtiquetas(), DiccionarioEtiquetas()
         for linea in archivo:
             linea = limpiar_linea_archivo(linea)
             cancion = linea[TRACK_NAME] + SEPARADOR_CANCIONES_GRAFO + linea[ARTIST]
             usuario = linea[USER_ID]
             playlist = linea[PLAYLIST_NAME]
+            if not compacto:
+                cancion, usuario = vertices.canonica(cancion), vertices.canonica(usuario)
+                playlist = playlists.canonica(playlist)
             usuarios.add(usuario)
             agregar_entrada_grafo_mixto(grafo_usuarios_canciones, usuario, cancion, playlist)
+        if compacto: grafo_usuarios_canciones = grafo_usuarios_canciones.construir()
         return grafo_usuarios_canciones, usuarios
 
+#*******************************************************************
+#                 CARGA PARALELA DEL ARCHIVO DE CANCIONES
+#*******************************************************************
+
+# Recibe una lista de lineas del archivo de canciones y las procesa en un proceso del pool. Devuelve una tupla con
+# la lista de vertices (canciones y usuarios) en el orden en que aparecen por primera vez, la lista de playlists, el
+# set de usuarios y tres arreglos paralelos con una fila (cancion, usuario, playlist) por linea, donde cada valor es
+# la posicion en esas listas (un diccionario de cadenas propio del tramo, que luego se combina con el global)
+def procesar_lineas(lineas):
+    vertices = {}
+    playlists = {}
+    usuarios = set()
+    canciones_ids, usuarios_ids, playlists_ids = array(TIPO_IDS), array(TIPO_IDS), array(TIPO_IDS)
+    for linea in lineas:
+        linea = limpiar_linea_archivo(linea)
+        cancion = linea[TRACK_NAME] + SEPARADOR_CANCIONES_GRAFO + linea[ARTIST]
+        usuario = linea[USER_ID]
+        usuarios.add(usuario)
+        # la cancion se agrega antes que el usuario, igual que en agregar_entrada_grafo_mixto
+        canciones_ids.append(vertices.setdefault(cancion, len(vertices)))
+        usuarios_ids.append(vertices.setdefault(usuario, len(vertices)))
+        playlists_ids.append(playlists.setdefault(linea[PLAYLIST_NAME], len(playlists)))
+    return list(vertices), list(playlists), usuarios, canciones_ids, usuarios_ids, playlists_ids
+
+# Recibe la ruta del archivo de canciones y las posiciones en bytes de inicio y fin de un tramo que empieza y termina
+# en un fin de linea, y lo procesa con procesar_lineas
+def procesar_tramo(ruta_archivo, inicio, fin):
+    with open(ruta_archivo, 'rb') as archivo:
+        archivo.seek(inicio)
+        datos = archivo.read(fin - inicio)
+    return procesar_lineas(io.StringIO(datos.decode(), newline = None))
+
+# Recibe la ruta de un archivo de canciones sin comprimir y la cantidad de tramos deseada y devuelve una lista de
+# tuplas (ruta, inicio, fin) que lo dividen (sin la linea de encabezado) en tramos de tamaño parecido que empiezan y
+# terminan en un fin de linea
+def dividir_archivo(ruta_archivo, cantidad_tramos):
+    tamanio = getsize(ruta_archivo)
+    with open(ruta_archivo, 'rb') as archivo:
+        archivo.readline()
+        limites = [archivo.tell()]
+        for i in range(1, cantidad_tramos):
+            archivo.seek(max(limites[-1], tamanio * i // cantidad_tramos))
+            archivo.readline()
+            if archivo.tell() >= tamanio: break
+            if archivo.tell() > limites[-1]: limites.append(archivo.tell())
+    limites.append(tamanio)
+    return [(ruta_archivo, limites[i], limites[i + 1]) for i in range(len(limites) - 1)]
+
+# Recibe un archivo abierto (sin la linea de encabezado) y devuelve un generador de listas de a LINEAS_POR_LOTE lineas
+def dividir_en_lotes(archivo):
+    while True:
+        lote = list(islice(archivo, LINEAS_POR_LOTE))
+        if not lote: return
+        yield lote
+
+# Recibe el grafo en construccion (un Grafo o un ConstructorGrafoCSR), el set de usuarios, el resultado de procesar
+# un tramo y los diccionarios de etiquetas de vertices y de playlists de todo el archivo, y agrega sus vertices y
+# aristas al grafo (al Grafo, con las etiquetas canonicas). Los vertices nuevos del tramo quedan en el orden en que
+# aparecieron y las aristas en el orden de las lineas, por lo que al combinar los tramos en orden el grafo resultante
+# es identico al de procesar_archivo
+def combinar_tramo(grafo_usuarios_canciones, usuarios, resultado, etiquetas_vertices, etiquetas_playlists):
+    vertices, playlists, usuarios_tramo, canciones_ids, usuarios_ids, playlists_ids = resultado
+    usuarios.update(usuarios_tramo)
+    if isinstance(grafo_usuarios_canciones, ConstructorGrafoCSR):
+        ids = [grafo_usuarios_canciones.agregar_vertice(vertice) for vertice in vertices]
+        codigos = [grafo_usuarios_canciones.codigo_peso(playlist) for playlist in playlists]
+        grafo_usuarios_canciones.agregar_aristas_ids([ids[c] for c in canciones_ids], [ids[u] for u in usuarios_ids],
+                                                     [codigos[p] for p in playlists_ids])
+        return
+    vertices = [etiquetas_vertices.canonica(vertice) for vertice in vertices]
+    playlists = [etiquetas_playlists.canonica(playlist) for playlist in playlists]
+    for vertice in vertices: grafo_usuarios_canciones.agregar_vertice(vertice)
+    for c, u, p in zip(canciones_ids, usuarios_ids, playlists_ids):
+        grafo_usuarios_canciones.agregar_arista(vertices[c], vertices[u], playlists[p])
+
+# Igual que procesar_archivo, pero procesa el archivo en paralelo con la cantidad de procesos recibida. Un archivo
+# sin comprimir se divide en tramos que cada proceso lee por su cuenta; un archivo comprimido con gzip o la entrada
+# estandar se leen en el proceso principal y se reparten por lotes de lineas. Los resultados se combinan en el orden
+# del archivo, de modo que el grafo es identico al que se obtiene procesandolo secuencialmente
+def procesar_archivo_paralelo(ruta_archivo, procesos, compacto = False):
+    usuarios = set()
+    grafo_usuarios_canciones = ConstructorGrafoCSR() if compacto else Grafo()
+    etiquetas = (DiccionarioEtiquetas(), DiccionarioEtiquetas())
+    with Pool(procesos) as pool:
+        if ruta_archivo != RUTA_ENTRADA_ESTANDAR and not es_archivo_gzip(ruta_archivo):
+            tramos = dividir_archivo(ruta_archivo, procesos * TRAMOS_POR_PROCESO)
+            for resultado in pool.imap(procesar_tramo_empaquetado, tramos):
+                combinar_tramo(grafo_usuarios_canciones, usuarios, resultado, *etiquetas)
+        else:
+            with abrir_archivo_canciones(ruta_archivo) as archivo:
+                next(archivo)
+                for resultado in pool.imap(procesar_lineas, dividir_en_lotes(archivo)):
+                    combinar_tramo(grafo_usuarios_canciones, usuarios, resultado, *etiquetas)
+    if compacto: grafo_usuarios_canciones = grafo_usuarios_canciones.construir()
+    return grafo_usuarios_canciones, usuarios
+
+# Version de procesar_tramo que recibe sus parametros en una tupla, para usarse con Pool.imap
+def procesar_tramo_empaquetado(tramo):
+    return procesar_tramo(*tramo)
+
+# Recibe la ruta del archivo de canciones, el diccionario de opciones y si se quiere un grafo compacto, y procesa el
+# archivo en paralelo si se pidió con la opcion de procesos o secuencialmente si no
+def cargar_archivo(ruta_archivo, opciones, compacto = False):
+    with metricas.fase(FASE_CARGA):
+        if OPCION_PROCESOS in opciones:
+            return procesar_archivo_paralelo(ruta_archivo, int(opciones[OPCION_PROCESOS]), compacto)
+        return procesar_archivo(ruta_archivo, compacto)
+
 # Recibe una linea de entrada con dos canciones separadas por cierto/s caracter/es
 # y devuelve una lista con cada cancion
 def devolver_lista_canciones(lista_linea):
@@ -156,14 +491,23 @@ def construir_salida_camino(grafo, camino):
 # Recibe un grafo que relaciona usuarios y las canciones que les gustan, la entrada del usuario y un set con los 
 # usuarios e imprime el camino minimo para ir desde la primera cancion pasada en la entrada hasta la segunda. 
 # Imprime un mensaje de error en caso de que alguna cancion no sea parte del grafo o no exista el camino entre 
-# las canciones
-def imprimir_camino_mas_corto(grafo_usuarios_canciones, entrada_usuario, usuarios):
+# las canciones. Las opciones indican si la busqueda se hace con una BFS bidireccional
+def imprimir_camino_mas_corto(grafo_usuarios_canciones, entrada_usuario, usuarios, opciones = None):
+    if opciones is None: opciones = {}
     lista_canciones = devolver_lista_canciones(entrada_usuario[POSICION_ORIGEN_CAMINO:])
     for cancion in lista_canciones:
         if cancion in usuarios or not grafo_usuarios_canciones.vertice_pertenece(cancion):
             print(CANCION_NO_VALIDA)
             return
-    camino = camino_minimo(grafo_usuarios_canciones, lista_canciones[0], lista_canciones[1])
+    if sin_camino(lista_canciones[0], lista_canciones[1]):
+        imprimir_camino(grafo_usuarios_canciones, None)
+        return
+    bidireccional = opciones.get(OPCION_CAMINO) == BFS_BIDIRECCIONAL
+    camino = camino_minimo(grafo_usuarios_canciones, lista_canciones[0], lista_canciones[1], bidireccional)
+    imprimir_camino(grafo_usuarios_canciones, camino)
+
+# Recibe el grafo de usuarios y canciones y un camino entre dos canciones (o None si no existe) y lo imprime
+def imprimir_camino(grafo_usuarios_canciones, camino):
     if not camino:
         print(RECORRIDO_INEXISTENTE)
         return
@@ -186,13 +530,44 @@ def imprimir_n_canciones_mas_importantes(page_rank, entrada_usuario):
     lista_importantes = heapq.nlargest(n, page_rank, key = page_rank.get)
     print(SEPARADOR_CANCIONES_MAS_IMPORTANTES.join(lista_importantes))
 
-# Recibe un grafo que relaciona usuarios y canciones que les gustan, la entrada del usuario y un set con todos
-# los usuarios e imprime "n" usuarios/canciones para recomendar segun la entrada ingresada
-def imprimir_n_recomendaciones(grafo_usuarios_canciones, entrada_usuario, usuarios):
+# Recibe un grafo que relaciona usuarios y canciones que les gustan, una lista de canciones y el diccionario de
+# opciones y devuelve el diccionario de valores de los Random Walks desde esas canciones. Con el motor por lotes los
+# recorridos se hacen de forma iterativa sobre la adyacencia en formato CSR, con la semilla y los procesos de
+# recorridos indicados en las opciones: con un solo proceso es el mismo estimador que los Random Walks recursivos. Con
+# el motor vectorizado los recorridos avanzan todos a la vez, lo que es una aproximacion cuyas recomendaciones pueden
+# no coincidir con las de estos. Con el motor de empuje local los valores son el pagerank personalizado desde las
+# canciones, sin Random Walks
+def calcular_valores_recomendacion(grafo_usuarios_canciones, canciones, opciones):
+    if opciones.get(OPCION_RECOMENDACION) == MOTOR_RECOMENDACION_PUSH:
+        return page_rank_personalizado_push(grafo_usuarios_canciones, canciones, PUSH_ALFA, PUSH_EPSILON)
+    if opciones.get(OPCION_RECORRIDOS) in MOTORES_RECORRIDOS_CSR:
+        semilla = int(opciones[OPCION_SEMILLA]) if OPCION_SEMILLA in opciones else None
+        procesos = int(opciones.get(OPCION_PROCESOS_RECORRIDOS, 1))
+        vectorizado = opciones[OPCION_RECORRIDOS] == MOTOR_RECORRIDOS_VECTORIZADO
+        return vertices_similares_lote(grafo_usuarios_canciones, canciones, RANDOM_WALK_LARGO, RANDOM_WALK_ITERACIONES,
+                                       semilla, procesos, vectorizado)
+    return vertices_similares(grafo_usuarios_canciones, canciones, RANDOM_WALK_LARGO, RANDOM_WALK_ITERACIONES)
+
+# Recibe un grafo que relaciona usuarios y canciones que les gustan, la entrada del usuario, un set con todos
+# los usuarios y el diccionario de opciones e imprime "n" usuarios/canciones para recomendar segun la entrada ingresada.
+# Con el motor del indice la respuesta sale de las listas precalculadas de las canciones, sin hacer Random Walks
+def imprimir_n_recomendaciones(grafo_usuarios_canciones, entrada_usuario, usuarios, opciones = None):
+    if opciones is None: opciones = {}
     tipo_recomendacion = entrada_usuario[POSICION_TIPO_RECOMENDACION]
     n = procesar_numero_n(entrada_usuario[POSICION_NUMERO_N_RECOMENDACION])
     canciones = devolver_lista_canciones(entrada_usuario[POSICION_INICIO_CANCIONES_RECOMENDAR:])
-    valores = vertices_similares(grafo_usuarios_canciones, canciones, RANDOM_WALK_LARGO, RANDOM_WALK_ITERACIONES)
+    if opciones.get(OPCION_RECOMENDACION) == MOTOR_RECOMENDACION_INDICE:
+        indice = obtener_indice_recomendacion(grafo_usuarios_canciones, usuarios)
+        recomendados = indice.recomendar(canciones, n, tipo_recomendacion == RECOMENDACION_TIPO_USUARIO)
+        print(SEPARADOR_CANCIONES_MAS_IMPORTANTES.join(recomendados))
+        return
+    valores = calcular_valores_recomendacion(grafo_usuarios_canciones, canciones, opciones)
+    imprimir_recomendados(valores, canciones, tipo_recomendacion, n, usuarios)
+
+# Recibe el diccionario de valores de los Random Walks, las canciones desde las que se hicieron, el tipo de
+# recomendacion, la cantidad n de recomendaciones y el set de usuarios e imprime los n usuarios/canciones de mayor
+# valor, sin las canciones recibidas
+def imprimir_recomendados(valores, canciones, tipo_recomendacion, n, usuarios):
     for cancion in canciones:
         # Saca de las recomendaciones las canciones que ya sabemos que le gustan a la persona (las que fueron pasadas)
         if cancion in valores: valores.pop(cancion)
@@ -215,13 +590,28 @@ def procesar_cancion(grafo_canciones, entrada_usuario):
         return False
     return cancion
 
-# Recibe el Grafo con las canciones y la entrada del usuario en forma de lista e imprime por pantalla de forma
-# personalizada un ciclo de la longitud "n" recibida por parámetro que comienza desde la cancion
-def imprimir_ciclo_n_canciones(grafo_canciones, entrada_usuario):
+# Recibe el Grafo con las canciones, una cancion, el largo del ciclo y el diccionario de opciones y devuelve el ciclo
+# de ese largo que comienza en la cancion, False si no existe o None si la busqueda podada agotó sus limites
+def buscar_ciclo(grafo_canciones, cancion, n, opciones):
+    if opciones.get(OPCION_CICLO) != CICLO_PODADO: return ciclo_de_largo_n(grafo_canciones, cancion, n)
+    segundos_max = int(opciones[OPCION_CICLO_MAX_MS]) / 1000 if OPCION_CICLO_MAX_MS in opciones else None
+    expansiones_max = int(opciones[OPCION_CICLO_MAX_EXPANSIONES]) if OPCION_CICLO_MAX_EXPANSIONES in opciones else None
+    return ciclo_de_largo_n_podado(grafo_canciones, cancion, n, segundos_max, expansiones_max)
+
+# Recibe el Grafo con las canciones, la entrada del usuario en forma de lista y el diccionario de opciones e imprime
+# por pantalla de forma personalizada un ciclo de la longitud "n" recibida por parámetro que comienza desde la cancion
+def imprimir_ciclo_n_canciones(grafo_canciones, entrada_usuario, opciones = None):
+    if opciones is None: opciones = {}
     cancion = procesar_cancion(grafo_canciones, entrada_usuario)
     n = procesar_numero_n(entrada_usuario[POSICION_NUMERO_N_GENERAL])
     if not cancion or not n: return
-    ciclo = ciclo_de_largo_n(grafo_canciones, cancion, n)
+    if sin_ciclo(cancion, n):
+        print(RECORRIDO_INEXISTENTE)
+        return
+    ciclo = buscar_ciclo(grafo_canciones, cancion, n, opciones)
+    if ciclo is None:
+        print(RECORRIDO_FUERA_DE_LIMITE)
+        return
     if not ciclo:
         print(RECORRIDO_INEXISTENTE)
         return
@@ -231,13 +621,17 @@ def imprimir_ciclo_n_canciones(grafo_canciones, entrada_usuario):
         if indice != len(ciclo) - 1: salida += SEPARADOR_CANCIONES_CICLO 
     print(salida)
 
-# Recibe un grafo que relaciona canciones que aparecen en playlists de un mismo usuario y la entrada del programa
-# e imprime la cantidad de canciones que se encuenten a exactamente n saltos desde la cancion pasada en la entrada
-def imprimir_canciones_rango_n(grafo_canciones, entrada_usuario):
+# Recibe un grafo que relaciona canciones que aparecen en playlists de un mismo usuario, la entrada del programa y
+# un OrderedDict con los perfiles de distancias ya calculados de cada cancion, e imprime la cantidad de canciones que
+# se encuenten a exactamente n saltos desde la cancion pasada en la entrada
+def imprimir_canciones_rango_n(grafo_canciones, entrada_usuario, perfiles_rango):
     cancion = procesar_cancion(grafo_canciones, entrada_usuario)
     n = procesar_numero_n(entrada_usuario[POSICION_NUMERO_N_GENERAL])
     if not cancion or not n: return
-    print(cantidad_de_rango_n(grafo_canciones, cancion, n))
+    if sin_rango(cancion, n):
+        print(0)
+        return
+    print(cantidad_de_rango_n_con_cache(grafo_canciones, cancion, n, perfiles_rango, TAMANIO_CACHE_RANGO))
 
 # Recibe un grafo que relaciona usuarios y canciones que les gustan y un set con los usuarios y devuelve otro grafo
 # que relaciona canciones que aparecen en playlists de un mismo usuario
@@ -246,68 +640,749 @@ def construir_grafo_canciones(grafo_usuarios_canciones, usuarios):
     for vertice in grafo_usuarios_canciones.obtener_vertices():
         if vertice in usuarios:
             canciones_usuario_actual = set()
-            for cancion in grafo_usuarios_canciones.adyacentes(vertice):
+            for cancion in grafo_usuarios_canciones.vista_adyacentes(vertice):
                 grafo_canciones.agregar_vertice(cancion)
                 for cancion_de_usuario in canciones_usuario_actual:
                     grafo_canciones.agregar_arista(cancion, cancion_de_usuario)
                 canciones_usuario_actual.add(cancion)
     return grafo_canciones
 
-# Recibe un grafo que relaciona usuarios y canciones que les gustan y un set con los usuarios y devuelve un diccionario
-# con canciones como claves y su importancia como valores
-def calcular_page_ranks(grafo_usuarios_canciones, usuarios):
-    page_rank = page_ranks(grafo_usuarios_canciones, PAGERANK_AMORTIGUACION, PAGERANK_ITERACIONES)
+# Recibe un grafo que relaciona usuarios y canciones que les gustan, un set con los usuarios y el diccionario de
+# opciones y devuelve el grafo que relaciona canciones que aparecen en playlists de un mismo usuario: una proyeccion
+# que calcula los adyacentes a medida que se piden si se pasó la opcion correspondiente, o el grafo construido si no
+def obtener_grafo_canciones(grafo_usuarios_canciones, usuarios, opciones):
+    if OPCION_PROYECCION in opciones: return ProyeccionCanciones(grafo_usuarios_canciones, usuarios)
+    with metricas.fase(FASE_GRAFO_CANCIONES):
+        return construir_grafo_canciones(grafo_usuarios_canciones, usuarios)
+
+# Recibe un grafo que relaciona usuarios y canciones que les gustan, un set con los usuarios y el motor de PageRank
+# a usar, y devuelve un diccionario con canciones como claves y su importancia como valores. El motor vectorizado
+# itera hasta converger e informa por stderr la cantidad de iteraciones y el residuo final
+def calcular_page_ranks(grafo_usuarios_canciones, usuarios, motor = MOTOR_PAGERANK_ITERATIVO):
+    with metricas.fase(FASE_PAGE_RANK):
+        if motor == MOTOR_PAGERANK_VECTORIZADO:
+            page_rank, iteraciones, residuo = page_ranks_vectorizado(grafo_usuarios_canciones, PAGERANK_AMORTIGUACION,
+                                                                     PAGERANK_TOLERANCIA, PAGERANK_ITERACIONES_MAX)
+            print(MENSAJE_CONVERGENCIA_PAGERANK.format(iteraciones, residuo), file = sys.stderr)
+        else:
+            page_rank = page_ranks(grafo_usuarios_canciones, PAGERANK_AMORTIGUACION, PAGERANK_ITERACIONES)
     for vertice in list(page_rank.keys()):
         # si el vertice es un usuario lo saco del diccionario pageranks, solo interesan las canciones
         if vertice in usuarios: page_rank.pop(vertice)
     return page_rank
 
+# Recibe la entrada del usuario ya separada, un grafo que relaciona usuarios y canciones que les gustan, el grafo
+# que relaciona canciones que aparecen en playlists de un mismo usuario (o None), el pagerank de las canciones (o
+# None), un set de los usuarios, los perfiles de distancias del comando rango y el diccionario de opciones. Llama a
+# la funcion correspondiente al comando y devuelve el grafo de canciones y el pagerank, que pueden haberse creado
+def ejecutar_comando(entrada_usuario, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, perfiles_rango,
+                     opciones):
+    if metricas.activo: inicio = perf_counter()
+    comando = entrada_usuario[POSICION_COMANDO]
+    if comando == CAMINO: imprimir_camino_mas_corto(grafo_usuarios_canciones, entrada_usuario, usuarios, opciones)
+    if comando == IMPORTANTES:
+        # si todavia el page_rank de las canciones no fue creado (es None), lo creo
+        page_rank = esperar_precalculo(page_rank)
+        if not page_rank:
+            motor = opciones.get(OPCION_PAGERANK, MOTOR_PAGERANK_ITERATIVO)
+            page_rank = calcular_page_ranks(grafo_usuarios_canciones, usuarios, motor)
+        imprimir_n_canciones_mas_importantes(page_rank, entrada_usuario)
+    if comando == RECOMENDACION: imprimir_n_recomendaciones(grafo_usuarios_canciones, entrada_usuario, usuarios, opciones)
+    if comando == CICLO or comando == RANGO:
+        # si todavia no se creo el grafo que relaciona canciones si aparecen en playlists de un mismo usuario (es None), lo creo
+        grafo_canciones = esperar_precalculo(grafo_canciones)
+        if not grafo_canciones: grafo_canciones = obtener_grafo_canciones(grafo_usuarios_canciones, usuarios, opciones)
+        if comando == CICLO: imprimir_ciclo_n_canciones(grafo_canciones, entrada_usuario, opciones)
+        if comando == RANGO: imprimir_canciones_rango_n(grafo_canciones, entrada_usuario, perfiles_rango)
+    if metricas.activo: metricas.registrar_comando(comando, perf_counter() - inicio)
+    return grafo_canciones, page_rank
+
+# Recibe la entrada del usuario ya separada y el diccionario de opciones y devuelve la clave con la que se guarda su
+# resultado en la cache de comandos, o None si el resultado no se puede guardar porque puede cambiar de una
+# ejecucion a otra: las recomendaciones solo con el indice de co-ocurrencia, con el empuje local o con los motores
+# por lotes o vectorizado y una semilla fija, y los ciclos solo si la busqueda no tiene limite de tiempo
+def clave_cache_comando(entrada_usuario, opciones):
+    comando = entrada_usuario[POSICION_COMANDO]
+    deterministas = (MOTOR_RECOMENDACION_INDICE, MOTOR_RECOMENDACION_PUSH)
+    if comando == RECOMENDACION and opciones.get(OPCION_RECOMENDACION) not in deterministas:
+        if opciones.get(OPCION_RECORRIDOS) not in MOTORES_RECORRIDOS_CSR or OPCION_SEMILLA not in opciones: return None
+    if comando == CICLO and opciones.get(OPCION_CICLO) == CICLO_PODADO and OPCION_CICLO_MAX_MS in opciones: return None
+    return tuple(entrada_usuario)
+
 # Recibe un archivo con las entradas (o entrada stdin), un grafo que relaciona usuarios y canciones que les gustan,
 # un grafo que relaciona canciones que aparecen en playlists de un mismo usuario o None si no existe, un diccionario
-# con la importancia (pagerank) de cada vertice o None si todavia no fue creado, y un set de los usuarios. LLama a 
-# las funciones correspondientes de cada comando ingresado en la entrada
-def ejecutar_comandos(entrada, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios):
+# con la importancia (pagerank) de cada vertice o None si todavia no fue creado, un set de los usuarios y el
+# diccionario de opciones del programa. LLama a las funciones correspondientes de cada comando ingresado en la entrada
+# y devuelve el grafo de canciones y el pagerank, que pueden haberse creado durante la ejecucion. Si se pidió la
+# cache de comandos, la salida de los comandos repetidos se toma de la cache mientras el grafo no haya cambiado
+def ejecutar_comandos(entrada, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones = None):
+    if opciones is None: opciones = {}
+    perfiles_rango = OrderedDict()
+    cache = CacheComandos(TAMANIO_CACHE_COMANDOS, CARACTERES_CACHE_COMANDOS) if OPCION_CACHE in opciones else None
     for linea in entrada:
         linea = linea.rstrip()
         entrada_usuario = linea.split(" ")
-        comando = entrada_usuario[POSICION_COMANDO]
-        if comando == CAMINO: imprimir_camino_mas_corto(grafo_usuarios_canciones, entrada_usuario, usuarios)
-        if comando == IMPORTANTES:
-            # si todavia el page_rank de las canciones no fue creado (es None), lo creo
-            if not page_rank: page_rank = calcular_page_ranks(grafo_usuarios_canciones, usuarios)
-            imprimir_n_canciones_mas_importantes(page_rank, entrada_usuario)
-        if comando == RECOMENDACION: imprimir_n_recomendaciones(grafo_usuarios_canciones, entrada_usuario, usuarios)
-        if comando == CICLO or comando == RANGO:
-            # si todavia no se creo el grafo que relaciona canciones si aparecen en playlists de un mismo usuario (es None), lo creo
-            if not grafo_canciones: grafo_canciones = construir_grafo_canciones(grafo_usuarios_canciones, usuarios)
-            if comando == CICLO: imprimir_ciclo_n_canciones(grafo_canciones, entrada_usuario)
-            if comando == RANGO: imprimir_canciones_rango_n(grafo_canciones, entrada_usuario)
+        clave = clave_cache_comando(entrada_usuario, opciones) if cache is not None else None
+        if clave is None:
+            grafo_canciones, page_rank = ejecutar_comando(entrada_usuario, grafo_usuarios_canciones, grafo_canciones,
+                                                          page_rank, usuarios, perfiles_rango, opciones)
+            continue
+        version = grafo_usuarios_canciones.version
+        salida = cache.obtener(clave, version)
+        if salida is None:
+            with redirect_stdout(io.StringIO()) as captura:
+                grafo_canciones, page_rank = ejecutar_comando(entrada_usuario, grafo_usuarios_canciones, grafo_canciones,
+                                                              page_rank, usuarios, perfiles_rango, opciones)
+            salida = captura.getvalue()
+            cache.guardar(clave, version, salida)
+        sys.stdout.write(salida)
+    if cache is not None: print(cache, file = sys.stderr)
+    return grafo_canciones, page_rank
 
 # Recibe la lista de parámetros que recibió el programa, el grafo de usuarios y canciones, el de solo canciones y el 
-# diccionario de page_ranks, si estos ya fueron creados y un conjunto de los usuarios presentes en el Grafo.
-# Abre el archivo o entrada correspondiente a los comandos a ser ejecutados por el usuario y llama a la funcion que
-# los ejecuta
-def abrir_entradas(lista_parametros, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios):
-    if len(lista_parametros) == CANT_PARAMETROS_CON_ARCHIVO_ENTRADAS:
-        archivo_entrada = lista_parametros[ENTRADA]
-        with open(archivo_entrada, "r") as entrada:
-            ejecutar_comandos(entrada, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios)
-    else: 
-        entrada = stdin
-        ejecutar_comandos(entrada, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios)
-
-# Función central del programa que recibe la lista de parámetros, extrae la ruta del archivo y lo procesa, y
-# llama a la función que se dedica a realizar los comandos en la entrada del usuario
-def recomendify(lista_parametros):
+# diccionario de page_ranks, si estos ya fueron creados, un conjunto de los usuarios presentes en el Grafo y el
+# diccionario de opciones. Abre el archivo o entrada correspondiente a los comandos a ser ejecutados por el usuario
+# y llama a la funcion que los ejecuta (en paralelo o con el planificador de consultas si se pidió en las opciones;
+# en paralelo no se usa el planificador). Devuelve el grafo de canciones y el pagerank al terminar
+def abrir_entradas(lista_parametros, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones = None):
+    if opciones is None: opciones = {}
+    ejecutar = ejecutar_comandos_planificados if OPCION_PLANIFICADOR in opciones else ejecutar_comandos
+    if OPCION_PARALELO in opciones: ejecutar = ejecutar_comandos_paralelo
+    with metricas.fase(FASE_COMANDOS):
+        if len(lista_parametros) == CANT_PARAMETROS_CON_ARCHIVO_ENTRADAS:
+            archivo_entrada = lista_parametros[ENTRADA]
+            with open(archivo_entrada, "r") as entrada:
+                return ejecutar(entrada, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones)
+        else: 
+            entrada = stdin
+            return ejecutar(entrada, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones)
+
+#*******************************************************************
+#                   INDICE DE CO-OCURRENCIA
+#*******************************************************************
+
+# Indice de co-ocurrencia con el que se responden las recomendaciones (ver coocurrencia.py). Se prepara antes de
+# atender los comandos, por lo que los procesos del pool y del servidor lo heredan ya cargado
+_indice_recomendacion = None
+
+# Recibe la lista de parametros, el grafo de usuarios y canciones, los usuarios y las opciones y carga el indice de
+# co-ocurrencia desde su archivo (el indicado en las opciones o el que está junto al archivo de canciones). Si no
+# existe, corresponde a otra version del archivo de canciones o está corrupto, lo construye y lo guarda. Si las
+# canciones se leen de la entrada estandar o se agregaron filas nuevas, el indice se construye pero no se guarda
+def preparar_indice_recomendacion(lista_parametros, grafo_usuarios_canciones, usuarios, opciones):
+    global _indice_recomendacion
+    ruta_archivo = lista_parametros[ARCHIVO_CANCIONES]
+    with metricas.fase(FASE_INDICE):
+        if ruta_archivo == RUTA_ENTRADA_ESTANDAR or OPCION_AGREGAR in opciones:
+            _indice_recomendacion = construir_indice(grafo_usuarios_canciones, usuarios)
+            return
+        ruta = opciones.get(OPCION_INDICE, True)
+        if ruta is True: ruta = ruta_indice(ruta_archivo)
+        clave = clave_archivo(ruta_archivo)
+        _indice_recomendacion = cargar_indice(ruta, clave)
+        if _indice_recomendacion is not None: return
+        _indice_recomendacion = construir_indice(grafo_usuarios_canciones, usuarios)
+        try:
+            guardar_indice(ruta, clave, _indice_recomendacion)
+        except OSError:
+            pass
+
+# Recibe el grafo de usuarios y canciones y los usuarios y devuelve el indice de co-ocurrencia preparado, o lo
+# construye si todavia no se preparó (por ejemplo si se ejecutan comandos sin pasar por recomendify)
+def obtener_indice_recomendacion(grafo_usuarios_canciones, usuarios):
+    global _indice_recomendacion
+    if _indice_recomendacion is None:
+        with metricas.fase(FASE_INDICE):
+            _indice_recomendacion = construir_indice(grafo_usuarios_canciones, usuarios)
+    return _indice_recomendacion
+
+#*******************************************************************
+#                       COMPONENTES CONEXAS
+#*******************************************************************
+
+# Componentes conexas del grafo de usuarios y canciones (ver componentes.py), o None si no se pidieron. Con ellas los
+# comandos que no pueden tener resultado se responden sin recorrer el grafo. Las componentes del grafo de canciones
+# son las mismas (restringidas a las canciones): dos canciones con un usuario en comun son adyacentes en él. Solo se
+# usan mientras reflejen la version actual del grafo de usuarios y canciones del que se calcularon
+_componentes = None
+_grafo_componentes = None
+
+# Recibe el grafo de usuarios y canciones y el set de usuarios, calcula sus componentes conexas e informa por stderr
+# sus estadisticas
+def preparar_componentes(grafo_usuarios_canciones, usuarios):
+    global _componentes, _grafo_componentes
+    with metricas.fase(FASE_COMPONENTES):
+        _componentes = componentes_de_grafo(grafo_usuarios_canciones, usuarios)
+        _grafo_componentes = grafo_usuarios_canciones
+    print(_componentes, file = sys.stderr)
+
+# Recibe el grafo de usuarios y canciones al que se le agregaron filas y las canciones nuevas de cada usuario (ver
+# agregar_filas), y agrega sus aristas a las componentes conexas, que pasan a reflejar la version actual del grafo
+def actualizar_componentes(grafo_usuarios_canciones, nuevas):
+    global _grafo_componentes
+    for usuario, canciones in nuevas.items():
+        _componentes.agregar_vertice(usuario, es_cancion = False)
+        for cancion in canciones:
+            _componentes.agregar_vertice(cancion)
+            _componentes.unir(usuario, cancion)
+    _grafo_componentes = grafo_usuarios_canciones
+    _componentes.version = grafo_usuarios_canciones.version
+
+# Devuelve las componentes conexas si se pidieron y están al dia con el grafo del que se calcularon, o None si no
+# (por ejemplo si el grafo se modificó sin actualizarlas), en cuyo caso los comandos recorren el grafo como siempre
+def componentes_vigentes():
+    if _componentes is None or _componentes.version != _grafo_componentes.version: return None
+    return _componentes
+
+# Recibe dos vertices y devuelve True si se sabe que no hay camino entre ellos (están en componentes distintas)
+def sin_camino(origen, destino):
+    componentes = componentes_vigentes()
+    return componentes is not None and not componentes.conectados(origen, destino)
+
+# Recibe una cancion y un largo n y devuelve True si se sabe que no hay un ciclo de n canciones que pase por ella:
+# su componente tiene menos de n canciones
+def sin_ciclo(cancion, n):
+    componentes = componentes_vigentes()
+    return componentes is not None and componentes.cantidad_canciones(cancion) < n
+
+# Recibe una cancion y una distancia n y devuelve True si se sabe que no hay canciones a esa distancia: en una
+# componente de k canciones ninguna está a mas de k - 1 saltos
+def sin_rango(cancion, n):
+    componentes = componentes_vigentes()
+    return componentes is not None and componentes.cantidad_canciones(cancion) <= n
+
+#*******************************************************************
+#                   PRECALCULO EN SEGUNDO PLANO
+#*******************************************************************
+
+# Con la opcion de precalentar, apenas se carga el grafo de usuarios y canciones se empiezan a construir el grafo de
+# canciones y el pagerank en dos procesos aparte, mientras se ejecutan los primeros comandos. Hasta que terminan se
+# pasan como Precalculo en lugar de su valor: los comandos que los necesitan los esperan (solo si todavia no
+# terminaron) y el resto se ejecuta sin esperar. Cada uno informa por stderr cuando quedó listo. Los procesos no
+# devuelven los objetos construidos (copiarlos entre procesos duplicaria la memoria y costaria serializarlos) sino
+# arreglos compactos con los vertices identificados por su id en el grafo de usuarios y canciones: la adyacencia del
+# grafo de canciones en formato CSR y los valores del pagerank. Con ellos el proceso principal arma el grafo de
+# canciones como GrafoCSR y el diccionario del pagerank, traduciendo los ids a los vertices del grafo de usuarios y
+# canciones, recien la primera vez que se piden (ver Precalculo).
+
+MENSAJE_PRECALCULO_LISTO = "Precalculo: {} listo a los {:.3f} s"
+
+# Tipo del arreglo con los valores del pagerank precalculado
+TIPO_RANKS = "d"
+
+# Pool de los procesos que precalculan y estado que heredan al crearse (el grafo de usuarios y canciones, los
+# usuarios y las opciones)
+_pool_precalculo = None
+_estado_precalculo = None
+
+# Recibe el estado a heredar (el grafo de usuarios y canciones, los usuarios y las opciones) y lo guarda para que
+# lo use calcular_precalculo. Se ejecuta al crearse cada proceso del pool de precalculo
+def inicializar_proceso_precalculo(estado):
+    global _estado_precalculo
+    _estado_precalculo = estado
+
+# Recibe el grafo de usuarios y canciones y devuelve el diccionario de cada vertice a su id: su posicion en el grafo
+def indices_precalculo(grafo_usuarios_canciones):
+    if isinstance(grafo_usuarios_canciones, GrafoCSR): return grafo_usuarios_canciones.indices
+    return {v: i for i, v in enumerate(grafo_usuarios_canciones.obtener_vertices())}
+
+# Recibe el grafo de usuarios y canciones y una secuencia de ids y devuelve la lista de sus vertices
+def vertices_precalculo(grafo_usuarios_canciones, ids):
+    if not isinstance(grafo_usuarios_canciones, GrafoCSR):
+        etiquetas = grafo_usuarios_canciones.obtener_vertices()
+        return [etiquetas[i] for i in ids]
+    # las etiquetas de un GrafoDisco se leen de a muchas
+    if isinstance(grafo_usuarios_canciones, GrafoDisco): return grafo_usuarios_canciones.etiquetas.decodificar_varios(ids)
+    return [grafo_usuarios_canciones.etiquetas[i] for i in ids]
+
+# Recibe el nombre de lo que hay que precalcular (FASE_GRAFO_CANCIONES o FASE_PAGE_RANK) y lo calcula en un proceso
+# del pool. Del grafo de canciones devuelve los ids de sus vertices y los arreglos "offsets" y "vecinos" de su
+# adyacencia (ver obtener_csr); del pagerank, los ids de las canciones y sus valores, en el mismo orden que el
+# diccionario
+def calcular_precalculo(nombre):
+    grafo_usuarios_canciones, usuarios, opciones = _estado_precalculo
+    indices = indices_precalculo(grafo_usuarios_canciones)
+    if nombre == FASE_GRAFO_CANCIONES:
+        canciones, offsets, vecinos = obtener_csr(construir_grafo_canciones(grafo_usuarios_canciones, usuarios))
+        return array(TIPO_IDS, [indices[v] for v in canciones]), offsets, vecinos
+    page_rank = calcular_page_ranks(grafo_usuarios_canciones, usuarios,
+                                    opciones.get(OPCION_PAGERANK, MOTOR_PAGERANK_ITERATIVO))
+    return array(TIPO_IDS, [indices[v] for v in page_rank]), array(TIPO_RANKS, page_rank.values())
+
+# Recibe el nombre de lo precalculado, el grafo de usuarios y canciones y lo que devolvió calcular_precalculo, y
+# devuelve el grafo de canciones (como GrafoCSR) o el diccionario del pagerank. Las aristas del grafo de canciones
+# no tienen peso propio: todas tienen el peso por defecto (1), por lo que no hace falta recibirlos
+def armar_precalculo(nombre, grafo_usuarios_canciones, datos):
+    if nombre == FASE_GRAFO_CANCIONES:
+        ids, offsets, vecinos = datos
+        pesos = array(TIPO_IDS, bytes(len(vecinos) * array(TIPO_IDS).itemsize))
+        return GrafoCSR(vertices_precalculo(grafo_usuarios_canciones, ids), offsets, vecinos, pesos, [1])
+    ids, ranks = datos
+    return dict(zip(vertices_precalculo(grafo_usuarios_canciones, ids), ranks))
+
+class Precalculo:
+
+    # Crea el resultado de un precalculo en curso a partir del AsyncResult del proceso que lo calcula, su nombre y el
+    # grafo de usuarios y canciones con el que se arma su valor (ver armar_precalculo), que se arma una unica vez
+    def __init__(self, resultado, nombre, grafo_usuarios_canciones):
+        self.resultado = resultado
+        self.nombre = nombre
+        self.grafo_usuarios_canciones = grafo_usuarios_canciones
+        self.valor = None
+
+    # Devuelve True si el proceso que lo calcula ya terminó, sin esperarlo
+    def ready(self):
+        return self.resultado.ready()
+
+    # Devuelve el valor precalculado, esperando a que termine si hace falta
+    def get(self):
+        if self.valor is None:
+            self.valor = armar_precalculo(self.nombre, self.grafo_usuarios_canciones, self.resultado.get())
+        return self.valor
+
+# Recibe el grafo de usuarios y canciones, el grafo de canciones y el pagerank (o None si no existen), los usuarios y
+# las opciones y empieza a precalcular los que no existen. Devuelve el grafo de canciones y el pagerank, con un
+# Precalculo en lugar de los que se están precalculando. La proyeccion no se precalcula: crearla es inmediato
+def precalentar(grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones):
+    global _pool_precalculo
+    pendientes = []
+    if not grafo_canciones and OPCION_PROYECCION not in opciones: pendientes.append(FASE_GRAFO_CANCIONES)
+    if not page_rank: pendientes.append(FASE_PAGE_RANK)
+    if not pendientes: return grafo_canciones, page_rank
+    inicio = perf_counter()
+    _pool_precalculo = Pool(len(pendientes), inicializar_proceso_precalculo,
+                            ((grafo_usuarios_canciones, usuarios, opciones),))
+    resultados = {}
+    for nombre in pendientes:
+        avisar = lambda _, nombre = nombre: print(MENSAJE_PRECALCULO_LISTO.format(nombre, perf_counter() - inicio),
+                                                  file = sys.stderr)
+        resultado = _pool_precalculo.apply_async(calcular_precalculo, (nombre,), callback = avisar)
+        resultados[nombre] = Precalculo(resultado, nombre, grafo_usuarios_canciones)
+    _pool_precalculo.close()
+    return resultados.get(FASE_GRAFO_CANCIONES, grafo_canciones), resultados.get(FASE_PAGE_RANK, page_rank)
+
+# Recibe el grafo de canciones o el pagerank (o None), o el Precalculo que los está calculando, y devuelve su valor,
+# esperando a que termine de precalcularse si hace falta
+def esperar_precalculo(valor):
+    if not isinstance(valor, Precalculo): return valor
+    if valor.ready(): return valor.get()
+    with metricas.fase(FASE_ESPERA_PRECALCULO):
+        return valor.get()
+
+# Igual que esperar_precalculo, pero sin esperar: si todavia no terminó de precalcularse devuelve None
+def precalculo_listo(valor):
+    if isinstance(valor, Precalculo): return valor.get() if valor.ready() else None
+    return valor
+
+# Termina los procesos que precalculan, si todavia no terminaron (lo que calculen ya no se va a usar)
+def terminar_precalculo():
+    global _pool_precalculo
+    if _pool_precalculo is None: return
+    _pool_precalculo.terminate()
+    _pool_precalculo = None
+
+#*******************************************************************
+#                       INGESTA INCREMENTAL
+#*******************************************************************
+
+# Recibe un grafo de usuarios y canciones (mutable), el set de usuarios y las lineas de un archivo con el formato
+# del archivo de canciones (sin la cabecera) y agrega sus filas al grafo y al set, con las etiquetas canonicas de los
+# vertices que ya estaban. Devuelve un diccionario con cada usuario que quedó relacionado con canciones nuevas para
+# él y la lista de esas canciones
+def agregar_filas(grafo_usuarios_canciones, usuarios, lineas):
+    nuevas = {}
+    vertices, playlists = DiccionarioEtiquetas(grafo_usuarios_canciones.obtener_vertices()), DiccionarioEtiquetas()
+    for linea in lineas:
+        linea = limpiar_linea_archivo(linea)
+        cancion = vertices.canonica(linea[TRACK_NAME] + SEPARADOR_CANCIONES_GRAFO + linea[ARTIST])
+        usuario = vertices.canonica(linea[USER_ID])
+        playlist = playlists.canonica(linea[PLAYLIST_NAME])
+        es_nueva = not (grafo_usuarios_canciones.vertice_pertenece(usuario) and
+                        grafo_usuarios_canciones.vertice_pertenece(cancion) and
+                        grafo_usuarios_canciones.son_adyacentes(usuario, cancion))
+        usuarios.add(usuario)
+        agregar_entrada_grafo_mixto(grafo_usuarios_canciones, usuario, cancion, playlist)
+        if es_nueva: nuevas.setdefault(usuario, []).append(cancion)
+    return nuevas
+
+# Recibe el grafo de canciones ya construido (mutable), el grafo de usuarios y canciones con las filas nuevas ya
+# agregadas y las canciones nuevas de cada usuario (ver agregar_filas), y agrega al grafo de canciones solo las
+# aristas que aparecen por esas filas: cada cancion nueva de un usuario queda unida al resto de sus canciones. El
+# resultado tiene las mismas aristas que construir el grafo de canciones desde cero
+# Complejidad: O(suma, para cada cancion nueva, de la cantidad de canciones de su usuario)
+def actualizar_grafo_canciones(grafo_canciones, grafo_usuarios_canciones, nuevas):
+    for usuario, canciones in nuevas.items():
+        canciones_usuario = grafo_usuarios_canciones.vista_adyacentes(usuario)
+        for cancion in canciones_usuario: grafo_canciones.agregar_vertice(cancion)
+        for cancion in canciones:
+            for cancion_de_usuario in canciones_usuario:
+                if cancion_de_usuario != cancion: grafo_canciones.agregar_arista(cancion, cancion_de_usuario)
+
+# Recibe un grafo de usuarios y canciones al que se le agregaron filas, el set de usuarios y el pagerank de las
+# canciones calculado antes de agregarlas, y devuelve el pagerank actualizado. Usa el motor vectorizado arrancando
+# desde el pagerank anterior, por lo que converge en pocas iteraciones si el cambio fue chico
+def actualizar_page_ranks(grafo_usuarios_canciones, usuarios, page_rank):
+    # el pagerank guardado no tiene a los usuarios: como solo son adyacentes de canciones, su valor se recupera con
+    # un paso del algoritmo a partir del de sus canciones
+    cantidad = len(grafo_usuarios_canciones)
+    iniciales = dict(page_rank)
+    for usuario in usuarios:
+        transferencias = sum([page_rank.get(cancion, 1 / cantidad) / grafo_usuarios_canciones.grado(cancion)
+                              for cancion in grafo_usuarios_canciones.vista_adyacentes(usuario)])
+        iniciales[usuario] = (1 - PAGERANK_AMORTIGUACION) / cantidad + PAGERANK_AMORTIGUACION * transferencias
+    page_rank, iteraciones, residuo = page_ranks_vectorizado(grafo_usuarios_canciones, PAGERANK_AMORTIGUACION,
+                                                             PAGERANK_TOLERANCIA, PAGERANK_ITERACIONES_MAX, iniciales)
+    print(MENSAJE_CONVERGENCIA_PAGERANK.format(iteraciones, residuo), file = sys.stderr)
+    return {vertice: rank for vertice, rank in page_rank.items() if vertice not in usuarios}
+
+# Recibe la ruta de un archivo con filas nuevas (con el mismo formato que el archivo de canciones), el grafo de
+# usuarios y canciones, el grafo de canciones y el pagerank (estos dos pueden ser None si no se construyeron) y el
+# set de usuarios. Agrega las filas y actualiza el grafo de canciones y el pagerank solo en lo que cambió, sin
+# reconstruirlos. Los grafos compactos (inmutables) se convierten antes a Grafo. Devuelve los dos grafos y el pagerank
+def agregar_archivo(ruta_archivo, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios):
+    with metricas.fase(FASE_INGESTA_INCREMENTAL):
+        grafo_usuarios_canciones = convertir_a_grafo(grafo_usuarios_canciones)
+        with abrir_archivo_canciones(ruta_archivo) as archivo:
+            next(archivo)
+            nuevas = agregar_filas(grafo_usuarios_canciones, usuarios, archivo)
+        if _componentes is not None: actualizar_componentes(grafo_usuarios_canciones, nuevas)
+    if isinstance(grafo_canciones, ProyeccionCanciones):
+        grafo_canciones = ProyeccionCanciones(grafo_usuarios_canciones, usuarios)
+    elif grafo_canciones:
+        with metricas.fase(FASE_GRAFO_CANCIONES):
+            grafo_canciones = convertir_a_grafo(grafo_canciones)
+            actualizar_grafo_canciones(grafo_canciones, grafo_usuarios_canciones, nuevas)
+    if page_rank:
+        with metricas.fase(FASE_PAGE_RANK):
+            page_rank = actualizar_page_ranks(grafo_usuarios_canciones, usuarios, page_rank)
+    return grafo_usuarios_canciones, grafo_canciones, page_rank
+
+#*******************************************************************
+#                 EJECUCION DE COMANDOS EN PARALELO
+#*******************************************************************
+
+# Cantidad de grupos de comandos que recibe cada proceso al ejecutar un archivo de comandos en paralelo
+GRUPOS_DE_COMANDOS_POR_PROCESO = 4
+
+# Recibe una linea de comando y el estado con el que se ejecuta (los grafos, el pagerank, los usuarios, los perfiles
+# del comando rango y las opciones) y devuelve la salida del comando como cadena
+def ejecutar_linea(linea, estado):
+    grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, perfiles_rango, opciones = estado
+    with redirect_stdout(io.StringIO()) as captura:
+        ejecutar_comando(linea.rstrip().split(" "), grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios,
+                         perfiles_rango, opciones)
+    return captura.getvalue()
+
+# Recibe los grafos (el de canciones y el pagerank pueden ser None), los usuarios, las opciones y los comandos que se
+# van a ejecutar, y construye el grafo de canciones y el pagerank si algun comando los necesita y todavia no existen
+# (si se están precalculando, los espera). Devuelve ambos; los que no se necesitan y no terminaron de precalcularse
+# se devuelven como None
+def preparar_grafos(grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones, comandos):
+    necesita_grafo_canciones = CICLO in comandos or RANGO in comandos
+    grafo_canciones = (esperar_precalculo if necesita_grafo_canciones else precalculo_listo)(grafo_canciones)
+    page_rank = (esperar_precalculo if IMPORTANTES in comandos else precalculo_listo)(page_rank)
+    if not grafo_canciones and necesita_grafo_canciones:
+        grafo_canciones = obtener_grafo_canciones(grafo_usuarios_canciones, usuarios, opciones)
+    if not page_rank and IMPORTANTES in comandos:
+        motor = opciones.get(OPCION_PAGERANK, MOTOR_PAGERANK_ITERATIVO)
+        page_rank = calcular_page_ranks(grafo_usuarios_canciones, usuarios, motor)
+    return grafo_canciones, page_rank
+
+# Estado con el que ejecuta comandos cada proceso del pool, heredado del proceso principal al crearlo (los grafos
+# no se copian: se comparten mientras ningun proceso los modifique)
+_estado_lote = None
+
+# Recibe el estado a heredar y lo guarda para que lo use ejecutar_linea_lote. Se ejecuta al crearse cada proceso
+# del pool
+def inicializar_proceso_lote(estado):
+    global _estado_lote
+    _estado_lote = estado
+
+# Recibe una linea de comando, la ejecuta con el estado del proceso y devuelve su salida (ver ejecutar_linea)
+def ejecutar_linea_lote(linea):
+    return ejecutar_linea(linea, _estado_lote)
+
+# Recibe lo mismo que ejecutar_comandos y ejecuta los comandos de la entrada repartidos entre varios procesos (los
+# indicados con --procesos-paralelo o uno por nucleo). El grafo de canciones y el pagerank se construyen antes de crear los
+# procesos, que los heredan ya listos. Las salidas se escriben en el orden de la entrada, por lo que son identicas a
+# las de ejecutar los comandos secuencialmente. Devuelve el grafo de canciones y el pagerank
+def ejecutar_comandos_paralelo(entrada, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones = None):
+    if opciones is None: opciones = {}
+    lineas = [linea.rstrip() for linea in entrada]
+    comandos = {linea.split(" ", 1)[POSICION_COMANDO] for linea in lineas}
+    grafo_canciones, page_rank = preparar_grafos(grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios,
+                                                 opciones, comandos)
+    estado = (grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, OrderedDict(), opciones)
+    procesos = int(opciones.get(OPCION_PROCESOS_PARALELO, cpu_count()))
+    tamanio_grupo = max(1, len(lineas) // (procesos * GRUPOS_DE_COMANDOS_POR_PROCESO))
+    with Pool(procesos, inicializar_proceso_lote, (estado,)) as pool:
+        for salida in pool.imap(ejecutar_linea_lote, lineas, tamanio_grupo): sys.stdout.write(salida)
+    return grafo_canciones, page_rank
+
+#*******************************************************************
+#                     PLANIFICADOR DE CONSULTAS
+#*******************************************************************
+
+# Con el planificador, los comandos de la entrada se leen todos antes de ejecutarse y se agrupan por tipo y vertice
+# de origen los que pueden compartir un recorrido: los rango desde una misma cancion se responden con un unico
+# perfil de distancias (hasta el mayor n pedido), los camino desde un mismo origen con un unico arbol de BFS y las
+# recomendaciones con la misma lista de canciones con unos unicos Random Walks. Solo se comparten los recorridos de
+# listas identicas: sumar los de cada cancion por separado seria otro estimador, con resultados distintos a los de
+# ejecutar la consulta sola (y con --recorridos=lote y --semilla, todas las canciones usarian la misma semilla). Asi,
+# con los motores por lotes o vectorizado y una semilla fija, las respuestas son las mismas que sin planificador.
+# Las respuestas se imprimen en el orden de la entrada y cada recorrido compartido se descarta despues de su ultima
+# consulta. Las consultas invalidas (o que no conviene agrupar) se ejecutan como siempre
+
+# Recibe la entrada del usuario ya separada, los grafos, los usuarios y las opciones y devuelve la consulta
+# planificada como tupla (comando, clave del recorrido compartido, datos de la consulta), o None si se ejecuta sola.
+# Las recomendaciones con el indice de coocurrencia no se planifican: no hacen recorridos que se puedan compartir
+def planificar_consulta(entrada_usuario, grafo_usuarios_canciones, grafo_canciones, usuarios, opciones):
+    comando = entrada_usuario[POSICION_COMANDO]
+    if comando == RANGO and len(entrada_usuario) > POSICION_CANCION_GENERAL:
+        n = entrada_usuario[POSICION_NUMERO_N_GENERAL]
+        cancion = " ".join(entrada_usuario[POSICION_CANCION_GENERAL:])
+        if n.isdigit() and int(n) >= 1 and grafo_canciones.vertice_pertenece(cancion) and not sin_rango(cancion, int(n)):
+            return RANGO, cancion, int(n)
+    if comando == CAMINO and opciones.get(OPCION_CAMINO) != BFS_BIDIRECCIONAL:
+        canciones = devolver_lista_canciones(entrada_usuario[POSICION_ORIGEN_CAMINO:])
+        if len(canciones) == 2 and all(grafo_usuarios_canciones.vertice_pertenece(cancion) and cancion not in usuarios
+                                       for cancion in canciones) and not sin_camino(canciones[0], canciones[1]):
+            return CAMINO, canciones[0], canciones[1]
+    if comando == RECOMENDACION and opciones.get(OPCION_RECOMENDACION) != MOTOR_RECOMENDACION_INDICE:
+        if len(entrada_usuario) <= POSICION_INICIO_CANCIONES_RECOMENDAR: return None
+        n = entrada_usuario[POSICION_NUMERO_N_RECOMENDACION]
+        canciones = devolver_lista_canciones(entrada_usuario[POSICION_INICIO_CANCIONES_RECOMENDAR:])
+        if n.isdigit() and int(n) >= 1 and all(grafo_usuarios_canciones.vertice_pertenece(c) for c in canciones):
+            return RECOMENDACION, tuple(canciones), (entrada_usuario[POSICION_TIPO_RECOMENDACION], int(n))
+    return None
+
+# Recibe la lista de consultas planificadas (ver planificar_consulta) y devuelve un diccionario con la posicion de
+# la ultima consulta que usa cada recorrido compartido (comando, vertice) y otro con el mayor n pedido desde cada
+# cancion en los rango. Los camino cuyo origen aparece una sola vez dejan de planificarse: para ellos la BFS que se
+# detiene al llegar al destino es mas barata que el arbol completo
+def agrupar_consultas(consultas):
+    ultimos_usos = {}
+    rangos = {}
+    caminos = {}
+    for consulta in consultas:
+        if consulta and consulta[0] == CAMINO: caminos[consulta[1]] = caminos.get(consulta[1], 0) + 1
+    for i, consulta in enumerate(consultas):
+        if consulta is None: continue
+        comando, clave, datos = consulta
+        if comando == CAMINO and caminos[clave] < 2:
+            consultas[i] = None
+            continue
+        if comando == RANGO: rangos[clave] = max(rangos.get(clave, 0), datos)
+        ultimos_usos[(comando, clave)] = i
+    return ultimos_usos, rangos
+
+# Recibe una consulta planificada, los grafos, los usuarios, las opciones, el diccionario de recorridos compartidos
+# ya hechos y el mayor n de los rango de cada cancion, e imprime su respuesta. Hace los recorridos compartidos que
+# la consulta necesita y todavia no se hicieron
+def responder_consulta(consulta, grafo_usuarios_canciones, grafo_canciones, usuarios, opciones, compartidos, rangos):
+    comando, clave, datos = consulta
+    if (comando, clave) not in compartidos:
+        if comando == RANGO: compartidos[(comando, clave)] = perfil_de_rango(grafo_canciones, clave, rangos[clave])
+        if comando == CAMINO: compartidos[(comando, clave)] = arbol_bfs(grafo_usuarios_canciones, clave)
+        if comando == RECOMENDACION:
+            compartidos[(comando, clave)] = calcular_valores_recomendacion(grafo_usuarios_canciones, list(clave),
+                                                                           opciones)
+    if comando == RANGO:
+        perfil = compartidos[(comando, clave)]
+        print(perfil[datos] if datos < len(perfil) else 0)
+    if comando == CAMINO:
+        camino = camino_en_arbol(grafo_usuarios_canciones, compartidos[(comando, clave)], clave, datos)
+        imprimir_camino(grafo_usuarios_canciones, camino)
+    if comando == RECOMENDACION:
+        tipo_recomendacion, n = datos
+        # imprimir_recomendados modifica los valores, por lo que recibe una copia
+        imprimir_recomendados(dict(compartidos[(comando, clave)]), clave, tipo_recomendacion, n, usuarios)
+
+# Recibe lo mismo que ejecutar_comandos y ejecuta los comandos de la entrada con el planificador. El grafo de
+# canciones y el pagerank se construyen antes si algun comando los necesita. Devuelve el grafo de canciones y el
+# pagerank
+def ejecutar_comandos_planificados(entrada, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios,
+                                   opciones = None):
+    if opciones is None: opciones = {}
+    entradas = [linea.rstrip().split(" ") for linea in entrada]
+    comandos = {entrada_usuario[POSICION_COMANDO] for entrada_usuario in entradas}
+    grafo_canciones, page_rank = preparar_grafos(grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios,
+                                                 opciones, comandos)
+    consultas = [planificar_consulta(entrada_usuario, grafo_usuarios_canciones, grafo_canciones, usuarios, opciones)
+                 for entrada_usuario in entradas]
+    ultimos_usos, rangos = agrupar_consultas(consultas)
+    liberaciones = {}
+    for recorrido, i in ultimos_usos.items(): liberaciones.setdefault(i, []).append(recorrido)
+    compartidos = {}
+    perfiles_rango = OrderedDict()
+    for i, (entrada_usuario, consulta) in enumerate(zip(entradas, consultas)):
+        if consulta is None:
+            grafo_canciones, page_rank = ejecutar_comando(entrada_usuario, grafo_usuarios_canciones, grafo_canciones,
+                                                          page_rank, usuarios, perfiles_rango, opciones)
+            continue
+        if metricas.activo: inicio = perf_counter()
+        responder_consulta(consulta, grafo_usuarios_canciones, grafo_canciones, usuarios, opciones, compartidos, rangos)
+        if metricas.activo: metricas.registrar_comando(consulta[0], perf_counter() - inicio)
+        for recorrido in liberaciones.get(i, ()): compartidos.pop(recorrido, None)
+    return grafo_canciones, page_rank
+
+#*******************************************************************
+#                          MODO SERVIDOR
+#*******************************************************************
+
+# Recibe una linea de comando y devuelve True si es barata de responder (con el pagerank ya calculado,
+# mas_importantes solo elige los n mayores), por lo que el servidor la responde sin pasar por el pool de procesos
+def es_comando_liviano(linea):
+    return linea.split(" ", 1)[POSICION_COMANDO].rstrip() == IMPORTANTES
+
+# Recibe los grafos (el de canciones y el pagerank pueden ser None), los usuarios y las opciones y atiende comandos
+# en la direccion indicada en las opciones hasta que el servidor se detenga. El grafo de canciones y el pagerank se
+# construyen antes de empezar, para que todos los procesos del pool (los indicados con --procesos-servidor o uno por
+# nucleo) los tengan listos. Los devuelve al terminar
+def iniciar_servidor(grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones):
+    grafo_canciones, page_rank = preparar_grafos(grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios,
+                                                 opciones, (CICLO, IMPORTANTES))
+    estado = (grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, OrderedDict(), opciones)
+    procesos = int(opciones.get(OPCION_PROCESOS_SERVIDOR, cpu_count()))
+    servir(opciones[OPCION_SERVIDOR], ejecutar_linea, es_comando_liviano, estado, procesos)
+    return grafo_canciones, page_rank
+
+# Recibe lo mismo que abrir_entradas y atiende los comandos: como servidor si se pidió en las opciones, o desde el
+# archivo de entradas o la entrada estandar si no. Si las recomendaciones se responden con el indice de
+# co-ocurrencia, lo prepara antes. Devuelve el grafo de canciones y el pagerank al terminar
+def atender_comandos(lista_parametros, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones):
+    if opciones.get(OPCION_RECOMENDACION) == MOTOR_RECOMENDACION_INDICE:
+        preparar_indice_recomendacion(lista_parametros, grafo_usuarios_canciones, usuarios, opciones)
+    if OPCION_SERVIDOR in opciones:
+        return iniciar_servidor(grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones)
+    return abrir_entradas(lista_parametros, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones)
+
+# Función central del programa que recibe la lista de parámetros y el diccionario de opciones, extrae la ruta del 
+# archivo y lo procesa, y llama a la función que se dedica a realizar los comandos en la entrada del usuario
+def recomendify(lista_parametros, opciones):
+    if OPCION_INSTANTANEA in opciones:
+        recomendify_con_instantanea(lista_parametros, opciones)
+        return
+    if OPCION_DISCO in opciones:
+        recomendify_en_disco(lista_parametros, opciones)
+        return
+    ruta_archivo = lista_parametros[ARCHIVO_CANCIONES]
+    # el motor de Random Walks por lotes recorre la adyacencia en formato CSR, por lo que conviene cargar el GrafoCSR,
+    # salvo que haya que agregarle filas nuevas
+    compacto = OPCION_COMPACTO in opciones or opciones.get(OPCION_RECORRIDOS) in MOTORES_RECORRIDOS_CSR
+    compacto = compacto and OPCION_AGREGAR not in opciones
+    grafo_usuarios_canciones, usuarios = cargar_archivo(ruta_archivo, opciones, compacto)
+    if OPCION_COMPONENTES in opciones: preparar_componentes(grafo_usuarios_canciones, usuarios)
+    if OPCION_AGREGAR in opciones:
+        grafo_usuarios_canciones, _, _ = agregar_archivo(opciones[OPCION_AGREGAR], grafo_usuarios_canciones, None, None,
+                                                         usuarios)
+    grafo_canciones, page_rank = None, None
+    if OPCION_PRECALENTAR in opciones:
+        grafo_canciones, page_rank = precalentar(grafo_usuarios_canciones, None, None, usuarios, opciones)
+    atender_comandos(lista_parametros, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones)
+    terminar_precalculo()
+
+# Recibe la ruta de la instantanea, la clave del archivo de canciones y los datos a guardar y escribe la instantanea.
+# Si no se puede escribir (por ejemplo por falta de permisos) el programa sigue sin ella
+def actualizar_instantanea(ruta, clave, grafo_usuarios_canciones, usuarios, grafo_canciones, page_rank, motor):
+    try:
+        with metricas.fase(FASE_GUARDADO_INSTANTANEA):
+            guardar_instantanea(ruta, clave, grafo_usuarios_canciones, usuarios, grafo_canciones, page_rank, motor)
+    except OSError:
+        pass
+
+# Igual que recomendify, pero carga los grafos desde la instantanea binaria del archivo de canciones si existe y
+# corresponde a la version actual del archivo. Si no existe, está desactualizada o corrupta, procesa el archivo y
+# la escribe. Al terminar agrega a la instantanea el grafo de canciones y el pagerank si se crearon en esta ejecucion.
+# Si se pasaron filas nuevas para agregar, se agregan a lo cargado actualizando solo lo que cambia; la instantanea
+# no se modifica con ellas, ya que corresponde solo al archivo de canciones
+def recomendify_con_instantanea(lista_parametros, opciones):
+    ruta_archivo = lista_parametros[ARCHIVO_CANCIONES]
+    ruta = opciones[OPCION_INSTANTANEA]
+    if ruta is True: ruta = ruta_instantanea(ruta_archivo)
+    motor = opciones.get(OPCION_PAGERANK, MOTOR_PAGERANK_ITERATIVO)
+    with metricas.fase(FASE_CARGA_INSTANTANEA):
+        clave = clave_archivo(ruta_archivo)
+        datos = cargar_instantanea(ruta, clave)
+    if datos:
+        grafo_usuarios_canciones, usuarios = datos["grafo"], datos["usuarios"]
+        grafo_canciones = datos["grafo_canciones"]
+        page_rank = datos["page_rank"] if datos["motor_page_rank"] == motor else None
+    else:
+        grafo_usuarios_canciones, usuarios = cargar_archivo(ruta_archivo, opciones, compacto = True)
+        grafo_canciones, page_rank = None, None
+        actualizar_instantanea(ruta, clave, grafo_usuarios_canciones, usuarios, None, None, None)
+    if OPCION_COMPONENTES in opciones: preparar_componentes(grafo_usuarios_canciones, usuarios)
+    if OPCION_AGREGAR in opciones:
+        grafo_usuarios_canciones, grafo_canciones, page_rank = agregar_archivo(opciones[OPCION_AGREGAR],
+                                                                               grafo_usuarios_canciones, grafo_canciones,
+                                                                               page_rank, usuarios)
+    iniciales = (grafo_canciones, page_rank)
+    if OPCION_PRECALENTAR in opciones:
+        iniciales = precalentar(grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones)
+    nuevo_grafo_canciones, nuevo_page_rank = atender_comandos(lista_parametros, grafo_usuarios_canciones, *iniciales,
+                                                              usuarios, opciones)
+    # lo que se precalculó y quedó listo tambien se guarda en la instantanea
+    nuevo_grafo_canciones, nuevo_page_rank = precalculo_listo(nuevo_grafo_canciones), precalculo_listo(nuevo_page_rank)
+    terminar_precalculo()
+    # la proyeccion no se guarda: no tiene nada construido
+    if isinstance(nuevo_grafo_canciones, ProyeccionCanciones): nuevo_grafo_canciones = grafo_canciones
+    if OPCION_AGREGAR in opciones: return
+    if nuevo_grafo_canciones is not grafo_canciones or nuevo_page_rank is not page_rank:
+        actualizar_instantanea(ruta, clave, grafo_usuarios_canciones, usuarios, nuevo_grafo_canciones,
+                               nuevo_page_rank, motor)
+
+#*******************************************************************
+#                       GRAFO EN DISCO
+#*******************************************************************
+
+# Recibe la ruta del archivo de canciones, la ruta del grafo en disco, la clave del archivo y el limite de memoria
+# y procesa el archivo escribiendo el grafo de usuarios y canciones en disco (ver grafo_disco.py), sin tenerlo
+# nunca entero en memoria. Devuelve el GrafoDisco y sus usuarios
+def procesar_archivo_en_disco(ruta_archivo, ruta, clave, memoria):
+    constructor = ConstructorGrafoDisco(ruta, memoria)
+    with abrir_archivo_canciones(ruta_archivo) as archivo:
+        next(archivo)
+        for linea in archivo:
+            linea = limpiar_linea_archivo(linea)
+            cancion = linea[TRACK_NAME] + SEPARADOR_CANCIONES_GRAFO + linea[ARTIST]
+            constructor.agregar_fila(cancion, linea[USER_ID], linea[PLAYLIST_NAME])
+    return constructor.construir(clave)
+
+# Recibe la lista de parametros y el diccionario de opciones e inicia el programa con el grafo de usuarios y
+# canciones guardado en disco (en la ruta indicada con la opcion, o junto al archivo de canciones), que usa a lo sumo
+# la memoria indicada (en MB) ademas de las paginas de los archivos mapeados. Si no existe, corresponde a otra
+# version del archivo de canciones o está corrupto, lo escribe procesando el archivo. El grafo de canciones se
+# construye en memoria, salvo que se use --proyeccion
+def recomendify_en_disco(lista_parametros, opciones):
     ruta_archivo = lista_parametros[ARCHIVO_CANCIONES]
-    grafo_usuarios_canciones, usuarios = procesar_archivo(ruta_archivo)
-    abrir_entradas(lista_parametros, grafo_usuarios_canciones, None, None, usuarios)
+    ruta = opciones[OPCION_DISCO]
+    if ruta is True: ruta = ruta_grafo_disco(ruta_archivo)
+    memoria = int(opciones.get(OPCION_MEMORIA, MEMORIA_DISCO_MB)) << 20
+    with metricas.fase(FASE_CARGA_DISCO):
+        clave = clave_archivo(ruta_archivo)
+        datos = abrir_grafo_disco(ruta, clave, memoria)
+    if datos is None:
+        with metricas.fase(FASE_CARGA):
+            datos = procesar_archivo_en_disco(ruta_archivo, ruta, clave, memoria)
+    grafo_usuarios_canciones, usuarios = datos
+    if OPCION_COMPONENTES in opciones: preparar_componentes(grafo_usuarios_canciones, usuarios)
+    grafo_canciones, page_rank = None, None
+    if OPCION_PRECALENTAR in opciones:
+        grafo_canciones, page_rank = precalentar(grafo_usuarios_canciones, None, None, usuarios, opciones)
+    atender_comandos(lista_parametros, grafo_usuarios_canciones, grafo_canciones, page_rank, usuarios, opciones)
+    terminar_precalculo()
 
 # Valida los parámetros del programa y de ser correctos inicia el programa Recomendify
 def main():
-    parametros = sys.argv
-    if not validar_parametros(parametros): return 1
-    recomendify(parametros)
+    parametros, opciones = separar_opciones(sys.argv)
+    if not validar_opciones(opciones) or not validar_parametros(parametros, opciones): return 1
+    if OPCION_PERFIL in opciones: metricas.activar()
+    recomendify(parametros, opciones)
+    # con --perfil el reporte va a stderr, y con --perfil=ruta a ese archivo
+    if OPCION_PERFIL in opciones:
+        metricas.escribir_reporte(None if opciones[OPCION_PERFIL] is True else opciones[OPCION_PERFIL])
     return 0
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
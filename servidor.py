@@ -0,0 +1,188 @@
+from multiprocessing import Pool
+import asyncio
+import os
+import signal
+import stat
+import sys
+
+#*******************************************************************
+#                     PROTOCOLO DEL SERVIDOR
+#*******************************************************************
+
+# Los clientes envian un comando por linea, con el mismo formato que la entrada del programa, y pueden enviar varios
+# sin esperar las respuestas. El servidor responde en el mismo orden en que recibió los comandos: cada respuesta es
+# una linea con el largo en bytes de la salida que el comando imprimiria, seguida de esa salida. Con el largo por
+# delante la salida puede tener cualquier contenido (por ejemplo lineas vacias) sin desincronizar las respuestas.
+
+CODIFICACION = "utf-8"
+FIN_DE_LINEA = "\n"
+SEPARADOR_PUERTO = ":"
+ERROR_COMANDO = "Error al ejecutar el comando" + FIN_DE_LINEA
+MENSAJE_ESCUCHANDO = "Servidor escuchando en {}"
+
+# Recibe una direccion y devuelve True si es una direccion TCP ("host:puerto"), o False si es la ruta de un socket Unix
+def es_direccion_tcp(direccion):
+    host, separador, puerto = direccion.rpartition(SEPARADOR_PUERTO)
+    return bool(separador) and puerto.isdigit() and os.sep not in host
+
+# Recibe una direccion TCP y devuelve el host y el puerto
+def separar_direccion_tcp(direccion):
+    host, _, puerto = direccion.rpartition(SEPARADOR_PUERTO)
+    return host, int(puerto)
+
+#*******************************************************************
+#                     PROCESOS DEL POOL
+#*******************************************************************
+
+# Funcion que ejecuta un comando y el estado que recibe, guardados en cada proceso del pool al crearlo (se heredan
+# del proceso principal, por lo que los grafos no se copian)
+_ejecutar = None
+_estado = None
+
+def _inicializar_proceso(ejecutar, estado):
+    global _ejecutar, _estado
+    _ejecutar, _estado = ejecutar, estado
+    # la interrupcion (Ctrl+C) la maneja el proceso principal, que detiene el servidor ordenadamente
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _ejecutar_en_proceso(linea):
+    return _ejecutar(linea, _estado)
+
+#*******************************************************************
+#                           SERVIDOR
+#*******************************************************************
+
+class ServidorRecomendify:
+
+    # Crea un servidor que atiende comandos en la direccion recibida (un socket Unix o "host:puerto"). "ejecutar" es
+    # una funcion que recibe una linea de comando y el estado y devuelve la salida del comando. Los comandos para los
+    # que "es_liviano" devuelve True se ejecutan directamente; el resto se envian al pool de procesos, para que un
+    # comando lento no demore a los demas
+    def __init__(self, direccion, ejecutar, es_liviano, estado, pool):
+        self.direccion = direccion
+        self.ejecutar = ejecutar
+        self.es_liviano = es_liviano
+        self.estado = estado
+        self.pool = pool
+        self.leyendo = set()
+        self.conexiones = set()
+
+    # Recibe una linea de comando y devuelve su salida, o un mensaje de error si el comando falló
+    async def _resolver(self, linea):
+        if self.es_liviano(linea):
+            try:
+                return self.ejecutar(linea, self.estado)
+            except Exception:
+                return ERROR_COMANDO
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        def completar(resultado):
+            if not futuro.done(): futuro.set_result(resultado)
+        self.pool.apply_async(_ejecutar_en_proceso, (linea,),
+                              callback = lambda salida: loop.call_soon_threadsafe(completar, salida),
+                              error_callback = lambda error: loop.call_soon_threadsafe(completar, ERROR_COMANDO))
+        return await futuro
+
+    # Recibe la cola de respuestas pendientes de una conexion y las escribe en orden a medida que terminan. Termina al
+    # recibir None
+    async def _escribir_respuestas(self, respuestas, escritor):
+        while True:
+            tarea = await respuestas.get()
+            if tarea is None: return
+            salida = (await tarea).encode(CODIFICACION)
+            escritor.write(str(len(salida)).encode(CODIFICACION) + FIN_DE_LINEA.encode(CODIFICACION) + salida)
+            await escritor.drain()
+
+    # Atiende una conexion: lee comandos mientras el cliente los envie y encola sus respuestas, que se calculan en
+    # paralelo. Si el servidor se detiene deja de leer, pero responde los comandos que ya había recibido
+    async def _atender(self, lector, escritor):
+        tarea = asyncio.current_task()
+        self.conexiones.add(tarea)
+        self.leyendo.add(tarea)
+        respuestas = asyncio.Queue()
+        escritura = asyncio.create_task(self._escribir_respuestas(respuestas, escritor))
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea: break
+                respuestas.put_nowait(asyncio.ensure_future(self._resolver(linea.decode(CODIFICACION))))
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        self.leyendo.discard(tarea)
+        respuestas.put_nowait(None)
+        try:
+            await escritura
+            escritor.close()
+            await escritor.wait_closed()
+        except ConnectionError:
+            pass
+        self.conexiones.discard(tarea)
+
+    # Abre el socket y atiende conexiones hasta recibir SIGINT o SIGTERM. Entonces deja de aceptar conexiones, espera
+    # a que se respondan los comandos ya recibidos y cierra el socket
+    async def servir(self):
+        loop = asyncio.get_running_loop()
+        detener = asyncio.Event()
+        for senial in (signal.SIGINT, signal.SIGTERM): loop.add_signal_handler(senial, detener.set)
+        if es_direccion_tcp(self.direccion):
+            host, puerto = separar_direccion_tcp(self.direccion)
+            servidor = await asyncio.start_server(self._atender, host, puerto)
+        else:
+            # un socket que quedó de una ejecucion anterior impide volver a usar la ruta
+            if os.path.exists(self.direccion) and stat.S_ISSOCK(os.stat(self.direccion).st_mode):
+                os.unlink(self.direccion)
+            servidor = await asyncio.start_unix_server(self._atender, self.direccion)
+        print(MENSAJE_ESCUCHANDO.format(self.direccion), file = sys.stderr, flush = True)
+        await detener.wait()
+        servidor.close()
+        await servidor.wait_closed()
+        for tarea in list(self.leyendo): tarea.cancel()
+        await asyncio.gather(*self.conexiones, return_exceptions = True)
+        if not es_direccion_tcp(self.direccion) and os.path.exists(self.direccion): os.unlink(self.direccion)
+
+# Recibe una direccion, la funcion que ejecuta un comando, la que indica si un comando es liviano, el estado que
+# necesitan (grafos ya construidos) y la cantidad de procesos. Crea el pool de procesos (que heredan el estado) y
+# atiende conexiones hasta que el servidor se detenga
+def servir(direccion, ejecutar, es_liviano, estado, procesos):
+    with Pool(procesos, _inicializar_proceso, (ejecutar, estado)) as pool:
+        asyncio.run(ServidorRecomendify(direccion, ejecutar, es_liviano, estado, pool).servir())
+
+#*******************************************************************
+#                            CLIENTE
+#*******************************************************************
+
+# Recibe una direccion y abre una conexion con el servidor. Devuelve el lector y el escritor de la conexion
+async def abrir_conexion(direccion):
+    if es_direccion_tcp(direccion): return await asyncio.open_connection(*separar_direccion_tcp(direccion))
+    return await asyncio.open_unix_connection(direccion)
+
+# Recibe una direccion y una lista de comandos, los envia todos juntos al servidor y devuelve la lista de respuestas
+# (la salida de cada comando) en el mismo orden
+async def consultar(direccion, comandos):
+    lector, escritor = await abrir_conexion(direccion)
+    for comando in comandos: escritor.write((comando.rstrip(FIN_DE_LINEA) + FIN_DE_LINEA).encode(CODIFICACION))
+    await escritor.drain()
+    respuestas = []
+    for _ in comandos:
+        largo = int(await lector.readline())
+        respuestas.append((await lector.readexactly(largo)).decode(CODIFICACION))
+    escritor.close()
+    await escritor.wait_closed()
+    return respuestas
+
+# Version sincronica de consultar, para usar el servidor desde otros programas o pruebas
+def enviar_comandos(direccion, comandos):
+    return asyncio.run(consultar(direccion, comandos))
+
+# Cliente de linea de comandos: recibe la direccion del servidor y opcionalmente un archivo de comandos (si no, los
+# lee de la entrada estandar) e imprime las respuestas
+def main():
+    if len(sys.argv) < 2: return 1
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as entrada: comandos = entrada.readlines()
+    else: comandos = sys.stdin.readlines()
+    for respuesta in enviar_comandos(sys.argv[1], comandos): sys.stdout.write(respuesta)
+    return 0
+
+if __name__ == "__main__":
+    main()
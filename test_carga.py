@@ -0,0 +1,107 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from grafo import Grafo
+from etiquetas import DiccionarioEtiquetas
+from generador_datos import generar_archivo
+from recomendify import procesar_archivo, procesar_archivo_paralelo, procesar_lineas, combinar_tramo, \
+    dividir_archivo, agregar_archivo, construir_grafo_canciones, calcular_page_ranks, MOTOR_PAGERANK_VECTORIZADO
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas de la carga del archivo de canciones: cargarlo en paralelo (por tramos, comprimido con gzip o de a lotes de
+# lineas) tiene que dar el mismo grafo que procesar_archivo con el Grafo de diccionarios, con los vertices y los
+# adyacentes en el mismo orden. Agregarle filas a un grafo ya cargado (ingesta incremental) tiene que dar el mismo
+# grafo, el mismo grafo de canciones y el mismo pagerank que cargar todas las filas desde el principio.
+# Uso: python3 -m pytest test_carga.py (o python3 -m unittest test_carga)
+
+FILAS = 3000
+SEMILLA = 37
+PROCESOS = 3
+TRAMOS = 7
+LINEAS_POR_LOTE = 250
+# filas del archivo que se cargan al principio; el resto se agrega despues
+FILAS_INICIALES = 2500
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+class PruebaCarga(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.TemporaryDirectory()
+        cls.ruta = os.path.join(cls.directorio.name, "canciones.tsv")
+        generar_archivo(cls.ruta, FILAS, SEMILLA)
+        cls.ruta_gzip = cls.ruta + ".gz"
+        with open(cls.ruta, "rb") as archivo, gzip.open(cls.ruta_gzip, "wb") as comprimido:
+            shutil.copyfileobj(archivo, comprimido)
+        cls.grafo, cls.usuarios = procesar_archivo(cls.ruta)
+        with open(cls.ruta) as archivo: lineas = archivo.readlines()
+        cls.ruta_inicial = os.path.join(cls.directorio.name, "iniciales.tsv")
+        cls.ruta_nuevas = os.path.join(cls.directorio.name, "nuevas.tsv")
+        encabezado, filas = lineas[0], lineas[1:]
+        for ruta, parte in ((cls.ruta_inicial, filas[:FILAS_INICIALES]), (cls.ruta_nuevas, filas[FILAS_INICIALES:])):
+            with open(ruta, "w") as archivo: archivo.writelines([encabezado] + parte)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directorio.cleanup()
+
+    def assertComoGrafo(self, datos):
+        grafo, usuarios = datos
+        self.assertEqual(usuarios, self.usuarios)
+        self.assertEqual(list(self.grafo.obtener_vertices()), list(grafo.obtener_vertices()))
+        for v in self.grafo.obtener_vertices():
+            self.assertEqual(self.grafo.adyacentes(v), grafo.adyacentes(v))
+            self.assertEqual([self.grafo.peso_arista(v, w) for w in self.grafo.adyacentes(v)],
+                             [grafo.peso_arista(v, w) for w in grafo.adyacentes(v)])
+
+    def test_paralelo_como_secuencial(self):
+        for compacto in (False, True):
+            self.assertComoGrafo(procesar_archivo_paralelo(self.ruta, PROCESOS, compacto))
+            self.assertComoGrafo(procesar_archivo_paralelo(self.ruta_gzip, PROCESOS, compacto))
+        self.assertComoGrafo(procesar_archivo(self.ruta_gzip))
+
+    def test_tramos_cubren_el_archivo(self):
+        tramos = dividir_archivo(self.ruta, TRAMOS)
+        with open(self.ruta, "rb") as archivo:
+            encabezado = archivo.readline()
+            contenido = encabezado + archivo.read()
+        self.assertEqual(len(tramos), TRAMOS)
+        self.assertEqual(tramos[0][1], len(encabezado))
+        self.assertEqual(tramos[-1][2], len(contenido))
+        for (_, _, fin), (_, inicio, _) in zip(tramos, tramos[1:]): self.assertEqual(fin, inicio)
+        for _, _, fin in tramos: self.assertEqual(contenido[fin - 1:fin], b"\n")
+
+    def test_lotes_combinados_en_orden(self):
+        with open(self.ruta) as archivo: lineas = archivo.readlines()[1:]
+        grafo, usuarios = Grafo(), set()
+        etiquetas = (DiccionarioEtiquetas(), DiccionarioEtiquetas())
+        for inicio in range(0, len(lineas), LINEAS_POR_LOTE):
+            combinar_tramo(grafo, usuarios, procesar_lineas(lineas[inicio:inicio + LINEAS_POR_LOTE]), *etiquetas)
+        self.assertComoGrafo((grafo, usuarios))
+
+    def test_ingesta_incremental_como_carga_completa(self):
+        grafo_canciones = construir_grafo_canciones(self.grafo, self.usuarios)
+        page_rank = calcular_page_ranks(self.grafo, self.usuarios, MOTOR_PAGERANK_VECTORIZADO)
+        for compacto in (False, True):
+            grafo, usuarios = procesar_archivo(self.ruta_inicial, compacto)
+            grafo, grafo_canciones_nuevo, page_rank_nuevo = agregar_archivo(
+                self.ruta_nuevas, grafo, construir_grafo_canciones(grafo, usuarios),
+                calcular_page_ranks(grafo, usuarios, MOTOR_PAGERANK_VECTORIZADO), usuarios)
+            self.assertComoGrafo((grafo, usuarios))
+            self.assertEqual(set(grafo_canciones.obtener_vertices()), set(grafo_canciones_nuevo.obtener_vertices()))
+            for v in grafo_canciones.obtener_vertices():
+                self.assertEqual(set(grafo_canciones.adyacentes(v)), set(grafo_canciones_nuevo.adyacentes(v)))
+            self.assertEqual(set(page_rank), set(page_rank_nuevo))
+            for v, rank in page_rank.items(): self.assertAlmostEqual(rank, page_rank_nuevo[v], places = 7)
+
+if __name__ == "__main__":
+    unittest.main()
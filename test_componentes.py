@@ -0,0 +1,128 @@
+import io
+import os
+import tempfile
+import unittest
+from collections import deque
+from contextlib import redirect_stdout
+from random import Random
+
+import recomendify
+from componentes import ComponentesConexas, componentes_de_grafo
+from generador_datos import generar_archivo, SEPARADOR_ARCHIVO
+from recomendify import procesar_archivo, OPCION_COMPONENTES
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas de las componentes conexas (union-find): tienen que ser las mismas que las que se encuentran con BFS sobre
+# el Grafo de diccionarios, y con ellas los comandos tienen que responder lo mismo que sin ellas. Al archivo
+# sintetico se le agregan filas de usuarios que no comparten canciones con el resto, para tener varias componentes.
+# Uso: python3 -m pytest test_componentes.py (o python3 -m unittest test_componentes)
+
+FILAS = 2000
+SEMILLA = 19
+PROGRAMA = "recomendify.py"
+# filas (usuario, cancion, artista) que forman dos componentes aparte: una con dos canciones y otra con una
+FILAS_AISLADAS = (("aislado1", "Sola 1", "Aislado"), ("aislado1", "Sola 2", "Aislado"),
+                  ("aislado2", "Sola 3", "Aislado"))
+SOLA_1, SOLA_2, SOLA_3 = "Sola 1 - Aislado", "Sola 2 - Aislado", "Sola 3 - Aislado"
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+# Recibe un grafo y devuelve la lista de sus componentes conexas (sets de vertices), encontradas con BFS
+def componentes_bfs(grafo):
+    componentes, visitados = [], set()
+    for v in grafo.obtener_vertices():
+        if v in visitados: continue
+        componente, q = {v}, deque([v])
+        while q:
+            for w in grafo.adyacentes(q.popleft()):
+                if w not in componente:
+                    componente.add(w)
+                    q.append(w)
+        visitados |= componente
+        componentes.append(componente)
+    return componentes
+
+class PruebaComponentes(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta_archivo = os.path.join(self.directorio.name, "canciones.tsv")
+        generar_archivo(self.ruta_archivo, FILAS, SEMILLA)
+        with open(self.ruta_archivo, "a") as archivo:
+            for i, (usuario, cancion, artista) in enumerate(FILAS_AISLADAS):
+                campos = (str(FILAS + i), usuario, cancion, artista, str(FILAS + i), "Aparte", "Rock")
+                archivo.write(SEPARADOR_ARCHIVO.join(campos) + "\n")
+        self.grafo, self.usuarios = procesar_archivo(self.ruta_archivo)
+
+    def tearDown(self):
+        # las componentes quedan en recomendify para el resto de la ejecucion, que en las pruebas sigue con otros
+        # grafos
+        recomendify._componentes = None
+        self.directorio.cleanup()
+
+    def assertComponentesComoBfs(self, componentes):
+        esperadas = componentes_bfs(self.grafo)
+        self.assertEqual(len(componentes), len(esperadas))
+        mayor = max(esperadas, key = len)
+        estadisticas = componentes.estadisticas()
+        self.assertEqual(estadisticas["componentes"], len(esperadas))
+        self.assertEqual(estadisticas["vertices_mayor"], len(mayor))
+        self.assertEqual(estadisticas["canciones_mayor"], len(mayor - self.usuarios))
+        for componente in esperadas:
+            raices = {componentes.componente(v) for v in componente}
+            self.assertEqual(len(raices), 1)
+            for v in componente:
+                self.assertEqual(componentes.tamanio(v), len(componente))
+                self.assertEqual(componentes.cantidad_canciones(v), len(componente - self.usuarios))
+        self.assertEqual(len({componentes.componente(next(iter(c))) for c in esperadas}), len(esperadas))
+
+    def test_componentes_como_bfs(self):
+        componentes = componentes_de_grafo(self.grafo, self.usuarios)
+        self.assertComponentesComoBfs(componentes)
+        self.assertEqual(componentes.version, self.grafo.version)
+        self.assertTrue(componentes.conectados(SOLA_1, SOLA_2))
+        self.assertFalse(componentes.conectados(SOLA_1, SOLA_3))
+        self.assertFalse(componentes.conectados(SOLA_1, self.grafo.obtener_vertices()[0]))
+        self.assertFalse(componentes.conectados(SOLA_1, "no existe"))
+        self.assertEqual(componentes.tamanio("no existe"), 0)
+
+    def test_ids_como_grafo_csr(self):
+        csr, _ = procesar_archivo(self.ruta_archivo, compacto = True)
+        componentes = componentes_de_grafo(csr, self.usuarios)
+        self.assertEqual(componentes.indices, csr.indices)
+        self.assertComponentesComoBfs(componentes)
+
+    def test_aristas_en_cualquier_orden(self):
+        aristas = [(v, w) for v in self.grafo.obtener_vertices() for w in self.grafo.adyacentes(v)]
+        Random(SEMILLA).shuffle(aristas)
+        componentes = ComponentesConexas()
+        for v, w in aristas:
+            componentes.agregar_vertice(v, v not in self.usuarios)
+            componentes.agregar_vertice(w, w not in self.usuarios)
+            componentes.unir(v, w)
+        self.assertComponentesComoBfs(componentes)
+
+    def test_comandos_como_sin_componentes(self):
+        cancion = next(v for v in self.grafo.obtener_vertices() if v not in self.usuarios)
+        comandos = ["camino {} >>>> {}".format(cancion, SOLA_1), "camino {} >>>> {}".format(SOLA_1, SOLA_2),
+                    "camino {} >>>> {}".format(SOLA_1, SOLA_3), "ciclo 2 " + SOLA_1, "ciclo 3 " + SOLA_1,
+                    "ciclo 3 " + cancion, "rango 1 " + SOLA_1, "rango 2 " + SOLA_1, "rango 1 " + SOLA_3,
+                    "rango 2 " + cancion]
+        ruta_comandos = os.path.join(self.directorio.name, "comandos.txt")
+        with open(ruta_comandos, "w") as archivo: archivo.write("\n".join(comandos) + "\n")
+        salidas = []
+        for opciones in ({}, {OPCION_COMPONENTES: True}):
+            salida = io.StringIO()
+            with redirect_stdout(salida):
+                recomendify.recomendify([PROGRAMA, self.ruta_archivo, ruta_comandos], opciones)
+            salidas.append(salida.getvalue())
+        self.assertEqual(salidas[0], salidas[1])
+        self.assertEqual(len(salidas[0].splitlines()), len(comandos))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import unittest
+from random import Random
+
+from coocurrencia import construir_indice, cargar_indice, guardar_indice, ruta_indice, MAGIA, CANCIONES, \
+    PREFIJO_CANCIONES, PREFIJO_USUARIOS, OFFSETS, IDS, PUNTAJES
+from instantanea import cargar_secciones, guardar_secciones, clave_archivo
+from generador_datos import generar_archivo
+from recomendify import procesar_archivo
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas del indice de co-ocurrencia: sus listas y recomendaciones tienen que ser las que se calculan a mano sobre
+# el Grafo de diccionarios (las probabilidades de llegar en dos pasos, sumadas entre las canciones pedidas), el indice
+# guardado se tiene que cargar igual y uno corrupto o inconsistente no se tiene que cargar.
+# Uso: python3 -m pytest test_coocurrencia.py (o python3 -m unittest test_coocurrencia)
+
+FILAS = 2000
+SEMILLA = 17
+# con K mayor a la cantidad de vertices las listas no se recortan y se pueden comparar completas
+K_COMPLETO = 10 ** 6
+K_RECORTADO = 10
+CONSULTAS = 30
+CANCIONES_POR_CONSULTA = 3
+RECOMENDACIONES = 10
+ID_FUERA_DE_RANGO = 10 ** 8
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+# Recibe el grafo y una cancion y devuelve el diccionario con la probabilidad de llegar desde ella a cada otra cancion
+# en un paseo al azar de dos pasos, normalizado para que sume 1
+def llegadas_dos_pasos(grafo, cancion):
+    llegadas = {}
+    for usuario in grafo.adyacentes(cancion):
+        for otra in grafo.adyacentes(usuario):
+            peso = 1 / (grafo.grado(cancion) * grafo.grado(usuario))
+            llegadas[otra] = llegadas.get(otra, 0) + peso
+    llegadas.pop(cancion, None)
+    total = sum(llegadas.values())
+    return {otra: probabilidad / total for otra, probabilidad in llegadas.items()}
+
+# Recibe el indice, las canciones pedidas, la cantidad de recomendaciones y si son usuarios y devuelve las
+# recomendaciones sumando una por una las listas de las canciones, desempatando por la primera aparicion
+def recomendar_a_mano(indice, canciones, n, usuarios):
+    acumulados, apariciones = {}, {}
+    for cancion in canciones:
+        for vertice, puntaje in indice.similares(cancion, usuarios):
+            if not usuarios and vertice in canciones: continue
+            acumulados[vertice] = acumulados.get(vertice, 0) + puntaje
+            apariciones.setdefault(vertice, len(apariciones))
+    return sorted(acumulados, key = lambda vertice: (-acumulados[vertice], apariciones[vertice]))[:n]
+
+class PruebaCoocurrencia(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta_archivo = os.path.join(self.directorio.name, "canciones.tsv")
+        generar_archivo(self.ruta_archivo, FILAS, SEMILLA)
+        self.ruta = ruta_indice(self.ruta_archivo)
+        self.clave = clave_archivo(self.ruta_archivo)
+        self.grafo, self.usuarios = procesar_archivo(self.ruta_archivo)
+        self.csr, _ = procesar_archivo(self.ruta_archivo, compacto = True)
+        self.canciones = [v for v in self.grafo.obtener_vertices() if v not in self.usuarios]
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def assertMismoIndice(self, indice, otro):
+        self.assertEqual(indice.etiquetas, otro.etiquetas)
+        self.assertEqual(list(indice.canciones), list(otro.canciones))
+        for listas, otras in ((indice.listas_canciones, otro.listas_canciones),
+                              (indice.listas_usuarios, otro.listas_usuarios)):
+            for lista, otra in zip(listas, otras): self.assertEqual(list(lista), list(otra))
+
+    # Reescribe el indice con las secciones modificadas por "modificar", con CRCs validos
+    def reescribir(self, modificar):
+        cabecera, secciones = cargar_secciones(self.ruta, MAGIA)
+        tipos = {nombre: seccion[2] for nombre, seccion in cabecera.pop("secciones").items()}
+        secciones = {nombre: (tipos[nombre], contenido.tolist() if isinstance(contenido, memoryview) else contenido)
+                     for nombre, contenido in secciones.items()}
+        modificar(secciones)
+        guardar_secciones(self.ruta, MAGIA, cabecera, secciones)
+
+    def test_listas_como_dos_pasos(self):
+        indice = construir_indice(self.grafo, self.usuarios, K_COMPLETO)
+        self.assertEqual(len(indice), len(self.canciones))
+        for cancion in self.canciones:
+            esperadas = llegadas_dos_pasos(self.grafo, cancion)
+            similares = indice.similares(cancion)
+            self.assertEqual({otra for otra, _ in similares}, set(esperadas))
+            for otra, puntaje in similares: self.assertAlmostEqual(puntaje, esperadas[otra], places = 12)
+            puntajes = [puntaje for _, puntaje in similares]
+            self.assertEqual(puntajes, sorted(puntajes, reverse = True))
+            usuarios = indice.similares(cancion, usuarios = True)
+            self.assertTrue(all(usuario in self.usuarios for usuario, _ in usuarios))
+            self.assertAlmostEqual(sum(puntaje for _, puntaje in usuarios), 1, places = 12)
+        self.assertEqual(indice.similares("no existe"), [])
+
+    def test_mismo_indice_con_grafo_csr(self):
+        self.assertMismoIndice(construir_indice(self.grafo, self.usuarios, K_RECORTADO),
+                               construir_indice(self.csr, self.usuarios, K_RECORTADO))
+
+    def test_recomendar_como_suma_de_listas(self):
+        indice = construir_indice(self.grafo, self.usuarios, K_RECORTADO)
+        aleatorio = Random(SEMILLA)
+        for _ in range(CONSULTAS):
+            canciones = aleatorio.sample(self.canciones, CANCIONES_POR_CONSULTA)
+            for usuarios in (False, True):
+                self.assertEqual(indice.recomendar(canciones, RECOMENDACIONES, usuarios),
+                                 recomendar_a_mano(indice, canciones, RECOMENDACIONES, usuarios))
+
+    def test_ida_y_vuelta(self):
+        indice = construir_indice(self.grafo, self.usuarios, K_RECORTADO)
+        guardar_indice(self.ruta, self.clave, indice, K_RECORTADO)
+        self.assertMismoIndice(indice, cargar_indice(self.ruta, self.clave, K_RECORTADO))
+        self.assertIsNone(cargar_indice(self.ruta, self.clave, K_COMPLETO))
+        with open(self.ruta_archivo, "a") as archivo: archivo.write("\n")
+        self.assertIsNone(cargar_indice(self.ruta, clave_archivo(self.ruta_archivo), K_RECORTADO))
+
+    def test_indice_corrupto(self):
+        guardar_indice(self.ruta, self.clave, construir_indice(self.grafo, self.usuarios, K_RECORTADO), K_RECORTADO)
+        with open(self.ruta, "r+b") as archivo:
+            archivo.seek(-1, os.SEEK_END)
+            ultimo = archivo.read(1)
+            archivo.seek(-1, os.SEEK_END)
+            archivo.write(bytes([ultimo[0] ^ 1]))
+        self.assertIsNone(cargar_indice(self.ruta, self.clave, K_RECORTADO))
+
+    def test_indice_inconsistente(self):
+        guardar_indice(self.ruta, self.clave, construir_indice(self.grafo, self.usuarios, K_RECORTADO), K_RECORTADO)
+        self.reescribir(lambda secciones: None)
+        self.assertIsNotNone(cargar_indice(self.ruta, self.clave, K_RECORTADO))
+        def id_fuera_de_rango(secciones):
+            secciones[PREFIJO_USUARIOS + IDS][1][0] = ID_FUERA_DE_RANGO
+        def cancion_fuera_de_rango(secciones):
+            secciones[CANCIONES][1][-1] = ID_FUERA_DE_RANGO
+        def offsets_no_crecientes(secciones):
+            offsets = secciones[PREFIJO_CANCIONES + OFFSETS][1]
+            offsets[1], offsets[2] = offsets[2], offsets[1]
+        def puntajes_de_menos(secciones):
+            secciones[PREFIJO_CANCIONES + PUNTAJES][1].pop()
+        for modificar in (id_fuera_de_rango, cancion_fuera_de_rango, offsets_no_crecientes, puntajes_de_menos):
+            indice = construir_indice(self.grafo, self.usuarios, K_RECORTADO)
+            guardar_indice(self.ruta, self.clave, indice, K_RECORTADO)
+            self.reescribir(modificar)
+            self.assertIsNone(cargar_indice(self.ruta, self.clave, K_RECORTADO))
+
+if __name__ == "__main__":
+    unittest.main()
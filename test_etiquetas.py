@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from etiquetas import DiccionarioEtiquetas
+from generador_datos import generar_archivo
+from recomendify import procesar_archivo
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas del diccionario de etiquetas: los codigos siguen el orden de primera aparicion y se decodifican a la misma
+# etiqueta, y al cargar el archivo de canciones en el Grafo de diccionarios cada etiqueta repetida (vertices y
+# playlists) es una unica cadena compartida, sin que cambie el grafo respecto del GrafoCSR.
+# Uso: python3 -m pytest test_etiquetas.py (o python3 -m unittest test_etiquetas)
+
+FILAS = 2000
+SEMILLA = 41
+ETIQUETAS = ("rock", "pop", "rock", "jazz", "pop", "tango")
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+class PruebaEtiquetas(unittest.TestCase):
+
+    def test_codigos_en_orden_de_aparicion(self):
+        etiquetas = DiccionarioEtiquetas()
+        codigos = [etiquetas.codificar(etiqueta) for etiqueta in ETIQUETAS]
+        self.assertEqual(codigos, [0, 1, 0, 2, 1, 3])
+        self.assertEqual([etiquetas.decodificar(codigo) for codigo in codigos], list(ETIQUETAS))
+        self.assertEqual(len(etiquetas), len(set(ETIQUETAS)))
+        self.assertEqual(etiquetas.codigo("jazz"), 2)
+        self.assertIsNone(etiquetas.codigo("cumbia"))
+        self.assertNotIn("cumbia", etiquetas)
+        self.assertEqual(DiccionarioEtiquetas(ETIQUETAS).etiquetas, etiquetas.etiquetas)
+
+    def test_canonica_es_la_primera_copia(self):
+        etiquetas = DiccionarioEtiquetas()
+        primera = "".join(["ro", "ck"])
+        otra = "".join(["r", "ock"])
+        self.assertIsNot(primera, otra)
+        self.assertIs(etiquetas.canonica(primera), primera)
+        self.assertIs(etiquetas.canonica(otra), primera)
+        self.assertEqual(len(etiquetas), 1)
+
+    def test_grafo_con_etiquetas_compartidas(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "canciones.tsv")
+            generar_archivo(ruta, FILAS, SEMILLA)
+            grafo, usuarios = procesar_archivo(ruta)
+            csr, usuarios_csr = procesar_archivo(ruta, compacto = True)
+        self.assertEqual(usuarios, usuarios_csr)
+        self.assertEqual(list(grafo.obtener_vertices()), list(csr.obtener_vertices()))
+        vertices = {v: v for v in grafo.obtener_vertices()}
+        playlists = {}
+        for v in grafo.obtener_vertices():
+            self.assertEqual(grafo.adyacentes(v), csr.adyacentes(v))
+            for w in grafo.adyacentes(v):
+                self.assertIs(w, vertices[w])
+                playlist = grafo.peso_arista(v, w)
+                self.assertEqual(playlist, csr.peso_arista(v, w))
+                self.assertIs(playlists.setdefault(playlist, playlist), playlist)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import tempfile
+import unittest
+from random import Random
+
+from grafo import Grafo
+from grafo_csr import convertir_a_grafo
+from generador_datos import generar_archivo
+from funciones_grafos import camino_minimo, camino_minimo_bidireccional, ciclo_de_largo_n, ciclo_de_largo_n_podado, \
+    page_rank_personalizado_push
+from recomendify import procesar_archivo, construir_grafo_canciones, PUSH_ALFA, PUSH_EPSILON
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas de los recorridos alternativos de funciones_grafos.py contra los originales, sobre el Grafo de diccionarios
+# y el GrafoCSR cargados del mismo archivo sintetico: tienen que encontrar respuestas equivalentes (caminos del mismo
+# largo, ciclos del largo pedido) y validas en el grafo.
+# Uso: python3 -m pytest test_funciones_grafos.py (o python3 -m unittest test_funciones_grafos)
+
+FILAS = 2000
+SEMILLA = 13
+CAMINOS = 100
+ORIGENES_CICLOS = 8
+# largos de ciclo probados en el grafo de canciones y en el de usuarios y canciones (que es bipartito: no tiene ciclos
+# de largo impar, y buscarlos con ciclo_de_largo_n recorre todo el vecindario, por eso no pasan de 4)
+LARGOS_CANCIONES = range(1, 7)
+LARGOS_USUARIOS = range(1, 5)
+# ciclo de 6 vertices con una cola de 2, para los casos sin ciclo
+ARISTAS_CICLO_CON_COLA = ((0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 0), (0, 6), (6, 7))
+SEMILLAS_PUSH = 3
+# tolerancia del pagerank personalizado exacto, calculado iterando hasta que deja de cambiar
+TOLERANCIA_EXACTO = 1e-13
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+class PruebaFuncionesGrafos(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.TemporaryDirectory()
+        ruta = os.path.join(cls.directorio.name, "canciones.tsv")
+        generar_archivo(ruta, FILAS, SEMILLA)
+        cls.grafo, cls.usuarios = procesar_archivo(ruta)
+        cls.csr, _ = procesar_archivo(ruta, compacto = True)
+        cls.vertices = cls.grafo.obtener_vertices()
+        cls.grafo_canciones = construir_grafo_canciones(cls.grafo, cls.usuarios)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directorio.cleanup()
+
+    def assertCaminoValido(self, grafo, camino, v, w):
+        self.assertEqual((camino[0], camino[-1]), (v, w))
+        self.assertEqual(len(set(camino)), len(camino))
+        for x, y in zip(camino, camino[1:]): self.assertTrue(grafo.son_adyacentes(x, y))
+
+    def test_camino_bidireccional_minimo(self):
+        aleatorio = Random(SEMILLA)
+        for _ in range(CAMINOS):
+            v, w = aleatorio.sample(self.vertices, 2)
+            esperado = camino_minimo(self.grafo, v, w)
+            for grafo in (self.grafo, self.csr):
+                camino = camino_minimo_bidireccional(grafo, v, w)
+                self.assertEqual(len(camino), len(esperado))
+                self.assertCaminoValido(self.grafo, camino, v, w)
+                self.assertEqual(camino_minimo(grafo, v, w, bidireccional = True), camino)
+
+    def test_camino_bidireccional_sin_camino(self):
+        grafo = convertir_a_grafo(self.csr)
+        for v in ("aislado 1", "aislado 2", "aislado 3"): grafo.agregar_vertice(v)
+        grafo.agregar_arista("aislado 1", "aislado 2")
+        self.assertEqual(camino_minimo_bidireccional(grafo, "aislado 1", "aislado 2"), ["aislado 1", "aislado 2"])
+        for v, w in ((self.vertices[0], "aislado 1"), ("aislado 2", self.vertices[0]), ("aislado 1", "aislado 3")):
+            self.assertIsNone(camino_minimo_bidireccional(grafo, v, w))
+            self.assertIsNone(camino_minimo(grafo, v, w))
+        self.assertIsNone(camino_minimo_bidireccional(grafo, self.vertices[0], self.vertices[0]))
+
+    def assertCicloValido(self, grafo, ciclo, origen, n):
+        self.assertEqual(len(ciclo), n + 1)
+        self.assertEqual((ciclo[0], ciclo[-1]), (origen, origen))
+        self.assertEqual(len(set(ciclo[:-1])), n)
+        for x, y in zip(ciclo, ciclo[1:]): self.assertTrue(grafo.son_adyacentes(x, y))
+
+    def assertMismosCiclos(self, grafo, largos):
+        for origen in Random(SEMILLA).sample(grafo.obtener_vertices(), ORIGENES_CICLOS):
+            for n in largos:
+                esperado = ciclo_de_largo_n(grafo, origen, n)
+                ciclo = ciclo_de_largo_n_podado(grafo, origen, n)
+                self.assertEqual(bool(ciclo), bool(esperado))
+                if ciclo: self.assertCicloValido(grafo, ciclo, origen, n)
+                else: self.assertIs(ciclo, False)
+
+    def test_ciclo_podado_como_ciclo(self):
+        self.assertMismosCiclos(self.grafo_canciones, LARGOS_CANCIONES)
+        self.assertMismosCiclos(self.grafo, LARGOS_USUARIOS)
+
+    def test_ciclo_podado_sin_ciclo(self):
+        grafo = Grafo()
+        for v in range(len(ARISTAS_CICLO_CON_COLA)): grafo.agregar_vertice(v)
+        for v, w in ARISTAS_CICLO_CON_COLA: grafo.agregar_arista(v, w)
+        for origen in grafo.obtener_vertices():
+            for n in range(1, len(ARISTAS_CICLO_CON_COLA) + 1):
+                esperado = ciclo_de_largo_n(grafo, origen, n)
+                self.assertEqual(bool(ciclo_de_largo_n_podado(grafo, origen, n)), bool(esperado))
+        self.assertCicloValido(grafo, ciclo_de_largo_n_podado(grafo, 0, 6), 0, 6)
+        self.assertIs(ciclo_de_largo_n_podado(grafo, 0, 4), False)
+        self.assertIs(ciclo_de_largo_n_podado(grafo, 7, 6), False)
+
+    def test_ciclo_podado_presupuesto_agotado(self):
+        origen = self.vertices[0]
+        self.assertIsNone(ciclo_de_largo_n_podado(self.grafo, origen, 5, expansiones_max = 10))
+        self.assertIs(ciclo_de_largo_n_podado(self.grafo, origen, 5, segundos_max = 60), False)
+
+    # Devuelve el pagerank personalizado de las semillas en el grafo, iterando x = alfa * s + (1 - alfa) * P x (cada
+    # vertice reparte su valor en partes iguales entre sus adyacentes) hasta que el cambio es menor a la tolerancia
+    def page_rank_personalizado_exacto(self, grafo, semillas, alfa):
+        inicial = {v: semillas.count(v) / len(semillas) for v in grafo.obtener_vertices()}
+        valores = inicial
+        while True:
+            proximos = {v: alfa * inicial[v] for v in grafo.obtener_vertices()}
+            for v in grafo.obtener_vertices():
+                transferencia = (1 - alfa) * valores[v] / grafo.grado(v)
+                for w in grafo.vista_adyacentes(v): proximos[w] += transferencia
+            if sum(abs(proximos[v] - valores[v]) for v in valores) < TOLERANCIA_EXACTO: return proximos
+            valores = proximos
+
+    def test_page_rank_push_como_exacto(self):
+        canciones = [v for v in self.vertices if v not in self.usuarios]
+        semillas = Random(SEMILLA).sample(canciones, SEMILLAS_PUSH)
+        puntajes = page_rank_personalizado_push(self.grafo, semillas, PUSH_ALFA, PUSH_EPSILON)
+        puntajes_csr = page_rank_personalizado_push(self.csr, semillas, PUSH_ALFA, PUSH_EPSILON)
+        self.assertEqual(list(puntajes.items()), list(puntajes_csr.items()))
+        exactos = self.page_rank_personalizado_exacto(self.grafo, semillas, PUSH_ALFA)
+        # el push solo reparte masa que todavia no se repartió: nunca se pasa, y se queda corto en menos de epsilon
+        # por el grado de cada vertice
+        for v, exacto in exactos.items():
+            error = exacto - puntajes.get(v, 0)
+            self.assertGreater(error, -TOLERANCIA_EXACTO)
+            self.assertLess(error, PUSH_EPSILON * self.grafo.grado(v) + TOLERANCIA_EXACTO)
+        mejores = sorted(exactos, key = exactos.get, reverse = True)[:SEMILLAS_PUSH]
+        self.assertEqual(set(mejores), set(semillas))
+
+if __name__ == "__main__":
+    unittest.main()
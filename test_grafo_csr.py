@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from array import array
+from random import Random
+
+from grafo_csr import ConstructorGrafoCSR, convertir_a_csr, convertir_a_grafo, csr_valido
+from generador_datos import generar_archivo
+from funciones_grafos import camino_minimo, page_ranks
+from recomendify import procesar_archivo
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas del backend compacto (GrafoCSR) contra el Grafo de diccionarios, cargando el mismo archivo sintetico con
+# ambos: los vertices, los adyacentes de cada uno (en el mismo orden), los pesos y los resultados de los recorridos
+# tienen que ser los mismos.
+# Uso: python3 -m pytest test_grafo_csr.py (o python3 -m unittest test_grafo_csr)
+
+FILAS = 2000
+SEMILLA = 7
+CAMINOS = 50
+AMORTIGUACION = 0.85
+ITERACIONES_PAGE_RANK = 5
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+class PruebaGrafoCSR(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.TemporaryDirectory()
+        ruta = os.path.join(cls.directorio.name, "canciones.tsv")
+        generar_archivo(ruta, FILAS, SEMILLA)
+        cls.grafo, cls.usuarios = procesar_archivo(ruta)
+        cls.csr, cls.usuarios_csr = procesar_archivo(ruta, compacto = True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directorio.cleanup()
+
+    def assertMismaAdyacencia(self, grafo, otro):
+        self.assertEqual(list(grafo.obtener_vertices()), list(otro.obtener_vertices()))
+        self.assertEqual(len(grafo), len(otro))
+        for v in grafo.obtener_vertices():
+            self.assertEqual(grafo.adyacentes(v), otro.adyacentes(v))
+            self.assertEqual(grafo.grado(v), otro.grado(v))
+            self.assertEqual([grafo.peso_arista(v, w) for w in grafo.adyacentes(v)],
+                             [otro.peso_arista(v, w) for w in otro.adyacentes(v)])
+
+    def test_misma_adyacencia_que_grafo(self):
+        self.assertEqual(self.usuarios, self.usuarios_csr)
+        self.assertMismaAdyacencia(self.grafo, self.csr)
+
+    def test_vistas_y_adyacente_por_posicion(self):
+        for v in self.grafo.obtener_vertices():
+            adyacentes = self.grafo.adyacentes(v)
+            self.assertEqual(list(self.csr.vista_adyacentes(v)), adyacentes)
+            self.assertEqual([self.csr.adyacente(v, i) for i in range(len(adyacentes))], adyacentes)
+            self.assertEqual([self.grafo.adyacente(v, i) for i in range(len(adyacentes))], adyacentes)
+
+    def test_conversiones(self):
+        self.assertMismaAdyacencia(self.grafo, convertir_a_csr(self.grafo))
+        self.assertMismaAdyacencia(self.grafo, convertir_a_grafo(self.csr))
+
+    def test_caminos_iguales(self):
+        aleatorio = Random(SEMILLA)
+        vertices = self.grafo.obtener_vertices()
+        for _ in range(CAMINOS):
+            v, w = aleatorio.sample(vertices, 2)
+            self.assertEqual(camino_minimo(self.csr, v, w), camino_minimo(self.grafo, v, w))
+
+    def test_page_ranks_iguales(self):
+        esperados = page_ranks(self.grafo, AMORTIGUACION, ITERACIONES_PAGE_RANK)
+        obtenidos = page_ranks(self.csr, AMORTIGUACION, ITERACIONES_PAGE_RANK)
+        self.assertEqual(list(esperados), list(obtenidos))
+        for v, rank in esperados.items(): self.assertAlmostEqual(rank, obtenidos[v], places = 12)
+
+    def test_aristas_repetidas_como_grafo(self):
+        constructor = ConstructorGrafoCSR()
+        for v in "abc": constructor.agregar_vertice(v)
+        for v, w, peso in (("a", "b", 1), ("a", "c", 2), ("a", "b", 3)): constructor.agregar_arista(v, w, peso)
+        csr = constructor.construir()
+        self.assertEqual(csr.adyacentes("a"), ["b", "c"])
+        self.assertEqual(csr.peso_arista("a", "b"), 3)
+        self.assertEqual(csr.adyacentes("b"), ["a"])
+        with self.assertRaises(TypeError): csr.agregar_vertice("d")
+
+    def test_adyacente_se_actualiza_al_cambiar_aristas(self):
+        grafo = convertir_a_grafo(convertir_a_csr(self.grafo))
+        v = grafo.obtener_vertices()[0]
+        grafo.adyacente(v, 0)
+        grafo.agregar_vertice("nuevo")
+        grafo.agregar_arista(v, "nuevo")
+        self.assertEqual(grafo.adyacente(v, grafo.grado(v) - 1), "nuevo")
+        grafo.borrar_vertice("nuevo")
+        self.assertEqual([grafo.adyacente(v, i) for i in range(grafo.grado(v))], self.grafo.adyacentes(v))
+
+    def test_csr_valido(self):
+        self.assertTrue(csr_valido(self.csr.offsets, self.csr.vecinos, len(self.csr)))
+        self.assertFalse(csr_valido(array("q", [0, 2, 1]), array("i", [1, 0]), 2))
+        self.assertFalse(csr_valido(array("q", [0, 1, 2]), array("i", [1, 2]), 2))
+        self.assertFalse(csr_valido(array("q", [0, 1, 3]), array("i", [1, 0]), 2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+import zlib
+from array import array
+from contextlib import redirect_stdout
+from random import Random
+
+from grafo_disco import abrir_grafo_disco, ruta_grafo_disco, ARCHIVO_BASE, ARCHIVO_OFFSETS, ARCHIVO_VECINOS, \
+    TABLA_DATOS
+from grafo_csr import TIPO_IDS
+from instantanea import clave_archivo
+from generador_datos import generar_archivo
+from funciones_grafos import camino_minimo
+from recomendify import procesar_archivo, procesar_archivo_en_disco, recomendify, OPCION_DISCO
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas del grafo en disco (GrafoDisco) contra el Grafo de diccionarios cargado del mismo archivo sintetico: los
+# vertices, los adyacentes, los pesos y los usuarios tienen que ser los mismos, aun con caches muy chicas. Un grafo en
+# disco con archivos modificados, truncados o inconsistentes no se abre sino que se vuelve a escribir.
+# Uso: python3 -m pytest test_grafo_disco.py (o python3 -m unittest test_grafo_disco)
+
+FILAS = 2000
+SEMILLA = 29
+CAMINOS = 30
+PROGRAMA = "recomendify.py"
+# con esta memoria las caches de etiquetas guardan unas pocas decenas de entradas
+MEMORIA_CHICA = 16 << 10
+MEMORIA = 16 << 20
+VECINO_FUERA_DE_RANGO = 10 ** 8
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+class PruebaGrafoDisco(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta_archivo = os.path.join(self.directorio.name, "canciones.tsv")
+        generar_archivo(self.ruta_archivo, FILAS, SEMILLA)
+        self.ruta = ruta_grafo_disco(self.ruta_archivo)
+        self.grafo, self.usuarios = procesar_archivo(self.ruta_archivo)
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def construir(self, memoria = MEMORIA):
+        return procesar_archivo_en_disco(self.ruta_archivo, self.ruta, clave_archivo(self.ruta_archivo), memoria)
+
+    def abrir(self):
+        return abrir_grafo_disco(self.ruta, clave_archivo(self.ruta_archivo), MEMORIA)
+
+    def assertComoGrafo(self, datos):
+        grafo, usuarios = datos
+        self.assertEqual(list(self.grafo.obtener_vertices()), list(grafo.obtener_vertices()))
+        self.assertEqual(len(self.grafo), len(grafo))
+        self.assertEqual(set(usuarios), self.usuarios)
+        self.assertEqual(len(usuarios), len(self.usuarios))
+        for v in self.grafo.obtener_vertices():
+            self.assertEqual(self.grafo.adyacentes(v), grafo.adyacentes(v))
+            self.assertEqual(self.grafo.grado(v), grafo.grado(v))
+            self.assertEqual([self.grafo.peso_arista(v, w) for w in self.grafo.adyacentes(v)],
+                             [grafo.peso_arista(v, w) for w in grafo.adyacentes(v)])
+            self.assertEqual(v in usuarios, v in self.usuarios)
+
+    # Reemplaza el contenido del archivo del grafo en disco con ese nombre y, si "actualizar_crc" es True, guarda en
+    # la base su nuevo CRC, para que solo la validacion del contenido pueda rechazarlo
+    def reescribir(self, nombre, contenido, actualizar_crc = False):
+        with open(os.path.join(self.ruta, nombre), "wb") as archivo: archivo.write(contenido)
+        if not actualizar_crc: return
+        base = sqlite3.connect(os.path.join(self.ruta, ARCHIVO_BASE))
+        crcs = json.loads(base.execute("SELECT valor FROM {} WHERE clave = 'crc'".format(TABLA_DATOS)).fetchone()[0])
+        crcs[nombre] = zlib.crc32(contenido)
+        base.execute("UPDATE {} SET valor = ? WHERE clave = 'crc'".format(TABLA_DATOS), (json.dumps(crcs),))
+        base.commit()
+        base.close()
+
+    # Recibe la ruta de un archivo de comandos y las opciones y devuelve lo que imprime recomendify al ejecutarlos
+    def ejecutar(self, ruta_comandos, opciones):
+        salida = io.StringIO()
+        with redirect_stdout(salida): recomendify([PROGRAMA, self.ruta_archivo, ruta_comandos], opciones)
+        return salida.getvalue()
+
+    def leer(self, nombre):
+        with open(os.path.join(self.ruta, nombre), "rb") as archivo: return archivo.read()
+
+    def test_como_grafo(self):
+        self.assertComoGrafo(self.construir())
+        self.assertComoGrafo(self.abrir())
+
+    def test_como_grafo_con_caches_chicas(self):
+        self.construir(MEMORIA_CHICA)
+        datos = abrir_grafo_disco(self.ruta, clave_archivo(self.ruta_archivo), MEMORIA_CHICA)
+        self.assertComoGrafo(datos)
+        aleatorio = Random(SEMILLA)
+        vertices = self.grafo.obtener_vertices()
+        for _ in range(CAMINOS):
+            v, w = aleatorio.sample(vertices, 2)
+            self.assertEqual(camino_minimo(datos[0], v, w), camino_minimo(self.grafo, v, w))
+
+    def test_archivo_de_canciones_modificado(self):
+        self.construir()
+        with open(self.ruta_archivo, "a") as archivo: archivo.write("\n")
+        self.assertIsNone(self.abrir())
+
+    def test_archivos_corruptos(self):
+        self.construir()
+        vecinos = self.leer(ARCHIVO_VECINOS)
+        self.reescribir(ARCHIVO_VECINOS, vecinos[:-1] + bytes([vecinos[-1] ^ 1]))
+        self.assertIsNone(self.abrir())
+        self.reescribir(ARCHIVO_VECINOS, vecinos)
+        self.assertIsNotNone(self.abrir())
+        self.reescribir(ARCHIVO_OFFSETS, self.leer(ARCHIVO_OFFSETS)[:-8])
+        self.assertIsNone(self.abrir())
+
+    def test_archivos_inconsistentes(self):
+        self.construir()
+        vecinos = array(TIPO_IDS, self.leer(ARCHIVO_VECINOS))
+        self.reescribir(ARCHIVO_VECINOS, vecinos[:-1].tobytes(), actualizar_crc = True)
+        self.assertIsNone(self.abrir())
+        vecinos[0] = VECINO_FUERA_DE_RANGO
+        self.reescribir(ARCHIVO_VECINOS, vecinos.tobytes(), actualizar_crc = True)
+        self.assertIsNone(self.abrir())
+
+    def test_grafo_corrupto_se_reescribe(self):
+        canciones = [v for v in self.grafo.obtener_vertices() if v not in self.usuarios]
+        comandos = ["camino {} >>>> {}".format(canciones[0], canciones[-1]), "mas_importantes 5",
+                    "ciclo 4 " + canciones[3], "rango 2 " + canciones[1]]
+        ruta_comandos = os.path.join(self.directorio.name, "comandos.txt")
+        with open(ruta_comandos, "w") as archivo: archivo.write("\n".join(comandos) + "\n")
+        esperada = self.ejecutar(ruta_comandos, {})
+        self.assertEqual(self.ejecutar(ruta_comandos, {OPCION_DISCO: True}), esperada)
+        self.reescribir(ARCHIVO_VECINOS, bytes(len(self.leer(ARCHIVO_VECINOS))))
+        self.assertIsNone(self.abrir())
+        self.assertEqual(self.ejecutar(ruta_comandos, {OPCION_DISCO: True}), esperada)
+        self.assertIsNotNone(self.abrir())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from instantanea import cargar_instantanea, guardar_instantanea, cargar_secciones, guardar_secciones, clave_archivo, \
+    ruta_instantanea, MAGIA, VECINOS, OFFSETS
+from generador_datos import generar_archivo
+from recomendify import procesar_archivo, construir_grafo_canciones, calcular_page_ranks, recomendify, \
+    OPCION_INSTANTANEA, MOTOR_PAGERANK_ITERATIVO
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas de la instantanea binaria: lo que se guarda se vuelve a cargar igual (comparado con el Grafo de
+# diccionarios cargado del archivo de canciones), y una instantanea corrupta o desactualizada no se carga sino que se
+# reconstruye sin que cambie la salida de los comandos.
+# Uso: python3 -m pytest test_instantanea.py (o python3 -m unittest test_instantanea)
+
+FILAS = 2000
+SEMILLA = 11
+PROGRAMA = "recomendify.py"
+VECINO_FUERA_DE_RANGO = 10 ** 8
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+# Recibe el grafo y el set de usuarios y devuelve comandos deterministas (sin Random Walks) sobre sus canciones
+def comandos_deterministas(grafo, usuarios):
+    canciones = [v for v in grafo.obtener_vertices() if v not in usuarios]
+    return ["camino {} >>>> {}".format(canciones[0], canciones[-1]),
+            "camino {} >>>> {}".format(canciones[5], canciones[9]), "mas_importantes 5", "ciclo 4 " + canciones[3], "rango 2 " + canciones[1], "rango 3 " + canciones[7]]
+
+# Recibe la ruta del archivo de canciones, la de un archivo de comandos y las opciones y devuelve lo que imprime
+# recomendify al ejecutarlos
+def ejecutar(ruta_archivo, ruta_comandos, opciones):
+    salida = io.StringIO()
+    with redirect_stdout(salida): recomendify([PROGRAMA, ruta_archivo, ruta_comandos], opciones)
+    return salida.getvalue()
+
+class PruebaInstantanea(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta_archivo = os.path.join(self.directorio.name, "canciones.tsv")
+        generar_archivo(self.ruta_archivo, FILAS, SEMILLA)
+        self.ruta = ruta_instantanea(self.ruta_archivo)
+        self.grafo, self.usuarios = procesar_archivo(self.ruta_archivo)
+        self.csr, _ = procesar_archivo(self.ruta_archivo, compacto = True)
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def guardar(self, grafo_canciones = None, page_rank = None):
+        guardar_instantanea(self.ruta, clave_archivo(self.ruta_archivo), self.csr, self.usuarios, grafo_canciones,
+                            page_rank, MOTOR_PAGERANK_ITERATIVO)
+
+    def cargar(self):
+        return cargar_instantanea(self.ruta, clave_archivo(self.ruta_archivo))
+
+    # Reescribe la instantanea con las secciones modificadas por "modificar" (que recibe el diccionario de secciones
+    # y lo cambia), con CRCs validos: solo la validacion del contenido puede rechazarla
+    def reescribir(self, modificar):
+        cabecera, secciones = cargar_secciones(self.ruta, MAGIA)
+        tipos = {nombre: seccion[2] for nombre, seccion in cabecera.pop("secciones").items()}
+        secciones = {nombre: (tipos[nombre], contenido.tolist() if isinstance(contenido, memoryview) else contenido)
+                     for nombre, contenido in secciones.items()}
+        modificar(secciones)
+        guardar_secciones(self.ruta, MAGIA, cabecera, secciones)
+
+    def test_ida_y_vuelta(self):
+        grafo_canciones = construir_grafo_canciones(self.grafo, self.usuarios)
+        page_rank = calcular_page_ranks(self.grafo, self.usuarios)
+        self.guardar(grafo_canciones, page_rank)
+        datos = self.cargar()
+        self.assertIsNotNone(datos)
+        self.assertEqual(datos["usuarios"], self.usuarios)
+        for esperado, obtenido in ((self.grafo, datos["grafo"]), (grafo_canciones, datos["grafo_canciones"])):
+            self.assertEqual(list(esperado.obtener_vertices()), list(obtenido.obtener_vertices()))
+            for v in esperado.obtener_vertices():
+                self.assertEqual(esperado.adyacentes(v), obtenido.adyacentes(v))
+                self.assertEqual([esperado.peso_arista(v, w) for w in esperado.adyacentes(v)],
+                                 [obtenido.peso_arista(v, w) for w in obtenido.adyacentes(v)])
+        self.assertEqual(datos["page_rank"], page_rank)
+        self.assertEqual(datos["motor_page_rank"], MOTOR_PAGERANK_ITERATIVO)
+
+    def test_byte_modificado(self):
+        self.guardar()
+        with open(self.ruta, "r+b") as archivo:
+            archivo.seek(-1, os.SEEK_END)
+            ultimo = archivo.read(1)
+            archivo.seek(-1, os.SEEK_END)
+            archivo.write(bytes([ultimo[0] ^ 1]))
+        self.assertIsNone(self.cargar())
+
+    def test_vecino_fuera_de_rango(self):
+        self.guardar()
+        self.assertIsNotNone(self.cargar())
+        def modificar(secciones):
+            secciones[VECINOS][1][0] = VECINO_FUERA_DE_RANGO
+        self.reescribir(modificar)
+        self.assertIsNone(self.cargar())
+
+    def test_offsets_no_crecientes(self):
+        self.guardar()
+        def modificar(secciones):
+            offsets = secciones[OFFSETS][1]
+            offsets[1], offsets[2] = offsets[2], offsets[1]
+        self.reescribir(modificar)
+        self.assertIsNone(self.cargar())
+
+    def test_archivo_de_canciones_modificado(self):
+        self.guardar()
+        with open(self.ruta_archivo, "a") as archivo: archivo.write("\n")
+        self.assertIsNone(self.cargar())
+
+    def test_instantanea_corrupta_se_reconstruye(self):
+        ruta_comandos = os.path.join(self.directorio.name, "comandos.txt")
+        with open(ruta_comandos, "w") as archivo:
+            archivo.write("\n".join(comandos_deterministas(self.grafo, self.usuarios)) + "\n")
+        esperada = ejecutar(self.ruta_archivo, ruta_comandos, {})
+        self.assertEqual(ejecutar(self.ruta_archivo, ruta_comandos, {OPCION_INSTANTANEA: True}), esperada)
+        def modificar(secciones):
+            secciones[VECINOS][1][0] = VECINO_FUERA_DE_RANGO
+        self.reescribir(modificar)
+        self.assertEqual(ejecutar(self.ruta_archivo, ruta_comandos, {OPCION_INSTANTANEA: True}), esperada)
+        self.assertIsNotNone(self.cargar())
+
+if __name__ == "__main__":
+    unittest.main()
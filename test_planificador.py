@@ -0,0 +1,76 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from generador_datos import generar_archivo
+from recomendify import procesar_archivo, ejecutar_comandos, ejecutar_comandos_planificados, OPCION_RECORRIDOS, \
+    OPCION_SEMILLA, OPCION_RECOMENDACION, MOTOR_RECORRIDOS_LOTE, MOTOR_RECORRIDOS_VECTORIZADO, \
+    MOTOR_RECOMENDACION_PUSH
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Pruebas del planificador de consultas: con los motores de Random Walks por lotes o vectorizado y una semilla fija
+# (o con el empuje local), ejecutar los comandos planificados tiene que imprimir lo mismo que ejecutarlos uno por uno
+# sobre el Grafo de diccionarios, tanto con el Grafo como con el GrafoCSR.
+# Uso: python3 -m pytest test_planificador.py (o python3 -m unittest test_planificador)
+
+FILAS = 2000
+SEMILLA = 23
+SEMILLA_RECORRIDOS = "5"
+OPCIONES_DETERMINISTAS = ({OPCION_RECORRIDOS: MOTOR_RECORRIDOS_LOTE, OPCION_SEMILLA: SEMILLA_RECORRIDOS},
+                          {OPCION_RECORRIDOS: MOTOR_RECORRIDOS_VECTORIZADO, OPCION_SEMILLA: SEMILLA_RECORRIDOS},
+                          {OPCION_RECOMENDACION: MOTOR_RECOMENDACION_PUSH})
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+# Recibe las canciones y devuelve comandos que comparten recorridos (varios rango desde una misma cancion, camino
+# desde un mismo origen y recomendaciones repetidas), intercalados con comandos que no se planifican o sin respuesta
+def comandos_compartidos(canciones):
+    a, b, c, d, e = canciones[:5]
+    return ["rango 1 " + a, "rango 3 " + a, "camino {} >>>> {}".format(a, b), "recomendacion canciones 5 " + a,
+            "camino {} >>>> {}".format(a, c), "rango 2 " + a, "camino {} >>>> {}".format(d, e), "mas_importantes 5",
+            "recomendacion usuarios 5 {} >>>> {}".format(b, c), "camino {} >>>> {}".format(a, d), "ciclo 3 " + b,
+            "recomendacion canciones 3 " + a, "rango 2 " + e, "recomendacion usuarios 3 {} >>>> {}".format(b, c),
+            "rango 0 " + a, "camino {} >>>> no existe".format(a), "rango 1 " + e]
+
+# Recibe la funcion que ejecuta los comandos, los comandos, el grafo, los usuarios y las opciones y devuelve lo que
+# imprime
+def ejecutar(funcion, comandos, grafo, usuarios, opciones):
+    salida = io.StringIO()
+    with redirect_stdout(salida):
+        funcion([comando + "\n" for comando in comandos], grafo, None, None, usuarios, dict(opciones))
+    return salida.getvalue()
+
+class PruebaPlanificador(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.TemporaryDirectory()
+        ruta = os.path.join(cls.directorio.name, "canciones.tsv")
+        generar_archivo(ruta, FILAS, SEMILLA)
+        cls.grafo, cls.usuarios = procesar_archivo(ruta)
+        cls.csr, _ = procesar_archivo(ruta, compacto = True)
+        canciones = [v for v in cls.grafo.obtener_vertices() if v not in cls.usuarios]
+        cls.comandos = comandos_compartidos(canciones)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directorio.cleanup()
+
+    def test_planificados_como_uno_por_uno(self):
+        for opciones in OPCIONES_DETERMINISTAS:
+            esperada = ejecutar(ejecutar_comandos, self.comandos, self.grafo, self.usuarios, opciones)
+            self.assertEqual(len(esperada.splitlines()), len(self.comandos))
+            for grafo in (self.grafo, self.csr):
+                self.assertEqual(ejecutar(ejecutar_comandos, self.comandos, grafo, self.usuarios, opciones), esperada)
+                self.assertEqual(ejecutar(ejecutar_comandos_planificados, self.comandos, grafo, self.usuarios,
+                                          opciones), esperada)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from multiprocessing import Process
+
+from servidor import servir, enviar_comandos
+from generador_datos import generar_archivo
+from recomendify import procesar_archivo, ejecutar_comandos, iniciar_servidor, OPCION_SERVIDOR, \
+    OPCION_PROCESOS_SERVIDOR, OPCION_RECORRIDOS, OPCION_SEMILLA, MOTOR_RECORRIDOS_LOTE
+
+#*******************************************************************
+#                     CONSTANTES GLOBALES
+#*******************************************************************
+
+# Prueba de ida y vuelta del protocolo del servidor con comandos enviados todos juntos (sin esperar respuestas). Las
+# salidas incluyen lineas vacias, como la de "recomendacion canciones 0 ...", que con una linea vacia como fin de
+# respuesta desincronizaban las respuestas siguientes. Ademas, el servidor de recomendify (con el GrafoCSR) tiene que
+# responder cada comando igual que ejecutarlo solo sobre el Grafo de diccionarios.
+# Uso: python3 -m pytest test_servidor.py (o python3 -m unittest test_servidor)
+
+COMANDO_LIVIANO = "liviano"
+ESPERA_SERVIDOR = 10
+INTERVALO_ESPERA = 0.05
+
+SALIDAS = {
+    "vacia": "",
+    "invalido": "Numero invalido\n\n",
+    "lineas": "a\n\nb\n\n\nc\n",
+    COMANDO_LIVIANO: "\n",
+    "sin_fin": "sin fin de linea",
+    "acentos": "canción - ñandú\n",
+}
+
+FILAS = 2000
+SEMILLA = 31
+PROCESOS_SERVIDOR = "2"
+# con el motor de Random Walks por lotes y una semilla fija las recomendaciones son siempre las mismas
+OPCIONES_RECOMENDIFY = {OPCION_RECORRIDOS: MOTOR_RECORRIDOS_LOTE, OPCION_SEMILLA: "3"}
+
+#*******************************************************************
+#                           FUNCIONES
+#*******************************************************************
+
+def ejecutar(linea, estado):
+    return estado[linea.strip()]
+
+def es_liviano(linea):
+    return linea.strip() == COMANDO_LIVIANO
+
+# Recibe el caso de prueba, la funcion y los argumentos del servidor, lo inicia en otro proceso y espera a que
+# empiece a escuchar en la direccion recibida. Devuelve el proceso
+def iniciar_proceso_servidor(prueba, direccion, funcion, argumentos):
+    servidor = Process(target = funcion, args = argumentos)
+    servidor.start()
+    limite = time.monotonic() + ESPERA_SERVIDOR
+    while not os.path.exists(direccion):
+        prueba.assertLess(time.monotonic(), limite, "el servidor no empezo a escuchar")
+        time.sleep(INTERVALO_ESPERA)
+    return servidor
+
+class PruebaServidor(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.direccion = os.path.join(self.directorio.name, "servidor.sock")
+        self.servidor = iniciar_proceso_servidor(self, self.direccion, servir,
+                                                 (self.direccion, ejecutar, es_liviano, SALIDAS, 2))
+
+    def tearDown(self):
+        self.servidor.terminate()
+        self.servidor.join(ESPERA_SERVIDOR)
+        self.directorio.cleanup()
+
+    def test_respuestas_en_orden_con_lineas_vacias(self):
+        comandos = ["invalido", "lineas", COMANDO_LIVIANO, "vacia", "sin_fin", "invalido", "acentos", "lineas"] * 5
+        self.assertEqual(enviar_comandos(self.direccion, comandos), [SALIDAS[comando] for comando in comandos])
+
+    def test_conexiones_sucesivas(self):
+        for comando in SALIDAS:
+            self.assertEqual(enviar_comandos(self.direccion, [comando, comando]), [SALIDAS[comando]] * 2)
+
+class PruebaServidorRecomendify(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        ruta = os.path.join(self.directorio.name, "canciones.tsv")
+        generar_archivo(ruta, FILAS, SEMILLA)
+        self.grafo, self.usuarios = procesar_archivo(ruta)
+        csr, _ = procesar_archivo(ruta, compacto = True)
+        self.direccion = os.path.join(self.directorio.name, "servidor.sock")
+        opciones = dict(OPCIONES_RECOMENDIFY, **{OPCION_SERVIDOR: self.direccion,
+                                                 OPCION_PROCESOS_SERVIDOR: PROCESOS_SERVIDOR})
+        self.servidor = iniciar_proceso_servidor(self, self.direccion, iniciar_servidor,
+                                                 (csr, None, None, self.usuarios, opciones))
+
+    def tearDown(self):
+        self.servidor.terminate()
+        self.servidor.join(ESPERA_SERVIDOR)
+        self.directorio.cleanup()
+
+    # Devuelve lo que imprime el comando ejecutado solo sobre el Grafo de diccionarios
+    def salida_esperada(self, comando):
+        salida = io.StringIO()
+        with redirect_stdout(salida):
+            ejecutar_comandos([comando], self.grafo, None, None, self.usuarios, dict(OPCIONES_RECOMENDIFY))
+        return salida.getvalue()
+
+    def test_respuestas_como_grafo(self):
+        canciones = [v for v in self.grafo.obtener_vertices() if v not in self.usuarios]
+        comandos = ["camino {} >>>> {}".format(canciones[0], canciones[-1]), "mas_importantes 5",
+                    "recomendacion canciones 5 {} >>>> {}".format(canciones[1], canciones[2]),
+                    "ciclo 4 " + canciones[3], "rango 2 " + canciones[4], "recomendacion usuarios 3 " + canciones[5],
+                    "rango 0 " + canciones[4], "camino {} >>>> {}".format(canciones[6], canciones[7]),
+                    "mas_importantes 5"]
+        self.assertEqual(enviar_comandos(self.direccion, comandos), [self.salida_esperada(c) for c in comandos])
+
+if __name__ == "__main__":
+    unittest.main()